@@ -1,37 +1,24 @@
 import cv2
 import face_recognition
-import numpy as np
 import os
+import sys
+
+# The face gallery (parallel enrollment + encoding cache) lives with the object detection scripts
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'object_detection'))
+from face_gallery import FaceGallery, GalleryWatcher
 
 class FaceRecognitionSystem:
-    def __init__(self):
-        self.known_face_encodings = []
-        self.known_face_names = []
+    def __init__(self, face_matcher='exact'):
+        self.face_gallery = None
+        self.face_matcher = face_matcher
         self.load_known_faces()
     
     def load_known_faces(self):
         """Load known faces from 'known_faces' folder"""
-        known_faces_dir = "known_faces"
-        
-        if not os.path.exists(known_faces_dir):
-            os.makedirs(known_faces_dir)
-            print(f"Created {known_faces_dir} folder. Add photos of people you want to recognize.")
-            return
+        self.face_gallery = FaceGallery("known_faces", matcher=self.face_matcher).load()
         
-        for filename in os.listdir(known_faces_dir):
-            if filename.lower().endswith(('.png', '.jpg', '.jpeg')):
-                # Load image
-                image_path = os.path.join(known_faces_dir, filename)
-                image = face_recognition.load_image_file(image_path)
-                
-                # Get face encoding
-                encodings = face_recognition.face_encodings(image)
-                if encodings:
-                    self.known_face_encodings.append(encodings[0])
-                    # Use filename (without extension) as name
-                    name = os.path.splitext(filename)[0]
-                    self.known_face_names.append(name)
-                    print(f"Loaded face: {name}")
+        # Pick up added, changed or deleted photos in the background
+        self.gallery_watcher = GalleryWatcher(self.face_gallery).start()
     
     def recognize_faces(self):
         """Start real-time face recognition"""
@@ -53,20 +40,10 @@ class FaceRecognitionSystem:
             face_locations = face_recognition.face_locations(rgb_small_frame)
             face_encodings = face_recognition.face_encodings(rgb_small_frame, face_locations)
             
-            for face_encoding, face_location in zip(face_encodings, face_locations):
-                # Check if face matches known faces
-                matches = face_recognition.compare_faces(self.known_face_encodings, face_encoding)
-                name = "Unknown"
-                confidence = 0
-                
-                if self.known_face_encodings:
-                    face_distances = face_recognition.face_distance(self.known_face_encodings, face_encoding)
-                    best_match_index = np.argmin(face_distances)
-                    
-                    if matches[best_match_index]:
-                        name = self.known_face_names[best_match_index]
-                        confidence = 1 - face_distances[best_match_index]
-                
+            # Match all faces in the frame against the gallery at once
+            identities = self.face_gallery.identify(face_encodings)
+            
+            for (name, confidence), face_location in zip(identities, face_locations):
                 # Scale face location back up
                 top, right, bottom, left = face_location
                 top *= 4
@@ -91,6 +68,7 @@ class FaceRecognitionSystem:
         
         cap.release()
         cv2.destroyAllWindows()
+        self.gallery_watcher.stop()
     
     def save_current_face(self, frame):
         """Save current face for recognition"""
@@ -99,10 +77,8 @@ class FaceRecognitionSystem:
             filename = f"known_faces/{name}.jpg"
             cv2.imwrite(filename, frame)
             print(f"Saved face as {filename}")
-            # Reload known faces
-            self.known_face_encodings = []
-            self.known_face_names = []
-            self.load_known_faces()
+            # Only the new photo is encoded, in the background; recognition keeps running meanwhile
+            self.gallery_watcher.refresh()
 
 if __name__ == "__main__":
     system = FaceRecognitionSystem()
@@ -0,0 +1,237 @@
+import argparse
+import cv2
+import importlib.util
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from frame_context import FrameContext
+from event_log import json_default
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.m4v', '.mpg', '.mpeg', '.wmv')
+DETECTORS = ('opencv', 'yolo', 'tensorflow')
+MODES = ('face', 'recognition', 'motion', 'people', 'color', 'all')
+RECOGNITION_MODES = ('recognition', 'all')
+
+# Detector owned by each worker process, built once and reused for every file it handles
+worker_detector = None
+worker_kind = None
+worker_mode = 'all'
+
+def find_videos(inputs):
+    """Expand files and directories (recursively) into (path, output name) pairs"""
+    videos = []
+    for item in inputs:
+        if os.path.isdir(item):
+            root = os.path.abspath(item)
+            for dirpath, _, filenames in os.walk(root):
+                for filename in sorted(filenames):
+                    if filename.lower().endswith(VIDEO_EXTENSIONS):
+                        path = os.path.join(dirpath, filename)
+                        # cam01/0900.mp4 and cam02/0900.mp4 must not overwrite each other's results
+                        relative = os.path.relpath(path, os.path.dirname(root))
+                        videos.append((path, relative))
+        elif os.path.isfile(item):
+            videos.append((item, os.path.basename(item)))
+        else:
+            print(f"Skipping {item}: not a file or directory")
+    return videos
+
+def output_name(relative):
+    stem = os.path.splitext(relative)[0]
+    return stem.replace(os.sep, '__') + '.jsonl'
+
+def init_worker(kind, detection_mode, motion_gating=False, model='yolov3'):
+    """Build this worker's detector; frame-level parallelism is off since files are fanned out"""
+    global worker_detector, worker_kind, worker_mode
+    # One OpenCV thread per worker, otherwise N workers x N OpenCV threads oversubscribe the CPU
+    cv2.setNumThreads(1)
+    worker_kind = kind
+    worker_mode = detection_mode
+    if kind == 'yolo':
+        from object_detection import ObjectDetector
+        worker_detector = ObjectDetector(model)
+        if not worker_detector.load():
+            raise RuntimeError(f"Model '{model}' could not be loaded")
+    elif kind == 'tensorflow':
+        # TensorFlow is only imported in workers that use it
+        from tensorflow_detection import TensorFlowObjectDetector
+        worker_detector = TensorFlowObjectDetector()
+        if not worker_detector.load():
+            raise RuntimeError("TensorFlow model could not be loaded")
+    else:
+        from opencv_only_system import OpenCVDetectionSystem
+        # The parent already encoded the gallery into its cache, and nobody enrolls faces during a batch run
+        worker_detector = OpenCVDetectionSystem(parallel_stages=False, motion_gating=motion_gating,
+                                                load_gallery=detection_mode in RECOGNITION_MODES,
+                                                watch_gallery=False, gallery_workers=1)
+
+def check_detector(kind, detection_mode, model):
+    """Fail before fanning out if the workers could not build their detector; returns an error or None"""
+    if kind == 'yolo':
+        from model_registry import ModelRegistry
+        problems = ModelRegistry().verify(model)
+        if problems:
+            return f"Model '{model}' is not available: " + "; ".join(problems)
+    elif kind == 'tensorflow':
+        # Checked without importing TensorFlow here; the workers load it
+        from tensorflow_detection import DEFAULT_SAVED_MODEL
+        if importlib.util.find_spec('tensorflow') is None:
+            return "TensorFlow is not installed (pip install tensorflow)"
+        if not os.path.isdir(DEFAULT_SAVED_MODEL):
+            return f"No SavedModel directory at {DEFAULT_SAVED_MODEL}"
+    elif detection_mode in RECOGNITION_MODES:
+        # Encode new photos once here (with the full pool), so every worker starts from a warm cache
+        from face_gallery import FaceGallery
+        FaceGallery("known_faces").load()
+    return None
+
+def detect(frames, ctx):
+    """Detections for consecutive frames; YOLO runs them as one batch"""
+    if worker_kind == 'yolo':
+        return worker_detector.detect_batch(frames)
+    if worker_kind == 'tensorflow':
+        return [worker_detector.detect_objects(frame) for frame in frames]
+    return [worker_detector.process_frame(frame, worker_mode, ctx.reset(frame)) for frame in frames]
+
+def process_video(path, output_path, stride=1, batch_size=1):
+    """Run the detector over every stride-th frame of one video as fast as it decodes
+    
+    Writes one JSON line per frame that had detections and returns a summary dict.
+    """
+    start = time.perf_counter()
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        return {'file': path, 'error': 'could not open video'}
+    
+    if worker_kind == 'opencv':
+        # Each file is a different scene; don't carry one video's background into the next
+        worker_detector.reset_background()
+    
+    fps = cap.get(cv2.CAP_PROP_FPS) or 0
+    ctx = FrameContext()
+    frames_read = 0
+    frames_processed = 0
+    detection_count = 0
+    pending = []  # (frame index, frame) waiting for the next batch
+    
+    with open(output_path, 'w') as out:
+        while True:
+            if frames_read % stride:
+                # grab() skips decoding the frames we are not going to analyse
+                ret = cap.grab()
+                if ret:
+                    frames_read += 1
+                    continue
+            else:
+                ret, frame = cap.read()
+                if ret:
+                    pending.append((frames_read, frame))
+                    frames_read += 1
+                    if len(pending) < batch_size:
+                        continue
+            
+            # Batch full, or the video ended with frames still waiting
+            for (index, _), detections in zip(pending, detect([frame for _, frame in pending], ctx)):
+                if detections:
+                    out.write(json.dumps({
+                        'frame': index,
+                        'timestamp': round(index / fps, 3) if fps else None,
+                        'detections': detections
+                    }, default=json_default) + '\n')
+                    detection_count += len(detections)
+            frames_processed += len(pending)
+            pending = []
+            if not ret:
+                break
+    
+    cap.release()
+    elapsed = time.perf_counter() - start
+    return {
+        'file': path,
+        'output': output_path,
+        'frames': frames_read,
+        'frames_processed': frames_processed,
+        'detections': detection_count,
+        'seconds': elapsed,
+        'fps': frames_processed / elapsed if elapsed else 0,
+        'video_seconds': frames_read / fps if fps else None,
+        'pid': os.getpid()
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the detection pipeline over archived video files")
+    parser.add_argument('inputs', nargs='+', help="Video files or directories (searched recursively)")
+    parser.add_argument('--detector', choices=DETECTORS, default='opencv')
+    parser.add_argument('--mode', choices=MODES, default='all', help="OpenCV detection mode")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Worker processes (one file each at a time)")
+    parser.add_argument('--motion-gating', action='store_true', help="OpenCV: look for faces and people only around motion")
+    parser.add_argument('--stride', type=int, default=1, help="Analyse every Nth frame")
+    parser.add_argument('--model', default='yolov3', help="YOLO: model variant from models/manifest.json")
+    parser.add_argument('--batch-size', type=int, default=8, help="YOLO: consecutive frames per forward pass")
+    parser.add_argument('--output-dir', default='batch_results')
+    args = parser.parse_args()
+    
+    videos = find_videos(args.inputs)
+    if not videos:
+        print("No video files found")
+        return
+    
+    error = check_detector(args.detector, args.mode, args.model)
+    if error:
+        raise SystemExit(error)
+    
+    os.makedirs(args.output_dir, exist_ok=True)
+    # Longest files first, so the pool doesn't end on one big straggler
+    videos.sort(key=lambda video: os.path.getsize(video[0]), reverse=True)
+    workers = max(1, min(args.workers, len(videos)))
+    print(f"Processing {len(videos)} videos with {workers} {args.detector} workers...")
+    
+    start = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(args.detector, args.mode, args.motion_gating, args.model)) as pool:
+        futures = {
+            pool.submit(process_video, path, os.path.join(args.output_dir, output_name(relative)), max(1, args.stride),
+                        max(1, args.batch_size) if args.detector == 'yolo' else 1): path
+            for path, relative in videos
+        }
+        for done, future in enumerate(as_completed(futures), 1):
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {'file': futures[future], 'error': str(e)}
+            results.append(result)
+            
+            if 'error' in result:
+                print(f"[{done}/{len(videos)}] {result['file']}: ERROR {result['error']}")
+            else:
+                print(f"[{done}/{len(videos)}] {result['file']}: {result['frames']} frames, "
+                      f"{result['detections']} detections, {result['fps']:.1f} fps")
+    
+    wall = time.perf_counter() - start
+    ok = [result for result in results if 'error' not in result]
+    total_frames = sum(result['frames_processed'] for result in ok)
+    video_seconds = sum(result['video_seconds'] or 0 for result in ok)
+    summary = {
+        'detector': args.detector,
+        'mode': args.mode,
+        'workers': workers,
+        'files': len(videos),
+        'failed': len(results) - len(ok),
+        'frames_processed': total_frames,
+        'detections': sum(result['detections'] for result in ok),
+        'wall_seconds': wall,
+        'fps': total_frames / wall if wall else 0,
+        'realtime_factor': video_seconds / wall if wall else 0,
+        'results': results
+    }
+    
+    with open(os.path.join(args.output_dir, 'summary.json'), 'w') as f:
+        json.dump(summary, f, indent=2)
+    
+    print(f"\nProcessed {total_frames} frames from {len(ok)}/{len(videos)} files in {wall:.1f}s")
+    print(f"Throughput: {summary['fps']:.1f} fps overall, {summary['realtime_factor']:.1f}x real time")
+    print(f"Results saved to {args.output_dir}/")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
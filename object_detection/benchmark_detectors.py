@@ -0,0 +1,323 @@
+import argparse
+import json
+import multiprocessing as mp
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+
+# (target, detector method) pairs the suite can time; each case runs in a fresh process
+CASES = [
+    ('opencv', 'detect_faces_detailed'),
+    ('opencv', 'recognize_faces'),
+    ('opencv', 'detect_motion_advanced'),
+    ('opencv', 'detect_people'),
+    ('opencv', 'detect_colors'),
+    ('combined', 'detect_faces'),
+    ('combined', 'detect_objects_basic'),
+    ('yolo', 'detect_objects')
+]
+
+# Methods that only do work when the frame has faces in it
+FACE_METHODS = ('detect_faces_detailed', 'recognize_faces', 'detect_faces')
+
+RESOLUTIONS = {
+    '480p': (640, 480),
+    '720p': (1280, 720),
+    '1080p': (1920, 1080)
+}
+
+def draw_face(size):
+    """A plain cartoon face (skin oval, brows, eyes, nose, mouth) that the Haar cascade finds"""
+    import cv2
+    import numpy as np
+    face = np.full((size, size, 3), 60, dtype=np.uint8)
+    cv2.ellipse(face, (size // 2, int(size * 0.52)), (int(size * 0.36), int(size * 0.47)), 0, 0, 360, (150, 170, 210), -1)
+    for x in (int(size * 0.34), int(size * 0.66)):
+        cv2.ellipse(face, (x, int(size * 0.30)), (int(size * 0.11), int(size * 0.03)), 0, 0, 360, (40, 40, 50), -1)
+        cv2.ellipse(face, (x, int(size * 0.40)), (int(size * 0.08), int(size * 0.04)), 0, 0, 360, (240, 240, 240), -1)
+        cv2.circle(face, (x, int(size * 0.40)), int(size * 0.035), (30, 20, 20), -1)
+    cv2.ellipse(face, (size // 2, int(size * 0.58)), (int(size * 0.05), int(size * 0.1)), 0, 0, 360, (120, 140, 180), -1)
+    cv2.ellipse(face, (size // 2, int(size * 0.76)), (int(size * 0.14), int(size * 0.04)), 0, 0, 360, (60, 60, 140), -1)
+    return cv2.GaussianBlur(face, (0, 0), size / 100)
+
+def synthetic_frames(width, height, count, seed=0, face_image=None):
+    """Deterministic frames: a fixed textured background with coloured shapes and two faces moving across it
+    
+    The faces are drawn (see draw_face) unless face_image, a photo, is given; the HOG and
+    dlib-based detectors may need a real photo to find anything.
+    """
+    import cv2
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    photo = cv2.imread(face_image) if face_image else None
+    if face_image and photo is None:
+        raise ValueError(f"Could not read face image {face_image!r}")
+    background = cv2.GaussianBlur(rng.integers(40, 200, (height, width, 3), dtype=np.uint8), (0, 0), 3)
+    
+    # Red, blue, green and yellow blobs (the colour detector's ranges) plus a grey, person-shaped one
+    shapes = []
+    for color in [(0, 0, 220), (220, 60, 0), (0, 200, 0), (0, 220, 220), (128, 128, 128)]:
+        size = int(rng.integers(height // 12, height // 5))
+        shapes.append({
+            'color': color,
+            'size': size,
+            'position': rng.random(2) * [width - size, height - size],
+            'velocity': (rng.random(2) - 0.5) * [width / 40, height / 40]
+        })
+    # Faces last, so they are drawn over the shapes; they drift slowly, as people do
+    for size in (height // 3, height // 4):
+        face = draw_face(size) if photo is None else cv2.resize(photo, (size, size))
+        shapes.append({
+            'face': face,
+            'size': size,
+            'position': rng.random(2) * [width - size, height - size],
+            'velocity': (rng.random(2) - 0.5) * [width / 120, height / 120]
+        })
+    
+    for _ in range(count):
+        frame = background.copy()
+        for shape in shapes:
+            shape['position'] = shape['position'] + shape['velocity']
+            for axis, limit in ((0, width - shape['size']), (1, height - shape['size'])):
+                # Bounce off the frame edges
+                if not 0 <= shape['position'][axis] <= limit:
+                    shape['velocity'][axis] *= -1
+                    shape['position'][axis] = min(max(shape['position'][axis], 0), limit)
+            x, y = shape['position'].astype(int)
+            if 'face' in shape:
+                frame[y:y + shape['size'], x:x + shape['size']] = shape['face']
+            elif shape['color'] == (128, 128, 128):
+                cv2.ellipse(frame, (x + shape['size'] // 4, y + shape['size'] // 2),
+                            (shape['size'] // 4, shape['size'] // 2), 0, 0, 360, shape['color'], -1)
+            else:
+                cv2.rectangle(frame, (x, y), (x + shape['size'], y + shape['size']), shape['color'], -1)
+        yield frame
+
+def video_frames(path, width, height, count):
+    """The first count frames of a local video, resized to the benchmark resolution"""
+    import cv2
+    cap = cv2.VideoCapture(path)
+    read = 0
+    while read < count:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if frame.shape[1] != width or frame.shape[0] != height:
+            frame = cv2.resize(frame, (width, height))
+        read += 1
+        yield frame
+    cap.release()
+
+def enroll_synthetic_gallery(gallery, size, seed=0):
+    """Replace the gallery with size deterministic random encodings, independent of known_faces/"""
+    import numpy as np
+    from face_gallery import GallerySnapshot
+    rng = np.random.default_rng(seed)
+    # Real encodings have a norm of about 1
+    vectors = rng.normal(size=(size, 128))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    matcher = gallery.matcher.copy()
+    matcher.build(vectors)
+    names = [f'person_{i:04d}' for i in range(size)]
+    gallery.snapshot = GallerySnapshot(names, [f'{name}.jpg' for name in names], matcher)
+
+def build_target(target, model, gallery_size=100, seed=0):
+    if target == 'opencv':
+        from opencv_only_system import OpenCVDetectionSystem
+        system = OpenCVDetectionSystem(parallel_stages=False, load_gallery=False, watch_gallery=False)
+        enroll_synthetic_gallery(system.face_gallery, gallery_size, seed)
+        return system
+    if target == 'combined':
+        from combined_system import SmartSecuritySystem
+        system = SmartSecuritySystem()
+        system.gallery_watcher.stop()
+        system.event_writer.close()
+        enroll_synthetic_gallery(system.face_gallery, gallery_size, seed)
+        return system
+    from object_detection import ObjectDetector
+    detector = ObjectDetector(model)
+    if not detector.load():
+        return None
+    return detector
+
+def percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def run_case(case):
+    """Worker process: time one detector method over one input; returns a result dict"""
+    if case['target'] != 'combined':
+        return time_case(case)
+    # SmartSecuritySystem creates known_faces/ and detection_log.jsonl in the working directory
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix='benchmark_') as workdir:
+        os.chdir(workdir)
+        try:
+            return time_case(case)
+        finally:
+            os.chdir(cwd)
+
+def time_case(case):
+    import cv2
+    import resource
+    from frame_context import FrameContext
+    
+    if case['threads'] is not None:
+        cv2.setNumThreads(case['threads'])
+    result = {key: case[key] for key in ('target', 'method', 'input', 'resolution')}
+    
+    if case['method'] == 'recognize_faces' and not case['gallery_size']:
+        # recognize_faces returns at once with nobody enrolled; that time means nothing
+        result['skipped'] = 'no known faces'
+        return result
+    target = build_target(case['target'], case['model'], case['gallery_size'], case['seed'])
+    if target is None:
+        result['skipped'] = 'model not available'
+        return result
+    if case['target'] != 'yolo':
+        result['gallery_size'] = case['gallery_size']
+    method = getattr(target, case['method'])
+    
+    width, height = RESOLUTIONS[case['resolution']]
+    total = case['warmup'] + case['frames']
+    if case['input'] == 'synthetic':
+        frames = synthetic_frames(width, height, total, seed=case['seed'], face_image=case['face_image'])
+    else:
+        frames = video_frames(case['input'], width, height, total)
+    
+    ctx = FrameContext()
+    latencies = []
+    detections = 0
+    for index, frame in enumerate(frames):
+        start = time.perf_counter()
+        if case['target'] == 'yolo':
+            found = method(frame)
+        else:
+            # A fresh context per frame, as the live loops do (gray/HSV are computed inside the timing)
+            found = method(frame, ctx.reset(frame))
+        elapsed = (time.perf_counter() - start) * 1000
+        if index >= case['warmup']:
+            latencies.append(elapsed)
+            detections += len(found)
+    
+    if not latencies:
+        result['skipped'] = 'no frames'
+        return result
+    if case['method'] in FACE_METHODS and not detections:
+        # Timing a face detector that found nothing measures only its cheapest path
+        result['error'] = "no faces found (try --face-image with a photo)"
+        return result
+    
+    ordered = sorted(latencies)
+    result.update({
+        'frames': len(latencies),
+        'fps': 1000 * len(latencies) / sum(latencies),
+        'mean_ms': sum(latencies) / len(latencies),
+        'p50_ms': percentile(ordered, 0.50),
+        'p95_ms': percentile(ordered, 0.95),
+        'p99_ms': percentile(ordered, 0.99),
+        # ru_maxrss is in KiB on Linux (bytes on macOS)
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if platform.system() == 'Darwin' else 1024),
+        'detections': detections
+    })
+    return result
+
+def case_key(result):
+    return f"{result['target']}.{result['method']} @ {os.path.basename(result['input'])} {result['resolution']}"
+
+def environment():
+    import cv2
+    import numpy as np
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'commit': commit,
+        'python': platform.python_version(),
+        'opencv': cv2.__version__,
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'cpus': os.cpu_count()
+    }
+
+def compare(results, baseline_path):
+    """Print fps and p95 changes against an earlier results file"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    before = {case_key(result): result for result in baseline['results'] if 'fps' in result}
+    print(f"\nCompared with {baseline_path} (commit {baseline['environment'].get('commit')}):")
+    print(f"{'case':<58} {'fps':>16} {'p95 ms':>18}")
+    for result in results:
+        old = before.get(case_key(result))
+        if old is None or 'fps' not in result:
+            continue
+        fps_change = (result['fps'] / old['fps'] - 1) * 100
+        p95_change = (result['p95_ms'] / old['p95_ms'] - 1) * 100 if old['p95_ms'] else 0.0
+        print(f"{case_key(result):<58} {old['fps']:>6.1f} -> {result['fps']:>6.1f} ({fps_change:+4.0f}%) "
+              f"{old['p95_ms']:>6.1f} -> {result['p95_ms']:>6.1f} ({p95_change:+4.0f}%)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Time each detector method over deterministic inputs")
+    parser.add_argument('--cases', nargs='+', help="target.method names to run (default: all), e.g. opencv.detect_people")
+    parser.add_argument('--resolutions', nargs='+', choices=list(RESOLUTIONS), default=['480p', '720p'])
+    parser.add_argument('--videos', nargs='*', default=[], help="Local video files to run besides the synthetic clip")
+    parser.add_argument('--frames', type=int, default=100, help="Timed frames per case")
+    parser.add_argument('--warmup', type=int, default=10, help="Untimed frames before timing starts")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--face-image', help="Photo of a face to put in the synthetic clip instead of a drawn one")
+    parser.add_argument('--threads', type=int, help="cv2.setNumThreads for every case (default: OpenCV's choice)")
+    parser.add_argument('--model', default='yolov3', help="ObjectDetector model variant")
+    parser.add_argument('--gallery-size', type=int, default=100, help="Synthetic known faces enrolled for the face cases")
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--compare', help="Earlier results file to compare against")
+    args = parser.parse_args()
+    
+    cases = CASES
+    if args.cases:
+        cases = [case for case in CASES if f'{case[0]}.{case[1]}' in args.cases]
+        if not cases:
+            parser.error(f"No matching cases. Available: {', '.join(f'{t}.{m}' for t, m in CASES)}")
+    
+    # One fresh process per case, so peak RSS and caches belong to that case alone
+    context = mp.get_context('spawn')
+    results = []
+    for target, method in cases:
+        for source in ['synthetic'] + args.videos:
+            for resolution in args.resolutions:
+                case = {
+                    'target': target, 'method': method, 'resolution': resolution,
+                    # Absolute, since the combined cases run in a temporary directory
+                    'input': source if source == 'synthetic' else os.path.abspath(source),
+                    'face_image': args.face_image and os.path.abspath(args.face_image),
+                    'frames': args.frames, 'warmup': args.warmup, 'seed': args.seed,
+                    'threads': args.threads, 'model': args.model, 'gallery_size': args.gallery_size
+                }
+                with context.Pool(1) as pool:
+                    try:
+                        result = pool.apply(run_case, (case,))
+                    except Exception as e:
+                        result = {**{key: case[key] for key in ('target', 'method', 'input', 'resolution')},
+                                  'error': str(e)}
+                results.append(result)
+                
+                if 'fps' in result:
+                    print(f"{case_key(result):<58} {result['fps']:>7.1f} fps  p50 {result['p50_ms']:>6.1f}  "
+                          f"p95 {result['p95_ms']:>6.1f}  p99 {result['p99_ms']:>6.1f} ms  "
+                          f"RSS {result['peak_rss_mb']:>5.0f} MB")
+                else:
+                    print(f"{case_key(result):<58} {result.get('skipped') or 'ERROR ' + result.get('error', '')}")
+    
+    with open(args.output, 'w') as f:
+        json.dump({'environment': environment(), 'settings': vars(args), 'results': results}, f, indent=2)
+    print(f"Results saved to {args.output}")
+    
+    if args.compare:
+        compare(results, args.compare)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
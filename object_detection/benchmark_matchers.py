@@ -0,0 +1,97 @@
+import argparse
+import json
+import time
+import numpy as np
+from face_matchers import BruteForceMatcher, IVFMatcher
+
+def make_gallery(size, seed=0, spread=0.35, noise=0.04):
+    """Synthetic face-like encodings: identities scattered around a few dozen 'demographic' clusters"""
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(scale=spread, size=(64, 128)).astype(np.float32)
+    gallery = centres[rng.integers(0, len(centres), size)] + rng.normal(scale=spread / 2, size=(size, 128)).astype(np.float32)
+    return gallery, rng, noise
+
+def load_cached_gallery(cache_path):
+    """Real encodings from a known_faces encoding cache"""
+    with open(cache_path, 'r') as f:
+        entries = json.load(f)['entries']
+    return np.array([e['encoding'] for e in entries.values() if e['encoding'] is not None], dtype=np.float32)
+
+def time_search(matcher, queries, batch_size, repeats):
+    """Return (indices, median ms per batch)"""
+    timings = []
+    indices = []
+    for _ in range(repeats):
+        indices = []
+        for start in range(0, len(queries), batch_size):
+            batch_start = time.perf_counter()
+            batch_indices, _ = matcher.search(queries[start:start + batch_size])
+            timings.append((time.perf_counter() - batch_start) * 1000)
+            indices.append(batch_indices)
+    return np.concatenate(indices), float(np.median(timings))
+
+def run_benchmark(gallery, rng, noise, args):
+    """Compare exact and IVF matchers on one gallery"""
+    targets = rng.integers(0, len(gallery), args.queries)
+    queries = gallery[targets] + rng.normal(scale=noise, size=(args.queries, 128)).astype(np.float32)
+    
+    exact = BruteForceMatcher()
+    exact.build(gallery)
+    exact_indices, exact_ms = time_search(exact, queries, args.batch_size, args.repeats)
+    results = [{'matcher': 'exact', 'gallery': len(gallery), 'recall@1': 1.0, 'ms_per_batch': exact_ms}]
+    
+    for nprobe in args.nprobe:
+        build_start = time.perf_counter()
+        ivf = IVFMatcher(nlist=args.nlist, nprobe=nprobe)
+        # Build from the first half and insert the rest incrementally, as enrollment would
+        half = len(gallery) // 2
+        ivf.build(gallery[:half])
+        ivf.add(gallery[half:])
+        build_s = time.perf_counter() - build_start
+        
+        ivf_indices, ivf_ms = time_search(ivf, queries, args.batch_size, args.repeats)
+        results.append({
+            'matcher': f'ivf(nlist={len(ivf.centroids) if ivf.trained else 0}, nprobe={nprobe})',
+            'gallery': len(gallery),
+            'recall@1': float(np.mean(ivf_indices == exact_indices)),
+            'ms_per_batch': ivf_ms,
+            'build_s': build_s
+        })
+    
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall/latency benchmark of the approximate face matcher against exact search")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[5000, 20000, 50000, 100000])
+    parser.add_argument('--cache', help="Use real encodings from a known_faces/.encodings_cache.json instead of synthetic ones")
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--batch-size', type=int, default=10, help="Faces per frame")
+    parser.add_argument('--nlist', type=int, default=None)
+    parser.add_argument('--nprobe', type=int, nargs='+', default=[4, 8, 16])
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--output', help="Write results as JSON")
+    args = parser.parse_args()
+    
+    if args.cache:
+        gallery = load_cached_gallery(args.cache)
+        galleries = [(gallery, np.random.default_rng(0), 0.04)]
+    else:
+        galleries = [make_gallery(size) for size in args.sizes]
+    
+    all_results = []
+    print(f"{'matcher':<28} {'gallery':>8} {'recall@1':>9} {'ms/batch':>9} {'speedup':>8}")
+    for gallery, rng, noise in galleries:
+        results = run_benchmark(gallery, rng, noise, args)
+        exact_ms = results[0]['ms_per_batch']
+        for result in results:
+            print(f"{result['matcher']:<28} {result['gallery']:>8} {result['recall@1']:>9.3f} "
+                  f"{result['ms_per_batch']:>9.3f} {exact_ms / result['ms_per_batch']:>7.1f}x")
+        all_results.extend(results)
+    
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(all_results, f, indent=2)
+        print(f"Results saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
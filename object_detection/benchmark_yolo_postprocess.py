@@ -0,0 +1,132 @@
+import argparse
+import cv2
+import numpy as np
+import time
+from object_detection import decode_yolo
+
+# YOLOv3 at 416x416: 13x13, 26x26 and 52x52 grids with 3 anchors each, 80 COCO classes
+GRIDS = (13, 26, 52)
+NUM_CLASSES = 80
+
+def synthetic_outputs(num_objects=12, seed=0):
+    """YOLOv3-shaped outputs: low scores everywhere, a few confident clusters of rows"""
+    rng = np.random.default_rng(seed)
+    outputs = []
+    for grid in GRIDS:
+        rows = grid * grid * 3
+        output = np.zeros((rows, 5 + NUM_CLASSES), np.float32)
+        output[:, :4] = rng.random((rows, 4)) * [1, 1, 0.3, 0.3]
+        output[:, 4] = rng.random(rows) * 0.05
+        output[:, 5:] = rng.random((rows, NUM_CLASSES)) * 0.05
+        for _ in range(num_objects):
+            # Neighbouring cells and anchors all see the same object
+            start = rng.integers(0, rows - 6)
+            class_id = rng.integers(0, NUM_CLASSES)
+            cx, cy, w, h = rng.random(4) * [1, 1, 0.3, 0.3]
+            for row in range(start, start + 6):
+                output[row, :4] = [cx + rng.normal(0, 0.005), cy + rng.normal(0, 0.005), w, h]
+                output[row, 4] = 0.9
+                output[row, 5 + class_id] = 0.6 + rng.random() * 0.35
+        outputs.append(output)
+    return outputs
+
+def record_outputs(path, count, variant='yolov3'):
+    """Run the real model over a video (or image) and keep the raw output tensors of each frame"""
+    from model_registry import ModelRegistry
+    model = ModelRegistry().model(variant)
+    if not model.load():
+        raise SystemExit("YOLO model not available; run without --record to use synthetic outputs")
+    
+    cap = cv2.VideoCapture(path)
+    recorded = []
+    while len(recorded) < count:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        recorded.append((frame.shape[1], frame.shape[0], [output.copy() for output in model.forward([frame])]))
+    cap.release()
+    return recorded
+
+def decode_loop(outputs, width, height, confidence_threshold=0.5, nms_threshold=0.4):
+    """The original per-row Python decode, kept as the reference"""
+    boxes = []
+    confidences = []
+    class_ids = []
+    
+    for output in outputs:
+        for detection in output:
+            scores = detection[5:]
+            class_id = np.argmax(scores)
+            confidence = scores[class_id]
+            
+            if confidence > confidence_threshold:
+                center_x = int(detection[0] * width)
+                center_y = int(detection[1] * height)
+                w = int(detection[2] * width)
+                h = int(detection[3] * height)
+                
+                x = int(center_x - w / 2)
+                y = int(center_y - h / 2)
+                
+                boxes.append([x, y, w, h])
+                confidences.append(float(confidence))
+                class_ids.append(class_id)
+    
+    indices = cv2.dnn.NMSBoxes(boxes, confidences, confidence_threshold, nms_threshold)
+    return [(boxes[i], class_ids[i]) for i in np.asarray(indices, dtype=np.int64).reshape(-1)]
+
+def time_ms(function, frames, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for width, height, outputs in frames:
+            function(outputs, width, height)
+        elapsed = (time.perf_counter() - start) * 1000 / len(frames)
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="Time YOLO post-processing: per-row loop vs vectorized decode")
+    parser.add_argument('--outputs', help="Recorded output tensors (.npz written by --save)")
+    parser.add_argument('--record', help="Video or image to record real output tensors from (needs the YOLO model)")
+    parser.add_argument('--model', default='yolov3', help="YOLO variant to record with")
+    parser.add_argument('--frames', type=int, default=20, help="Frames to record or synthesize")
+    parser.add_argument('--save', help="Write the tensors used to this .npz for later runs")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    
+    if args.outputs:
+        data = np.load(args.outputs)
+        sizes = data['sizes']
+        frames = [(int(w), int(h), [data[f'frame{i}_output{j}'] for j in range(int(data['layers']))])
+                  for i, (w, h) in enumerate(sizes)]
+    elif args.record:
+        frames = record_outputs(args.record, args.frames, args.model)
+    else:
+        frames = [(1280, 720, synthetic_outputs(seed=i)) for i in range(args.frames)]
+    
+    if args.save:
+        tensors = {f'frame{i}_output{j}': output for i, (_, _, outputs) in enumerate(frames) for j, output in enumerate(outputs)}
+        np.savez_compressed(args.save, sizes=np.array([(w, h) for w, h, _ in frames]), layers=len(frames[0][2]), **tensors)
+    
+    # Both must keep exactly the same boxes
+    for width, height, outputs in frames:
+        boxes, _, class_ids = decode_yolo(outputs, width, height)
+        expected = decode_loop(outputs, width, height)
+        if [(list(box), class_id) for box, class_id in zip(boxes.tolist(), class_ids.tolist())] != \
+                [(box, int(class_id)) for box, class_id in expected]:
+            raise SystemExit("Vectorized decode disagrees with the reference loop")
+    
+    rows = sum(len(output) for output in frames[0][2])
+    loop_ms = time_ms(decode_loop, frames, args.repeat)
+    vector_ms = time_ms(decode_yolo, frames, args.repeat)
+    batched_ms = time_ms(lambda outputs, width, height: decode_yolo(outputs, width, height, class_nms=True),
+                         frames, args.repeat)
+    
+    print(f"{len(frames)} frames, {rows} output rows each")
+    print(f"  per-row loop:          {loop_ms:8.2f} ms/frame")
+    print(f"  vectorized:            {vector_ms:8.2f} ms/frame ({loop_ms / vector_ms:.0f}x faster)")
+    print(f"  vectorized, class NMS: {batched_ms:8.2f} ms/frame")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
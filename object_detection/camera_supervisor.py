@@ -0,0 +1,307 @@
+import argparse
+import multiprocessing as mp
+import os
+import queue
+import re
+import time
+from datetime import datetime
+from event_log import JsonlEventWriter
+
+# Seconds to wait before restarting a crashed camera worker; doubles per crash up to the max
+RESTART_DELAY = 1.0
+MAX_RESTART_DELAY = 30.0
+
+# Modes whose workers need the known faces
+RECOGNITION_MODES = ('recognition', 'all')
+
+def parse_source(spec, index):
+    """'front=rtsp://...', '0' or 'clip.mp4' -> (camera_id, source)"""
+    match = re.match(r'^(\w+)=(.+)$', spec)
+    if match and not re.match(r'^\w+://', spec):
+        camera_id, source = match.groups()
+    else:
+        camera_id, source = f'cam{index}', spec
+    return camera_id, int(source) if source.isdigit() else source
+
+def post(messages, message):
+    """Send a message to the supervisor without ever blocking the camera loop"""
+    try:
+        messages.put_nowait(message)
+        return True
+    except queue.Full:
+        return False
+
+def camera_worker(camera_id, source, options, messages, stop):
+    """Worker process: run one camera's capture and detection pipeline until told to stop"""
+    import cv2
+    from capture import ThreadedCapture
+    from frame_context import FrameContext
+    from opencv_only_system import OpenCVDetectionSystem
+    
+    # Anything that is neither a device index nor a stream URL is a video file
+    is_file = isinstance(source, str) and not re.match(r'^\w+://', source)
+    if is_file and not os.path.isfile(source):
+        # Restarting won't make a missing file appear; report it and finish
+        post(messages, ('failed', camera_id, f"no such file {source!r}"))
+        return
+    
+    # Cameras are spread across processes; keep each one to a single OpenCV thread
+    cv2.setNumThreads(1)
+    # The supervisor already encoded the gallery into its cache, so workers only read it
+    system = OpenCVDetectionSystem(
+        parallel_stages=False,
+        motion_gating=options['motion_gating'],
+        face_tracking=options['face_tracking'],
+        # A file has no frame deadline: every detector runs on every frame
+        latency_budget_ms=None if is_file else options['budget_ms'],
+        load_gallery=options['mode'] in RECOGNITION_MODES,
+        watch_gallery=False,
+        gallery_workers=1
+    )
+    
+    # Live sources skip to the newest frame; a file is read in full, however long detection takes
+    cap = ThreadedCapture(source, policy='block' if is_file else 'latest').start()
+    if not cap.isOpened():
+        cap.release()
+        if is_file:
+            post(messages, ('failed', camera_id, f"could not open video {source!r}"))
+            return
+        raise RuntimeError(f"Could not open source {source!r}")
+    
+    ctx = FrameContext()
+    frame_count = 0
+    dropped_events = 0
+    window_start = time.perf_counter()
+    window_frames = 0
+    latencies = []
+    
+    try:
+        while not stop.is_set():
+            ret, frame = cap.read(timeout=1.0)
+            if not ret:
+                if cap.ended:
+                    break
+                continue
+            
+            _, stage_results = system.process_scheduled(frame, options['mode'], ctx.reset(frame))
+            detections = [record for detections in stage_results for record in detections]
+            
+            now = time.perf_counter()
+            latencies.append((now - cap.last_frame_time) * 1000)
+            window_frames += 1
+            
+            if detections and not post(messages, ('event', {
+                'camera': camera_id,
+                'timestamp': datetime.now().isoformat(),
+                'frame': frame_count,
+                'detections': detections
+            })):
+                dropped_events += 1
+            frame_count += 1
+            
+            if now - window_start >= 1.0:
+                latencies.sort()
+                post(messages, ('stats', camera_id, {
+                    'fps': window_frames / (now - window_start),
+                    'latency_ms': latencies[len(latencies) // 2],
+                    'latency_max_ms': latencies[-1],
+                    'frames': frame_count,
+                    'capture_dropped': cap.frames_dropped,
+                    'events_dropped': dropped_events,
+                    'pid': os.getpid()
+                }))
+                window_start = now
+                window_frames = 0
+                latencies = []
+    finally:
+        cap.release()
+        if system.gallery_watcher is not None:
+            system.gallery_watcher.stop()
+    
+    if not stop.is_set() and not is_file:
+        # A live camera that stops delivering frames counts as a crash and gets restarted
+        raise RuntimeError(f"Source {source!r} stopped delivering frames")
+
+class CameraProcess:
+    """Supervisor-side state of one camera: its worker process, restarts and last stats"""
+    
+    def __init__(self, camera_id, source):
+        self.camera_id = camera_id
+        self.source = source
+        self.process = None
+        self.restarts = 0
+        self.restart_at = None
+        self.finished = False
+        self.error = None  # why a camera that can't be retried gave up
+        self.stats = {}
+        self.last_seen = None
+        self.events = 0
+    
+    @property
+    def state(self):
+        if self.finished:
+            return 'failed' if self.error else 'finished'
+        if self.process is not None and self.process.is_alive():
+            return 'running'
+        return 'restarting'
+
+class CameraSupervisor:
+    """Runs one detection worker process per camera and merges their events
+    
+    Crashed (or stalled) workers are restarted with exponential backoff; every detection
+    event is tagged with its camera ID and appended to a single JSONL stream, and per-camera
+    fps and capture-to-detection latency are reported periodically.
+    """
+    
+    def __init__(self, sources, options, log_path='camera_events.jsonl', stats_interval=5.0, stall_timeout=30.0):
+        self.context = mp.get_context('spawn')
+        self.cameras = [CameraProcess(camera_id, source) for camera_id, source in sources]
+        camera_ids = [camera.camera_id for camera in self.cameras]
+        if len(set(camera_ids)) != len(camera_ids):
+            raise ValueError(f"Camera IDs must be unique: {', '.join(camera_ids)}")
+        self.options = options
+        self.stats_interval = stats_interval
+        self.stall_timeout = stall_timeout
+        self.messages = self.context.Queue(maxsize=10000)
+        self.stop_event = self.context.Event()
+        self.event_writer = JsonlEventWriter(log_path)
+    
+    def launch(self, camera):
+        camera.process = self.context.Process(
+            target=camera_worker,
+            args=(camera.camera_id, camera.source, self.options, self.messages, self.stop_event),
+            name=f'camera-{camera.camera_id}',
+            daemon=True
+        )
+        camera.process.start()
+        camera.restart_at = None
+        # Stall detection starts with the worker's first message (loading known faces can take a while)
+        camera.last_seen = None
+    
+    def check_workers(self):
+        """Restart crashed or stalled workers, with backoff"""
+        now = time.monotonic()
+        for camera in self.cameras:
+            if camera.finished:
+                continue
+            
+            process = camera.process
+            if process.is_alive():
+                if camera.last_seen is not None and now - camera.last_seen > self.stall_timeout:
+                    print(f"[{camera.camera_id}] no progress for {self.stall_timeout:.0f}s, restarting")
+                    process.terminate()
+                    process.join(timeout=5)
+                else:
+                    continue
+            
+            if camera.restart_at is None:
+                if process.exitcode == 0:
+                    # Collect a final 'failed' message before deciding how it ended
+                    self.drain(timeout=0)
+                    camera.finished = True
+                    if camera.error:
+                        print(f"[{camera.camera_id}] failed: {camera.error}")
+                    else:
+                        print(f"[{camera.camera_id}] finished")
+                    continue
+                delay = min(MAX_RESTART_DELAY, RESTART_DELAY * 2 ** camera.restarts)
+                camera.restart_at = now + delay
+                print(f"[{camera.camera_id}] worker exited with code {process.exitcode}, restarting in {delay:.0f}s")
+            elif now >= camera.restart_at:
+                camera.restarts += 1
+                self.launch(camera)
+    
+    def drain(self, timeout=0.5):
+        """Move worker messages into the event log and the per-camera stats"""
+        cameras = {camera.camera_id: camera for camera in self.cameras}
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                message = self.messages.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                return
+            
+            if message[0] == 'event':
+                event = message[1]
+                camera = cameras[event['camera']]
+                camera.events += 1
+                camera.last_seen = time.monotonic()
+                self.event_writer.write(event)
+            elif message[0] == 'failed':
+                cameras[message[1]].error = message[2]
+            elif message[0] == 'stats':
+                camera = cameras[message[1]]
+                camera.stats = message[2]
+                camera.last_seen = time.monotonic()
+    
+    def status_table(self):
+        lines = [f"{'camera':<12} {'state':<11} {'fps':>6} {'latency':>9} {'max':>8} {'events':>8} {'restarts':>8}"]
+        for camera in self.cameras:
+            stats = camera.stats
+            lines.append(f"{camera.camera_id:<12} {camera.state:<11} {stats.get('fps', 0):>6.1f} "
+                         f"{stats.get('latency_ms', 0):>7.0f}ms {stats.get('latency_max_ms', 0):>6.0f}ms "
+                         f"{camera.events:>8} {camera.restarts:>8}")
+        return "\n".join(lines)
+    
+    def run(self):
+        """Start every camera and supervise until Ctrl+C or all file sources have finished"""
+        self.event_writer.start()
+        if self.options['mode'] in RECOGNITION_MODES:
+            # Encode new photos once here, instead of in every camera worker at the same time
+            from face_gallery import FaceGallery
+            FaceGallery("known_faces").load()
+        for camera in self.cameras:
+            self.launch(camera)
+        print(f"Supervising {len(self.cameras)} cameras (Ctrl+C to stop). Events go to {self.event_writer.path}")
+        
+        next_report = time.monotonic() + self.stats_interval
+        try:
+            while not all(camera.finished for camera in self.cameras):
+                self.drain()
+                self.check_workers()
+                if time.monotonic() >= next_report:
+                    print(self.status_table())
+                    next_report = time.monotonic() + self.stats_interval
+        except KeyboardInterrupt:
+            print("\nStopping cameras...")
+        finally:
+            self.stop()
+    
+    def stop(self):
+        self.stop_event.set()
+        # Keep draining while the workers exit: a worker can't finish while its queued messages are unread
+        processes = [camera.process for camera in self.cameras if camera.process is not None]
+        deadline = time.monotonic() + 5
+        while any(process.is_alive() for process in processes) and time.monotonic() < deadline:
+            self.drain(timeout=0.1)
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+            process.join(timeout=1)
+        # Pick up events sent while the workers were shutting down
+        self.drain(timeout=0.5)
+        self.event_writer.close()
+        print(self.status_table())
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the OpenCV detection pipeline on several cameras, one process each")
+    parser.add_argument('sources', nargs='+', help="Camera index, stream URL or video file, optionally named: front=0")
+    parser.add_argument('--mode', default='all', choices=['face', 'recognition', 'motion', 'people', 'color', 'all'])
+    parser.add_argument('--motion-gating', action='store_true')
+    parser.add_argument('--face-tracking', action='store_true')
+    parser.add_argument('--budget-ms', type=float, default=66)
+    parser.add_argument('--log', default='camera_events.jsonl', help="Combined JSONL event stream")
+    parser.add_argument('--stats-interval', type=float, default=5.0)
+    args = parser.parse_args()
+    
+    sources = [parse_source(spec, i) for i, spec in enumerate(args.sources)]
+    options = {
+        'mode': args.mode,
+        'motion_gating': args.motion_gating,
+        'face_tracking': args.face_tracking,
+        'budget_ms': args.budget_ms
+    }
+    CameraSupervisor(sources, options, log_path=args.log, stats_interval=args.stats_interval).run()
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
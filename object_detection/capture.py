@@ -0,0 +1,109 @@
+import cv2
+import threading
+import time
+from collections import deque
+
+DROP_POLICIES = ('latest', 'drop_oldest', 'block')
+
+class ThreadedCapture:
+    """Reads a cv2.VideoCapture on its own thread into a bounded frame buffer
+    
+    Drop-in for VideoCapture in the run loops: read() returns (ret, frame).
+    'latest' keeps only the newest frame, so a slow detector always gets the freshest one;
+    'drop_oldest' keeps up to buffer_size frames and evicts the oldest when full.
+    'block' keeps up to buffer_size frames and pauses reading when full, so no frame is
+    lost (for video files, which would otherwise decode far faster than real time).
+    """
+    
+    def __init__(self, source=0, policy='latest', buffer_size=4):
+        if policy not in DROP_POLICIES:
+            raise ValueError(f"Unknown drop policy '{policy}'. Choose from: {', '.join(DROP_POLICIES)}")
+        
+        self.source = source
+        self.policy = policy
+        self.buffer = deque(maxlen=1 if policy == 'latest' else buffer_size)
+        self.condition = threading.Condition()
+        self.cap = cv2.VideoCapture(source)
+        # Kept apart from cap.isOpened(): the reader thread releases cap as soon as a file ends
+        self.opened = self.cap.isOpened()
+        self.thread = None
+        self.running = False
+        self.ended = False
+        
+        self.frames_captured = 0
+        self.frames_dropped = 0
+        self.frames_read = 0
+        self.last_frame_time = None  # perf_counter() when the last returned frame was grabbed
+    
+    def isOpened(self):
+        return self.opened
+    
+    def start(self):
+        """Start the capture thread"""
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name=f'capture-{self.source}', daemon=True)
+        self.thread.start()
+        return self
+    
+    def run(self):
+        try:
+            self.capture_frames()
+        finally:
+            # Released here, so it never happens under a read that is still in progress
+            self.cap.release()
+    
+    def capture_frames(self):
+        while self.running:
+            ret, frame = self.cap.read()
+            captured_at = time.perf_counter()
+            with self.condition:
+                if not ret:
+                    self.ended = True
+                    self.condition.notify_all()
+                    break
+                if self.policy == 'block':
+                    self.condition.wait_for(lambda: len(self.buffer) < self.buffer.maxlen or not self.running)
+                    if not self.running:
+                        break
+                if len(self.buffer) == self.buffer.maxlen:
+                    # deque(maxlen) evicts the oldest frame on append
+                    self.frames_dropped += 1
+                self.buffer.append((frame, captured_at))
+                self.frames_captured += 1
+                self.condition.notify()
+    
+    def read(self, timeout=None):
+        """Wait for the next buffered frame; (False, None) once the stream has ended"""
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.buffer or self.ended or not self.running, timeout):
+                return False, None
+            if not self.buffer:
+                return False, None
+            frame, self.last_frame_time = self.buffer.popleft()
+            self.frames_read += 1
+            if self.policy == 'block':
+                # Wake the capture thread waiting for room
+                self.condition.notify_all()
+            return True, frame
+    
+    def stats(self):
+        """Capture counters for status lines"""
+        return {
+            'captured': self.frames_captured,
+            'read': self.frames_read,
+            'dropped': self.frames_dropped,
+            'buffered': len(self.buffer)
+        }
+    
+    def release(self):
+        """Stop the thread; it releases the camera once its current read returns"""
+        with self.condition:
+            self.running = False
+            self.opened = False
+            self.condition.notify_all()
+        if self.thread is None:
+            self.cap.release()
+            return
+        self.thread.join(timeout=2.0)
+        if self.thread.is_alive():
+            print(f"Capture {self.source}: reader still blocked after 2s; it will release the camera when it returns")
\ No newline at end of file
@@ -0,0 +1,97 @@
+import cv2
+import numpy as np
+
+# Colours per lookup group; each group's per-channel LUTs produce one bitmask image (uint8 or uint16)
+GROUP_SIZE = 16
+
+def channel_bits(lower, upper, bit, dtype, size=256):
+    """LUT entries with `bit` set for channel values in [lower, upper] (wrapping when lower > upper)"""
+    values = np.arange(size)
+    if lower <= upper:
+        inside = (values >= lower) & (values <= upper)
+    else:
+        # e.g. red hue 170..10 wraps around 180
+        inside = (values >= lower) | (values <= upper)
+    return np.where(inside, 1 << bit, 0).astype(dtype)
+
+class ColorEngine:
+    """Labels every pixel with its colour in one lookup pass, then finds all blobs at once
+    
+    Each colour sets one bit in per-channel lookup tables for H, S and V; AND-ing the three
+    looked-up images gives every pixel's set of matching colours, and one more table turns
+    that bitmask into a label (the first matching colour wins). The label image is cut
+    along boundaries between different colours so a single contour pass separates all
+    blobs. The cost barely grows with the number of colours.
+    """
+    
+    def __init__(self, color_ranges, min_area=1000, kernel_size=5):
+        # color_ranges: {name: ([h, s, v] lower, [h, s, v] upper)}; hue may wrap (lower > upper)
+        self.names = list(color_ranges)
+        self.min_area = min_area
+        self.kernel = np.ones((kernel_size, kernel_size), np.uint8)
+        self.cross = cv2.getStructuringElement(cv2.MORPH_CROSS, (3, 3))
+        self.shift = ((np.arange(256) - 1) % 256).astype(np.uint8).reshape(1, 256)
+        
+        self.groups = []
+        for start in range(0, len(self.names), GROUP_SIZE):
+            names = self.names[start:start + GROUP_SIZE]
+            # Up to 8 colours fit uint8 masks, whose labels cv2.LUT can look up directly
+            dtype = np.uint8 if len(names) <= 8 else np.uint16
+            luts = [np.zeros(256, dtype) for _ in range(3)]
+            for bit, name in enumerate(names):
+                lower, upper = color_ranges[name]
+                for channel in range(3):
+                    luts[channel] |= channel_bits(lower[channel], upper[channel], bit, dtype)
+            
+            # Bitmask -> label of its lowest set bit (label 0 = no colour)
+            masks = np.arange(1 << len(names))
+            labels = np.zeros(len(masks), np.uint8)
+            for bit in reversed(range(len(names))):
+                labels[(masks >> bit) & 1 == 1] = start + bit + 1
+            if dtype == np.uint8:
+                labels = np.pad(labels, (0, 256 - len(labels))).reshape(1, 256)
+            self.groups.append(([lut.reshape(1, 256) for lut in luts], labels))
+    
+    def label_image(self, hsv):
+        """uint8 image of colour labels (index into names + 1, 0 = none)"""
+        h, s, v = cv2.split(hsv)
+        labels = None
+        for (h_lut, s_lut, v_lut), label_table in self.groups:
+            mask = cv2.bitwise_and(cv2.bitwise_and(cv2.LUT(h, h_lut), cv2.LUT(s, s_lut)), cv2.LUT(v, v_lut))
+            group_labels = cv2.LUT(mask, label_table) if mask.dtype == np.uint8 else label_table[mask]
+            labels = group_labels if labels is None else np.where(labels > 0, labels, group_labels)
+        return labels
+    
+    def detect(self, hsv):
+        """Colour blobs larger than min_area as detection records"""
+        labels = self.label_image(hsv)
+        
+        # Drop specks, as the old per-colour opening did, on all colours at once
+        foreground = cv2.morphologyEx(cv2.compare(labels, 0, cv2.CMP_GT), cv2.MORPH_OPEN, self.kernel)
+        labels = cv2.bitwise_and(labels, foreground)
+        
+        # Cut pixels next to a different colour, so touching blobs of different colours separate:
+        # there the 4-neighbourhood max, or min ignoring background, differs from the pixel's label
+        highest = cv2.dilate(labels, self.cross)
+        shifted = cv2.LUT(labels, self.shift)  # background becomes 255, so erode ignores it
+        same = cv2.bitwise_and(cv2.compare(highest, labels, cv2.CMP_EQ),
+                               cv2.compare(cv2.erode(shifted, self.cross), shifted, cv2.CMP_EQ))
+        foreground = cv2.bitwise_and(foreground, same)
+        
+        # One contour pass over all colours; each blob now holds a single colour
+        contours, _ = cv2.findContours(foreground, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        
+        color_objects = []
+        for contour in contours:
+            area = cv2.contourArea(contour)
+            if area <= self.min_area:
+                continue
+            x, y = contour[0][0]
+            color_name = self.names[labels[y, x] - 1]
+            color_objects.append({
+                'type': f'{color_name}_object',
+                'color': color_name,
+                'area': area,
+                'bbox': list(cv2.boundingRect(contour))
+            })
+        return color_objects
\ No newline at end of file
@@ -1,23 +1,46 @@
+import argparse
 import cv2
 import face_recognition
-import numpy as np
 import os
 import urllib.request
 from datetime import datetime
-import json
+from collections import deque
+from face_gallery import FaceGallery, GalleryWatcher
+from capture import ThreadedCapture
+from frame_context import FrameContext
+from overlay import OverlayRenderer
+from event_log import JsonlEventWriter
+from stage_executor import run_stage
+from scheduler import LatencyScheduler
+from metrics import Metrics, add_arguments as add_metrics_arguments
+from event_recorder import EventRecorder, add_arguments as add_recorder_arguments
 
 class SmartSecuritySystem:
-    def __init__(self):
+    def __init__(self, face_matcher='exact', latency_budget_ms=66, metrics=None, recorder=None):
         # Face recognition setup
-        self.known_face_encodings = []
-        self.known_face_names = []
+        self.face_gallery = None
+        self.face_matcher = face_matcher
         
         # Object detection setup
         self.net = None
         self.classes = []
         
-        # Detection logs
-        self.detection_log = []
+        # Detection logs: events are appended to a JSONL file by a background flusher;
+        # only the most recent ones are kept in memory for show_recent_logs
+        self.detection_log = deque(maxlen=100)
+        self.events_logged = 0
+        self.event_writer = JsonlEventWriter('detection_log.jsonl').start()
+        
+        # Faces at up to 10 fps, motion every frame; motion is shed first when over budget
+        self.scheduler = LatencyScheduler(budget_ms=latency_budget_ms or None)
+        self.scheduler.add_stage('detect_faces', target_fps=10, priority=1)
+        self.scheduler.add_stage('detect_objects_basic', priority=0)
+        
+        # Per-stage timing of the live loop (a no-op unless enabled)
+        self.metrics = metrics or Metrics(enabled=False)
+        
+        # Snapshots and (if triggers are set) event clips, encoded on background threads
+        self.recorder = recorder or EventRecorder()
         
         # Setup systems
         self.setup_face_recognition()
@@ -25,24 +48,10 @@ class SmartSecuritySystem:
     
     def setup_face_recognition(self):
         """Load known faces"""
-        known_faces_dir = "known_faces"
+        self.face_gallery = FaceGallery("known_faces", matcher=self.face_matcher).load()
         
-        if not os.path.exists(known_faces_dir):
-            os.makedirs(known_faces_dir)
-            print(f"Created {known_faces_dir} folder. Add photos of people you want to recognize.")
-            return
-        
-        for filename in os.listdir(known_faces_dir):
-            if filename.lower().endswith(('.png', '.jpg', '.jpeg')):
-                image_path = os.path.join(known_faces_dir, filename)
-                image = face_recognition.load_image_file(image_path)
-                
-                encodings = face_recognition.face_encodings(image)
-                if encodings:
-                    self.known_face_encodings.append(encodings[0])
-                    name = os.path.splitext(filename)[0]
-                    self.known_face_names.append(name)
-                    print(f"Loaded face: {name}")
+        # Pick up added, changed or deleted photos in the background
+        self.gallery_watcher = GalleryWatcher(self.face_gallery).start()
     
     def setup_object_detection(self):
         """Setup lightweight object detection"""
@@ -67,30 +76,23 @@ class SmartSecuritySystem:
         
         print("Object detection setup completed (basic mode)")
     
-    def detect_faces(self, frame):
+    def detect_faces(self, frame, ctx=None):
         """Detect and recognize faces"""
-        # Resize for faster processing
-        small_frame = cv2.resize(frame, (0, 0), fx=0.25, fy=0.25)
-        rgb_small_frame = small_frame[:, :, ::-1]
+        if ctx is None:
+            ctx = FrameContext(frame)
+        
+        # Quarter-size RGB copy for faster processing
+        rgb_small_frame = ctx.rgb_scaled(0.25)
         
         face_locations = face_recognition.face_locations(rgb_small_frame)
         face_encodings = face_recognition.face_encodings(rgb_small_frame, face_locations)
         
+        # Match all faces in the frame against the gallery at once
+        identities = self.face_gallery.identify(face_encodings)
+        
         face_results = []
         
-        for face_encoding, face_location in zip(face_encodings, face_locations):
-            matches = face_recognition.compare_faces(self.known_face_encodings, face_encoding)
-            name = "Unknown"
-            confidence = 0
-            
-            if self.known_face_encodings:
-                face_distances = face_recognition.face_distance(self.known_face_encodings, face_encoding)
-                best_match_index = np.argmin(face_distances)
-                
-                if matches[best_match_index]:
-                    name = self.known_face_names[best_match_index]
-                    confidence = 1 - face_distances[best_match_index]
-            
+        for (name, confidence), face_location in zip(identities, face_locations):
             # Scale back up
             top, right, bottom, left = face_location
             top *= 4
@@ -99,29 +101,24 @@ class SmartSecuritySystem:
             left *= 4
             
             face_results.append({
+                'type': 'recognized_face',
                 'name': name,
                 'confidence': confidence,
                 'location': (left, top, right, bottom)
             })
-            
-            # Draw rectangle and label
-            color = (0, 255, 0) if name != "Unknown" else (0, 0, 255)
-            cv2.rectangle(frame, (left, top), (right, bottom), color, 2)
-            
-            label = f"{name} ({confidence:.2f})" if name != "Unknown" else name
-            cv2.putText(frame, label, (left, top - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.75, color, 2)
         
-        return frame, face_results
+        return face_results
     
-    def detect_objects_basic(self, frame):
+    def detect_objects_basic(self, frame, ctx=None):
         """Basic object detection using background subtraction and contours"""
-        # Convert to grayscale
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if ctx is None:
+            ctx = FrameContext(frame)
+        gray = ctx.gray
         
         # Simple motion detection
         if not hasattr(self, 'background'):
             self.background = gray.copy().astype("float")
-            return frame, []
+            return []
         
         # Update background model
         cv2.accumulateWeighted(gray, self.background, 0.5)
@@ -140,15 +137,13 @@ class SmartSecuritySystem:
                 continue
             
             (x, y, w, h) = cv2.boundingRect(contour)
-            cv2.rectangle(frame, (x, y), (x + w, y + h), (255, 0, 0), 2)
-            cv2.putText(frame, "Moving Object", (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 0, 0), 2)
             
             objects.append({
                 'type': 'moving_object',
                 'bbox': [x, y, w, h]
             })
         
-        return frame, objects
+        return objects
     
     def log_detection(self, faces, objects):
         """Log detections with timestamp"""
@@ -159,64 +154,104 @@ class SmartSecuritySystem:
                 'objects': objects
             }
             self.detection_log.append(log_entry)
+            self.events_logged += 1
             
-            # Save to file
-            with open('detection_log.json', 'w') as f:
-                json.dump(self.detection_log, f, indent=2)
+            # Queued for the flusher thread; only this entry is appended to the file
+            self.event_writer.write(log_entry)
     
-    def run_system(self):
+    def run_system(self, headless=False):
         """Run the complete security system"""
-        cap = cv2.VideoCapture(0)
+        # Capture runs on its own thread; each read() returns the freshest frame
+        cap = ThreadedCapture(0, policy='latest').start()
+        self.recorder.start()
         
         print("Smart Security System Started!")
-        print("Controls:")
-        print("  'q' - Quit")
-        print("  's' - Save current frame")
-        print("  'l' - Show recent logs")
+        if headless:
+            print("Running headless (no window). Press Ctrl+C to stop.")
+        else:
+            print("Controls:")
+            print("  'q' - Quit")
+            print("  's' - Save current frame")
+            print("  'l' - Show recent logs")
         
-        frame_count = 0
+        ctx = FrameContext()
+        renderer = OverlayRenderer()
         
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            # Process every 3rd frame for performance
-            if frame_count % 3 == 0:
-                # Detect faces
-                frame, faces = self.detect_faces(frame)
+        # Latest results of each detector, shown until it runs again
+        held = {'detect_faces': [], 'detect_objects_basic': []}
+        
+        try:
+            while True:
+                with self.metrics.time('capture'):
+                    ret, frame = cap.read()
+                if not ret:
+                    break
+                
+                # The scheduler picks the detectors that are due and fit in the latency budget
+                stage_names = self.scheduler.plan(list(held))
+                ctx.reset(frame)
                 
-                # Detect objects
-                frame, objects = self.detect_objects_basic(frame)
+                stage_ms = {}
+                fresh = {}
+                for stage_name in stage_names:
+                    fresh[stage_name], stage_ms[stage_name] = run_stage(self, stage_name, frame, ctx)
+                self.scheduler.record(stage_ms)
+                self.metrics.observe_stages(stage_ms)
+                held.update(fresh)
                 
                 # Log detections
-                self.log_detection(faces, objects)
+                with self.metrics.time('log'):
+                    self.log_detection(fresh.get('detect_faces', []), fresh.get('detect_objects_basic', []))
                 
-                # Display statistics
-                stats_text = f"Faces: {len(faces)} | Objects: {len(objects)} | Logs: {len(self.detection_log)}"
-                cv2.putText(frame, stats_text, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
-            
-            frame_count += 1
-            
-            cv2.imshow('Smart Security System', frame)
-            
-            key = cv2.waitKey(1) & 0xFF
-            if key == ord('q'):
-                break
-            elif key == ord('s'):
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                cv2.imwrite(f'capture_{timestamp}.jpg', frame)
-                print(f"Frame saved as capture_{timestamp}.jpg")
-            elif key == ord('l'):
-                self.show_recent_logs()
+                # Pre-roll and event clips get the frame before the overlay is drawn into it
+                with self.metrics.time('record'):
+                    self.recorder.add(frame, fresh.get('detect_faces', []) + fresh.get('detect_objects_basic', []))
+                self.metrics.tick()
+                
+                if headless:
+                    continue
+                
+                faces = held['detect_faces']
+                objects = held['detect_objects_basic']
+                
+                with self.metrics.time('render'):
+                    # Draw everything once, after both detectors have looked at the clean frame
+                    renderer.draw(frame, faces + objects)
+                    
+                    # Display statistics
+                    stats_text = f"Faces: {len(faces)} | Objects: {len(objects)} | Logs: {self.events_logged}"
+                    renderer.draw_status(frame, [stats_text, self.scheduler.status_text()] + self.metrics.status_lines())
+                
+                with self.metrics.time('display'):
+                    cv2.imshow('Smart Security System', frame)
+                    
+                    key = cv2.waitKey(1) & 0xFF
+                if key == ord('q'):
+                    break
+                elif key == ord('s'):
+                    # Written by the recorder's thread, so the loop doesn't wait for the JPEG encode
+                    self.recorder.snapshot(frame, 'capture')
+                elif key == ord('l'):
+                    self.show_recent_logs()
+        except KeyboardInterrupt:
+            print("\nStopping...")
         
         cap.release()
-        cv2.destroyAllWindows()
+        if not headless:
+            cv2.destroyAllWindows()
+        print(f"Capture: {cap.frames_captured} frames grabbed, {cap.frames_dropped} stale frames dropped")
+        self.gallery_watcher.stop()
+        self.event_writer.close()
+        print(self.scheduler.report())
+        self.recorder.close()
+        print(self.recorder.report())
+        self.metrics.close()
+        print(f"Logged {self.event_writer.events_written} events to {self.event_writer.path}")
     
     def show_recent_logs(self):
         """Display recent detection logs"""
         print("\n--- Recent Detections ---")
-        for log in self.detection_log[-5:]:  # Show last 5
+        for log in list(self.detection_log)[-5:]:  # Show last 5
             print(f"Time: {log['timestamp']}")
             if log['faces']:
                 for face in log['faces']:
@@ -226,5 +261,13 @@ class SmartSecuritySystem:
             print()
 
 if __name__ == "__main__":
-    system = SmartSecuritySystem()
-    system.run_system()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Smart security system (face recognition + motion)")
+    parser.add_argument('--headless', action='store_true', help="Detect and log only: no rendering and no window")
+    parser.add_argument('--budget-ms', type=float, default=66, help="Per-frame detection latency budget (0 = no budget, target rates only)")
+    add_metrics_arguments(parser)
+    add_recorder_arguments(parser)
+    args = parser.parse_args()
+    
+    system = SmartSecuritySystem(latency_budget_ms=args.budget_ms, metrics=Metrics.from_args(args),
+                                 recorder=EventRecorder.from_args(args))
+    system.run_system(headless=args.headless)
\ No newline at end of file
@@ -0,0 +1,92 @@
+import time
+from collections import Counter, deque
+from itertools import islice
+
+class DetectionHistory:
+    """Fixed-capacity history of recent detection entries with running aggregates
+    
+    Only the last `capacity` entries are kept. Totals per detection type and per
+    recognised identity, counts over the entries still in the ring, and per-minute
+    buckets for rolling rates are all updated as entries come and go, so memory stays
+    flat and summaries never rescan anything.
+    """
+    
+    def __init__(self, capacity=500, rate_window=60):
+        self.entries = deque(maxlen=capacity)
+        self.rate_window = rate_window  # minutes covered by the rolling rates
+        
+        self.entries_total = 0
+        self.detections_total = 0
+        self.type_totals = Counter()
+        self.identity_totals = Counter()
+        self.recent_counts = Counter()  # type counts over the entries currently in the ring
+        
+        self.minutes = deque()  # (minute, Counter of types) for the last rate_window minutes
+        self.window_counts = Counter()
+        self.started = None
+    
+    def __len__(self):
+        return len(self.entries)
+    
+    def __bool__(self):
+        return self.entries_total > 0
+    
+    def add(self, entry, now=None):
+        """Record one log entry ({'detections': [...], ...}); O(detections in the entry)"""
+        now = time.time() if now is None else now
+        if self.started is None:
+            self.started = now
+        types = Counter(detection.get('type', 'unknown') for detection in entry['detections'])
+        
+        if len(self.entries) == self.entries.maxlen:
+            # deque(maxlen) is about to evict the oldest entry; take it out of the recent counts
+            self.recent_counts -= self.entries[0]['type_counts']
+        self.entries.append({**entry, 'type_counts': types})
+        self.recent_counts.update(types)
+        
+        self.entries_total += 1
+        self.detections_total += sum(types.values())
+        self.type_totals.update(types)
+        for detection in entry['detections']:
+            if detection.get('type') == 'recognized_face':
+                self.identity_totals[detection.get('name', 'Unknown')] += 1
+        
+        self.advance(now)
+        self.minutes[-1][1].update(types)
+        self.window_counts.update(types)
+    
+    def advance(self, now):
+        """Move the rate window up to now, dropping minute buckets that fell out of it"""
+        minute = int(now // 60)
+        while self.minutes and self.minutes[0][0] <= minute - self.rate_window:
+            self.window_counts -= self.minutes.popleft()[1]
+        if not self.minutes or self.minutes[-1][0] != minute:
+            self.minutes.append((minute, Counter()))
+    
+    def rates(self, now=None):
+        """Average detections per minute by type over the rolling window"""
+        now = time.time() if now is None else now
+        self.advance(now)
+        started = now if self.started is None else self.started
+        minutes = min(self.rate_window, max(1.0, (now - started) / 60))
+        return {det_type: count / minutes for det_type, count in self.window_counts.items()}
+    
+    def last_minute(self, now=None):
+        """Detections by type in the current minute so far"""
+        self.advance(time.time() if now is None else now)
+        return dict(self.minutes[-1][1])
+    
+    def recent(self, n=5):
+        """The last n entries, oldest first"""
+        return list(islice(reversed(self.entries), n))[::-1]
+    
+    def summary(self, now=None):
+        return {
+            'entries': self.entries_total,
+            'detections': self.detections_total,
+            'type_totals': dict(self.type_totals),
+            'identities': dict(self.identity_totals),
+            'recent_entries': len(self.entries),
+            'recent_counts': dict(self.recent_counts),
+            'rates_per_minute': self.rates(now)
+        }
\ No newline at end of file
@@ -0,0 +1,196 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+import numpy as np
+
+def json_default(value):
+    """JSON encoder fallback for numpy scalars and arrays inside detection records"""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def recover_tail(path, block_size=65536):
+    """Cut a partially written last line (left by a crash) off a JSONL file
+    
+    Only the end of the file is scanned. Returns the number of bytes removed.
+    """
+    if not os.path.exists(path):
+        return 0
+    
+    with open(path, 'rb+') as f:
+        size = f.seek(0, os.SEEK_END)
+        if size == 0:
+            return 0
+        f.seek(size - 1)
+        if f.read(1) == b'\n':
+            return 0
+        
+        # Walk back to the last complete line
+        end = size
+        keep = 0
+        while end > 0:
+            start = max(0, end - block_size)
+            f.seek(start)
+            newline = f.read(end - start).rfind(b'\n')
+            if newline >= 0:
+                keep = start + newline + 1
+                break
+            end = start
+        
+        f.truncate(keep)
+        return size - keep
+
+def read_events(path):
+    """Yield the events of a JSONL log, skipping lines that do not parse"""
+    with open(path, 'r') as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+class JsonlEventWriter:
+    """Append-only JSON-Lines event log written by a background flusher thread
+    
+    write() only queues the event; the flusher serialises whole batches and appends them
+    with one write call, after batch_size events or flush_interval seconds, whichever
+    comes first. The file is rotated to path.1, path.2, ... once it exceeds max_bytes
+    or is older than rotate_interval seconds. On open, a line cut short by a crash is
+    removed so the file stays valid JSONL.
+    """
+    
+    def __init__(self, path='detection_log.jsonl', batch_size=64, flush_interval=1.0, fsync=False,
+                 max_bytes=50 * 1024 * 1024, rotate_interval=None, backup_count=5, max_pending=100000):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.max_bytes = max_bytes
+        self.rotate_interval = rotate_interval
+        self.backup_count = backup_count
+        
+        self.pending = deque(maxlen=max_pending)
+        self.condition = threading.Condition()
+        self.running = False
+        self.thread = None
+        
+        self.events_written = 0
+        self.events_dropped = 0
+        self.rotations = 0
+        
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        recovered = recover_tail(path)
+        if recovered:
+            print(f"Recovered {path}: removed {recovered} bytes of a partially written event")
+        
+        self.file = None
+        self.open_file()
+    
+    def open_file(self):
+        self.file = open(self.path, 'a', encoding='utf-8')
+        self.bytes_written = self.file.tell()
+        self.opened_at = time.monotonic()
+    
+    def start(self):
+        """Start the flusher thread"""
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name='event-log', daemon=True)
+        self.thread.start()
+        return self
+    
+    def write(self, event):
+        """Queue one event (a JSON-serialisable dict); never blocks on disk I/O"""
+        with self.condition:
+            if len(self.pending) == self.pending.maxlen:
+                # Disk can't keep up; deque(maxlen) evicts the oldest queued event
+                self.events_dropped += 1
+            self.pending.append(event)
+            if len(self.pending) >= self.batch_size:
+                self.condition.notify()
+    
+    def run(self):
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: len(self.pending) >= self.batch_size or not self.running,
+                                        self.flush_interval)
+                batch = list(self.pending)
+                self.pending.clear()
+                stopping = not self.running
+            
+            if batch:
+                self.write_batch(batch)
+            if stopping:
+                break
+    
+    def write_batch(self, batch):
+        """Serialise and append a batch with a single write, then rotate if due"""
+        lines = []
+        for event in batch:
+            try:
+                lines.append(json.dumps(event, default=json_default))
+            except (TypeError, ValueError) as e:
+                print(f"Skipping unserialisable event: {e}")
+        if not lines:
+            return
+        
+        data = '\n'.join(lines) + '\n'
+        self.file.write(data)
+        self.file.flush()
+        if self.fsync:
+            os.fsync(self.file.fileno())
+        
+        # json.dumps escapes non-ASCII, so characters and bytes line up
+        self.bytes_written += len(data)
+        self.events_written += len(lines)
+        
+        if self.should_rotate():
+            self.rotate()
+    
+    def should_rotate(self):
+        if self.max_bytes and self.bytes_written >= self.max_bytes:
+            return True
+        return bool(self.rotate_interval) and time.monotonic() - self.opened_at >= self.rotate_interval
+    
+    def rotate(self):
+        """Shift path -> path.1 -> path.2 ... and start a new file"""
+        self.file.close()
+        if self.backup_count > 0:
+            for i in range(self.backup_count - 1, 0, -1):
+                source = f"{self.path}.{i}"
+                if os.path.exists(source):
+                    os.replace(source, f"{self.path}.{i + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self.rotations += 1
+        self.open_file()
+    
+    def close(self):
+        """Flush everything still queued and close the file"""
+        if self.thread is not None:
+            with self.condition:
+                self.running = False
+                self.condition.notify_all()
+            self.thread.join()
+            self.thread = None
+        elif self.pending:
+            self.write_batch(list(self.pending))
+            self.pending.clear()
+        
+        if self.file is not None and not self.file.closed:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.file.close()
+    
+    def __enter__(self):
+        return self.start()
+    
+    def __exit__(self, *exc):
+        self.close()
\ No newline at end of file
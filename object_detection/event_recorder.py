@@ -0,0 +1,269 @@
+import cv2
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+# Motion record types of the two systems' motion detectors
+MOTION_TYPES = ('moving_object', 'unknown_motion', 'horizontal_movement', 'vertical_movement', 'person-like_movement')
+
+# --record trigger name -> test on one detection record
+TRIGGERS = {
+    'unknown_face': lambda record: record.get('type') == 'recognized_face' and record.get('name') == 'Unknown',
+    'known_face': lambda record: record.get('type') == 'recognized_face' and record.get('name') != 'Unknown',
+    'person': lambda record: record.get('type') == 'person',
+    'motion': lambda record: record.get('type') in MOTION_TYPES
+}
+
+class WorkQueue:
+    """Hand-off between recorder threads, bounded in bytes
+    
+    Control items (open/close/snapshot) are always kept; when frames would push the queue
+    past max_bytes the oldest queued frames are dropped instead, so the producer never waits.
+    """
+    
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.items = deque()
+        self.bytes = 0
+        self.dropped = 0
+        self.closed = False
+        self.condition = threading.Condition()
+    
+    def put(self, kind, payload, size=0):
+        with self.condition:
+            if kind == 'frame':
+                while self.bytes + size > self.max_bytes and self.drop_oldest_frame():
+                    pass
+            self.items.append((kind, payload, size))
+            self.bytes += size
+            self.condition.notify()
+    
+    def drop_oldest_frame(self):
+        for i, (kind, _, size) in enumerate(self.items):
+            if kind == 'frame':
+                del self.items[i]
+                self.bytes -= size
+                self.dropped += 1
+                return True
+        return False
+    
+    def get(self):
+        """Next (kind, payload), or None once the queue is closed and empty"""
+        with self.condition:
+            self.condition.wait_for(lambda: self.items or self.closed)
+            if not self.items:
+                return None
+            kind, payload, size = self.items.popleft()
+            self.bytes -= size
+            return kind, payload
+    
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+class EventRecorder:
+    """Pre/post-roll event clips and snapshots, encoded off the detection loop
+    
+    add() copies the frame into a bounded queue and returns. An encoder thread compresses
+    every frame to JPEG into a pre-roll ring holding the last pre_seconds (capped at
+    max_preroll_mb). When a frame's detections match a trigger, the ring plus the next
+    post_seconds go to a writer thread that decodes them into a cv2.VideoWriter clip; new
+    triggers during a clip extend it, up to max_clip_seconds. Snapshots are written by the
+    same thread. If either thread falls behind, its queue drops the oldest frames.
+    """
+    
+    def __init__(self, triggers=(), output_dir='recordings', pre_seconds=5.0, post_seconds=5.0,
+                 max_clip_seconds=60.0, fps=15.0, jpeg_quality=80, fourcc='mp4v',
+                 max_preroll_mb=64, max_queue_mb=64, snapshot_dir='.'):
+        for trigger in triggers:
+            if trigger not in TRIGGERS:
+                raise ValueError(f"Unknown trigger '{trigger}'. Choose from: {', '.join(TRIGGERS)}")
+        self.triggers = [(trigger, TRIGGERS[trigger]) for trigger in triggers]
+        self.output_dir = output_dir
+        self.pre_seconds = pre_seconds
+        self.post_seconds = post_seconds
+        self.max_clip_seconds = max_clip_seconds
+        self.fps = fps
+        self.encode_params = [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality]
+        self.fourcc = cv2.VideoWriter_fourcc(*fourcc)
+        self.extension = '.avi' if fourcc in ('MJPG', 'XVID') else '.mp4'
+        self.max_preroll_bytes = max_preroll_mb * 1024 * 1024
+        self.snapshot_dir = snapshot_dir
+        
+        # Raw frames for the encoder, then JPEG frames and control items for the writer
+        self.frames = WorkQueue(max_queue_mb * 1024 * 1024)
+        self.writes = WorkQueue(max_queue_mb * 1024 * 1024)
+        
+        # Encoder thread state: (time, jpeg) ring and the clip being recorded
+        self.preroll = deque()
+        self.preroll_bytes = 0
+        self.clip = None
+        
+        self.threads = []
+        self.clips_written = 0
+        self.snapshots_written = 0
+        self.triggered = {}
+    
+    @classmethod
+    def from_args(cls, args):
+        """Recorder configured by the flags add_arguments() defines (snapshots only if no trigger is given)"""
+        return cls(triggers=args.record or (), output_dir=args.recordings_dir,
+                   pre_seconds=args.pre_roll, post_seconds=args.post_roll)
+    
+    @property
+    def recording(self):
+        return bool(self.triggers)
+    
+    def start(self):
+        """Start the writer thread, and the encoder thread if any trigger is set"""
+        targets = [('recorder-write', self.write_loop)]
+        if self.recording:
+            os.makedirs(self.output_dir, exist_ok=True)
+            targets.append(('recorder-encode', self.encode_loop))
+        for name, target in targets:
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        return self
+    
+    def add(self, frame, detections):
+        """Queue a clean frame and check its detections against the triggers; never blocks on encoding"""
+        if not self.recording:
+            return
+        reasons = [trigger for trigger, matches in self.triggers if any(matches(record) for record in detections)]
+        # Copied: the loop draws the overlay into this frame afterwards
+        self.frames.put('frame', (time.perf_counter(), frame.copy(), reasons), frame.nbytes)
+    
+    def snapshot(self, frame, prefix='snapshot'):
+        """Save a copy of the frame as JPEG on the writer thread; returns the path it will have"""
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        path = os.path.join(self.snapshot_dir, f'{prefix}_{timestamp}.jpg')
+        self.writes.put('snapshot', (path, frame.copy()))
+        return path
+    
+    def encode_loop(self):
+        while True:
+            item = self.frames.get()
+            if item is None:
+                break
+            captured_at, frame, reasons = item[1]
+            ok, jpeg = cv2.imencode('.jpg', frame, self.encode_params)
+            if not ok:
+                continue
+            
+            self.preroll.append((captured_at, jpeg))
+            self.preroll_bytes += jpeg.nbytes
+            while len(self.preroll) > 1 and (self.preroll_bytes > self.max_preroll_bytes
+                                    or captured_at - self.preroll[0][0] > self.pre_seconds):
+                self.preroll_bytes -= self.preroll.popleft()[1].nbytes
+            
+            if self.clip is None:
+                if reasons:
+                    self.open_clip(captured_at, reasons)
+                continue
+            
+            self.writes.put('frame', jpeg, jpeg.nbytes)
+            if reasons:
+                self.clip['reasons'].update(reasons)
+                self.clip['until'] = min(captured_at + self.post_seconds, self.clip['started'] + self.max_clip_seconds)
+            if captured_at >= self.clip['until']:
+                self.close_clip()
+        
+        if self.clip is not None:
+            self.close_clip()
+        self.writes.close()
+    
+    def open_clip(self, captured_at, reasons):
+        """Start a clip with the pre-roll ring (which ends with the triggering frame)"""
+        for reason in reasons:
+            self.triggered[reason] = self.triggered.get(reason, 0) + 1
+        name = f"event_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{'+'.join(reasons)}{self.extension}"
+        
+        # Frame rate of the loop over the pre-roll, so the clip plays back in real time
+        span = self.preroll[-1][0] - self.preroll[0][0]
+        fps = (len(self.preroll) - 1) / span if span > 0 else self.fps
+        
+        self.clip = {
+            'path': os.path.join(self.output_dir, name),
+            'reasons': set(reasons),
+            'started': self.preroll[0][0],
+            'until': captured_at + self.post_seconds
+        }
+        self.writes.put('open', (self.clip['path'], fps))
+        for _, jpeg in self.preroll:
+            self.writes.put('frame', jpeg, jpeg.nbytes)
+    
+    def close_clip(self):
+        self.writes.put('close', (self.clip['path'], sorted(self.clip['reasons'])))
+        self.clip = None
+        # Every frame in the ring is already in this clip; the next clip's pre-roll starts after it
+        self.preroll.clear()
+        self.preroll_bytes = 0
+    
+    def write_loop(self):
+        writer = None
+        while True:
+            item = self.writes.get()
+            if item is None:
+                break
+            kind, payload = item
+            
+            if kind == 'snapshot':
+                path, frame = payload
+                if cv2.imwrite(path, frame):
+                    self.snapshots_written += 1
+                    print(f"Frame saved as {path}")
+                else:
+                    print(f"Could not save {path}")
+            elif kind == 'open':
+                path, fps = payload
+                writer = None
+            elif kind == 'frame':
+                frame = cv2.imdecode(payload, cv2.IMREAD_COLOR)
+                if frame is None:
+                    continue
+                if writer is None:
+                    height, width = frame.shape[:2]
+                    writer = cv2.VideoWriter(path, self.fourcc, fps, (width, height))
+                writer.write(frame)
+            elif kind == 'close':
+                path, reasons = payload
+                if writer is not None:
+                    writer.release()
+                    writer = None
+                    self.clips_written += 1
+                    print(f"Event clip saved as {path} ({', '.join(reasons)})")
+        
+        if writer is not None:
+            writer.release()
+    
+    def close(self):
+        """Finish the current clip and every queued write"""
+        if not self.threads:
+            return
+        self.frames.close()
+        if not self.recording:
+            self.writes.close()
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+    
+    def report(self):
+        text = f"Recorder: {self.clips_written} event clips, {self.snapshots_written} snapshots"
+        if self.triggered:
+            text += " (triggers: " + ", ".join(f"{name} {count}" for name, count in sorted(self.triggered.items())) + ")"
+        dropped = self.frames.dropped + self.writes.dropped
+        if dropped:
+            text += f", {dropped} frames dropped by full queues"
+        return text
+
+def add_arguments(parser):
+    """The event recording flags shared by the run scripts"""
+    parser.add_argument('--record', nargs='+', choices=list(TRIGGERS), metavar='TRIGGER',
+                        help=f"Save a clip around each event of these kinds ({', '.join(TRIGGERS)})")
+    parser.add_argument('--pre-roll', type=float, default=5.0, help="Seconds of video kept before an event")
+    parser.add_argument('--post-roll', type=float, default=5.0, help="Seconds of video recorded after the last trigger")
+    parser.add_argument('--recordings-dir', default='recordings', help="Directory for event clips")
\ No newline at end of file
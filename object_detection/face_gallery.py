@@ -0,0 +1,405 @@
+import face_recognition
+import hashlib
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from face_matchers import create_matcher
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+CACHE_FILENAME = '.encodings_cache.json'
+CACHE_VERSION = 1
+DEFAULT_TOLERANCE = 0.6  # Same default as face_recognition.compare_faces
+
+def file_digest(path, chunk_size=1 << 20):
+    """Return the SHA-1 hex digest of a file's contents"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def encode_face_image(image_path):
+    """Encode the first face in an image file (runs inside pool workers)"""
+    try:
+        image = face_recognition.load_image_file(image_path)
+        encodings = face_recognition.face_encodings(image)
+        if encodings:
+            return image_path, encodings[0].tolist(), None
+        return image_path, None, None
+    except Exception as e:
+        return image_path, None, str(e)
+
+class EncodingCache:
+    """Persistent face encodings keyed by file path, size, mtime and content hash"""
+    
+    def __init__(self, cache_path):
+        self.cache_path = cache_path
+        self.entries = {}
+        self.by_digest = {}
+        self.dirty = False
+        self.load()
+    
+    def load(self):
+        """Read the cache file, starting empty if it is missing or unreadable"""
+        if not os.path.exists(self.cache_path):
+            return
+        
+        try:
+            with open(self.cache_path, 'r') as f:
+                data = json.load(f)
+            if data.get('version') == CACHE_VERSION:
+                self.entries = data.get('entries', {})
+                self.by_digest = {e['sha1']: e for e in self.entries.values()}
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable encoding cache {self.cache_path}: {e}")
+    
+    def lookup(self, path, stat):
+        """Return (entry, digest) for a file; entry is None when it must be re-encoded"""
+        entry = self.entries.get(path)
+        if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+            return entry, entry['sha1']
+        
+        # Size or mtime changed (or new path): fall back to the content hash,
+        # which also catches photos that were only touched, copied or renamed
+        digest = file_digest(path)
+        if entry is None or entry['sha1'] != digest:
+            entry = self.by_digest.get(digest)
+        
+        if entry is None:
+            return None, digest
+        
+        self.store(path, stat, digest, entry['encoding'])
+        return self.entries[path], digest
+    
+    def store(self, path, stat, digest, encoding):
+        """Record the encoding (or None when no face was found) for a file"""
+        self.entries[path] = {
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sha1': digest,
+            'encoding': encoding
+        }
+        self.by_digest[digest] = self.entries[path]
+        self.dirty = True
+    
+    def prune(self, live_paths):
+        """Drop entries for files that no longer exist"""
+        for path in set(self.entries) - set(live_paths):
+            entry = self.entries.pop(path)
+            if self.by_digest.get(entry['sha1']) is entry:
+                del self.by_digest[entry['sha1']]
+            self.dirty = True
+    
+    def save(self):
+        """Write the cache atomically if anything changed"""
+        if not self.dirty:
+            return
+        
+        # A temp file of our own: several processes may load the same gallery at once
+        try:
+            fd, tmp_path = tempfile.mkstemp(prefix=CACHE_FILENAME + '.', suffix='.tmp',
+                                            dir=os.path.dirname(self.cache_path) or '.')
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump({'version': CACHE_VERSION, 'entries': self.entries}, f)
+                os.replace(tmp_path, self.cache_path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+        except OSError as e:
+            print(f"Warning: could not save encoding cache {self.cache_path}: {e}")
+            return
+        self.dirty = False
+
+class GallerySnapshot:
+    """An immutable view of the gallery; updates build a new one and swap it in"""
+    
+    def __init__(self, names, paths, matcher):
+        self.names = names
+        self.paths = paths
+        self.matcher = matcher
+
+class FaceGallery:
+    """Known face encodings and names enrolled from a directory of photos"""
+    
+    def __init__(self, known_faces_dir="known_faces", workers=None, use_cache=True, matcher='exact'):
+        self.known_faces_dir = known_faces_dir
+        self.workers = workers or os.cpu_count() or 1
+        self.use_cache = use_cache
+        self.cache = None
+        self.timings = {}
+        
+        # Readers take one reference to the snapshot; writers serialize on the lock
+        # and replace the reference in a single assignment
+        self.snapshot = GallerySnapshot([], [], create_matcher(matcher))
+        self.update_lock = threading.Lock()
+    
+    def __len__(self):
+        return len(self.snapshot.names)
+    
+    @property
+    def names(self):
+        return self.snapshot.names
+    
+    @property
+    def paths(self):
+        return self.snapshot.paths
+    
+    @property
+    def matcher(self):
+        return self.snapshot.matcher
+    
+    @property
+    def encodings(self):
+        """All gallery encodings as one contiguous float32 (N, 128) matrix"""
+        return self.snapshot.matcher.vectors
+    
+    def list_images(self):
+        """Return sorted paths of all enrollable photos"""
+        return sorted(
+            os.path.join(self.known_faces_dir, filename)
+            for filename in os.listdir(self.known_faces_dir)
+            if filename.lower().endswith(IMAGE_EXTENSIONS)
+        )
+    
+    def encode_images(self, image_paths, use_pool=None, mp_context=None):
+        """Encode photos across a process pool, yielding (path, encoding, error)"""
+        if use_pool is None:
+            use_pool = len(image_paths) > 1 and self.workers > 1
+        if not image_paths or not use_pool:
+            for image_path in image_paths:
+                yield encode_face_image(image_path)
+            return
+        
+        workers = max(1, min(self.workers, len(image_paths)))
+        chunksize = max(1, len(image_paths) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context) as pool:
+            yield from pool.map(encode_face_image, image_paths, chunksize=chunksize)
+    
+    def lookup_cached(self, image_paths):
+        """Split photos into cached encodings and those still to encode"""
+        results = {}
+        pending = {}
+        for image_path in image_paths:
+            if self.cache is None:
+                pending[image_path] = None
+                continue
+            try:
+                stat = os.stat(image_path)
+                entry, digest = self.cache.lookup(image_path, stat)
+            except OSError as e:
+                print(f"Error loading {os.path.basename(image_path)}: {e}")
+                continue
+            if entry is None:
+                pending[image_path] = (stat, digest)
+            else:
+                results[image_path] = entry['encoding']
+        return results, pending
+    
+    def encode_pending(self, pending, results, use_pool=None, mp_context=None):
+        """Encode the photos lookup_cached could not answer, storing them in the cache"""
+        for image_path, encoding, error in self.encode_images(list(pending), use_pool, mp_context):
+            if error:
+                print(f"Error loading {os.path.basename(image_path)}: {error}")
+                continue
+            results[image_path] = encoding
+            if self.cache is not None:
+                stat, digest = pending[image_path]
+                self.cache.store(image_path, stat, digest, encoding)
+            if encoding is not None:
+                print(f"Loaded face: {self.name_for(image_path)}")
+        return results
+    
+    def name_for(self, image_path):
+        """Use the filename (without extension) as the person's name"""
+        return os.path.splitext(os.path.basename(image_path))[0]
+    
+    def load(self):
+        """Enroll every photo, encoding only those missing from the cache"""
+        with self.update_lock:
+            return self.load_locked()
+    
+    def load_locked(self):
+        """Body of load(); the caller holds update_lock"""
+        self.timings = {}
+        
+        if not os.path.exists(self.known_faces_dir):
+            os.makedirs(self.known_faces_dir)
+            print(f"Created {self.known_faces_dir} folder. Add photos of people you want to recognize.")
+            return self
+        
+        start = time.perf_counter()
+        phase_start = start
+        
+        def end_phase(name):
+            nonlocal phase_start
+            now = time.perf_counter()
+            self.timings[name] = now - phase_start
+            phase_start = now
+        
+        image_paths = self.list_images()
+        end_phase('scan')
+        
+        self.cache = EncodingCache(os.path.join(self.known_faces_dir, CACHE_FILENAME)) if self.use_cache else None
+        results, pending = self.lookup_cached(image_paths)
+        end_phase('cache')
+        
+        self.encode_pending(pending, results)
+        end_phase('encode')
+        
+        enrolled = [path for path in image_paths if results.get(path) is not None]
+        matcher = self.matcher.copy()
+        matcher.build([results[path] for path in enrolled])
+        self.snapshot = GallerySnapshot([self.name_for(path) for path in enrolled], enrolled, matcher)
+        end_phase('build')
+        
+        if self.cache is not None:
+            self.cache.prune(image_paths)
+            self.cache.save()
+        end_phase('save')
+        
+        self.timings['total'] = time.perf_counter() - start
+        print(f"Face gallery ready: {len(enrolled)} faces from {len(image_paths)} photos "
+              f"({len(image_paths) - len(pending)} cached, {len(pending)} encoded) "
+              f"in {self.timings['total']:.2f}s")
+        print("  " + " | ".join(f"{name}: {self.timings[name]:.2f}s"
+                                for name in ('scan', 'cache', 'encode', 'build', 'save')))
+        return self
+    
+    def apply_changes(self, added=(), removed=(), updated=(), use_pool=None, mp_context=None):
+        """Encode only the changed photos, then swap in a new snapshot atomically
+        
+        Recognition keeps using the previous snapshot until the swap, so it never waits.
+        Returns the number of faces enrolled and dropped.
+        """
+        with self.update_lock:
+            changed = sorted(set(added) | set(updated))
+            results, pending = self.lookup_cached(changed)
+            self.encode_pending(pending, results, use_pool, mp_context)
+            
+            snapshot = self.snapshot
+            drop = set(removed) | set(changed)
+            drop_indices = [i for i, path in enumerate(snapshot.paths) if path in drop]
+            keep = [i for i, path in enumerate(snapshot.paths) if path not in drop]
+            enrolled = [path for path in changed if results.get(path) is not None]
+            
+            matcher = snapshot.matcher.copy()
+            if drop_indices:
+                matcher.remove(drop_indices)
+            if enrolled:
+                matcher.add([results[path] for path in enrolled])
+            
+            paths = [snapshot.paths[i] for i in keep] + enrolled
+            names = [snapshot.names[i] for i in keep] + [self.name_for(path) for path in enrolled]
+            self.snapshot = GallerySnapshot(names, paths, matcher)
+            
+            if self.cache is not None:
+                self.cache.prune(set(self.cache.entries) - set(removed))
+                self.cache.save()
+        
+        return len(enrolled), len(drop_indices)
+    
+    def add_images(self, image_paths, use_pool=None):
+        """Enroll new photos without re-encoding the rest of the gallery"""
+        return self.apply_changes(added=image_paths, use_pool=use_pool)
+    
+    def remove_images(self, image_paths):
+        """Remove photos from the gallery"""
+        return self.apply_changes(removed=image_paths)
+    
+    def update_images(self, image_paths, use_pool=None):
+        """Re-encode photos whose contents changed"""
+        return self.apply_changes(updated=image_paths, use_pool=use_pool)
+    
+    def match(self, face_encodings, tolerance=DEFAULT_TOLERANCE, snapshot=None):
+        """Match every face in a frame against the gallery in one batched search
+        
+        Returns (best_indices, best_distances, is_match) arrays with one entry per face.
+        """
+        snapshot = snapshot or self.snapshot
+        best_indices, best_distances = snapshot.matcher.search(face_encodings)
+        return best_indices, best_distances, best_distances <= tolerance
+    
+    def identify(self, face_encodings, tolerance=DEFAULT_TOLERANCE):
+        """Return a (name, confidence) pair per face, with ("Unknown", 0) for no match"""
+        # One snapshot for the search and the names, even if a reload swaps it meanwhile
+        snapshot = self.snapshot
+        best_indices, best_distances, is_match = self.match(face_encodings, tolerance, snapshot)
+        return [
+            (snapshot.names[index], float(1 - distance)) if matched else ("Unknown", 0)
+            for index, distance, matched in zip(best_indices, best_distances, is_match)
+        ]
+
+class GalleryWatcher:
+    """Background thread that hot-reloads the gallery when photos in its folder change"""
+    
+    def __init__(self, gallery, interval=2.0):
+        self.gallery = gallery
+        self.interval = interval
+        self.files = {}
+        self.wake = threading.Event()
+        self.stopped = threading.Event()
+        self.thread = None
+    
+    def scan(self):
+        """Return {path: (size, mtime_ns)} for every photo in the folder"""
+        files = {}
+        if not os.path.exists(self.gallery.known_faces_dir):
+            return files
+        for image_path in self.gallery.list_images():
+            try:
+                stat = os.stat(image_path)
+            except OSError:
+                continue
+            files[image_path] = (stat.st_size, stat.st_mtime_ns)
+        return files
+    
+    def start(self):
+        """Take the current folder state as the baseline and start polling"""
+        self.files = self.scan()
+        self.thread = threading.Thread(target=self.run, name='gallery-watcher', daemon=True)
+        self.thread.start()
+        return self
+    
+    def refresh(self):
+        """Poll immediately instead of waiting for the next interval"""
+        self.wake.set()
+    
+    def stop(self):
+        """Stop polling and wait for any in-flight update to finish"""
+        self.stopped.set()
+        self.wake.set()
+        if self.thread is not None:
+            self.thread.join()
+    
+    def run(self):
+        while not self.stopped.is_set():
+            self.wake.wait(self.interval)
+            self.wake.clear()
+            if self.stopped.is_set():
+                break
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"Face gallery watcher error: {e}")
+    
+    def poll(self):
+        """Apply any added, removed or modified photos to the gallery"""
+        files = self.scan()
+        added = [path for path in files if path not in self.files]
+        removed = [path for path in self.files if path not in files]
+        updated = [path for path in files if path in self.files and files[path] != self.files[path]]
+        
+        if added or removed or updated:
+            # dlib holds the GIL while encoding, so always encode in a worker process. By now the
+            # process runs capture, logging and detector threads, and forking it could deadlock
+            added_count, removed_count = self.gallery.apply_changes(added, removed, updated, use_pool=True,
+                                                                    mp_context=multiprocessing.get_context('spawn'))
+            print(f"Face gallery updated: +{added_count} -{removed_count} ({len(self.gallery)} faces)")
+        # Only once applied: if the update failed, the next poll sees the same changes and retries
+        self.files = files
\ No newline at end of file
@@ -0,0 +1,84 @@
+import cv2
+import face_recognition
+from model_registry import ModelRegistry
+from object_detection import decode_ssd
+
+FACE_BACKENDS = ('haar', 'hog', 'dnn')
+
+class FaceLocator:
+    """Finds the faces of a frame once, for every stage that needs them
+    
+    Face annotation (eye check, profiles) and face recognition both ask the locator for
+    the current frame's faces; the boxes are computed on first request and cached in the
+    FrameContext, so one detection pass serves both. Backends:
+      haar - frontal + profile Haar cascades on the grayscale frame (fast, no extra files)
+      hog  - face_recognition's HOG detector on the downscaled RGB frame
+      dnn  - OpenCV's ResNet-10 SSD face detector ('face-ssd' in models/manifest.json)
+    Each face is {'bbox': [x, y, w, h], 'kind': 'frontal' or 'profile', 'score': float or None};
+    only the haar backend reports profiles.
+    """
+    
+    def __init__(self, backend='haar', hog_scale=0.25, dnn_confidence=0.6, registry=None):
+        if backend not in FACE_BACKENDS:
+            raise ValueError(f"Unknown face locator '{backend}'. Choose from: {', '.join(FACE_BACKENDS)}")
+        self.backend = backend
+        self.hog_scale = hog_scale
+        self.dnn_confidence = dnn_confidence
+        
+        if backend == 'haar':
+            # OpenCV cascade classifiers (built-in, no downloads needed)
+            self.face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+            self.profile_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_profileface.xml')
+        elif backend == 'dnn':
+            # Loaded (and warmed up) on the first frame
+            self.model = (registry or ModelRegistry()).model('face-ssd')
+    
+    @property
+    def encode_scale(self):
+        """Scale of the RGB frame to encode this backend's faces from
+        
+        HOG faces are encoded from the downscaled frame HOG already ran on; Haar and DNN
+        boxes come from the full frame, so they are encoded at full resolution.
+        """
+        return self.hog_scale if self.backend == 'hog' else 1
+    
+    def locate(self, ctx):
+        """Faces of the context's frame, computed once per frame"""
+        return ctx.get(('faces', self.backend), lambda: getattr(self, f'find_{self.backend}')(ctx))
+    
+    def boxes(self, ctx, kinds=('frontal',)):
+        return [face['bbox'] for face in self.locate(ctx) if face['kind'] in kinds]
+    
+    def find_haar(self, ctx):
+        gray = ctx.gray
+        faces = [{'bbox': [int(x), int(y), int(w), int(h)], 'kind': 'frontal', 'score': None}
+                 for (x, y, w, h) in self.face_cascade.detectMultiScale(gray, 1.1, 4, minSize=(30, 30))]
+        faces.extend({'bbox': [int(x), int(y), int(w), int(h)], 'kind': 'profile', 'score': None}
+                     for (x, y, w, h) in self.profile_cascade.detectMultiScale(gray, 1.1, 4, minSize=(30, 30)))
+        return faces
+    
+    def find_hog(self, ctx):
+        factor = 1 / self.hog_scale
+        faces = []
+        for top, right, bottom, left in face_recognition.face_locations(ctx.rgb_scaled(self.hog_scale)):
+            # Scale back up
+            faces.append({
+                'bbox': [int(left * factor), int(top * factor), int((right - left) * factor), int((bottom - top) * factor)],
+                'kind': 'frontal',
+                'score': None
+            })
+        return faces
+    
+    def find_dnn(self, ctx):
+        if not self.model.load():
+            return []
+        height, width = ctx.frame.shape[:2]
+        boxes, scores, _ = decode_ssd(self.model.forward([ctx.frame])[0], 0, width, height, self.dnn_confidence)
+        faces = []
+        for (x, y, w, h), score in zip(boxes.tolist(), scores.tolist()):
+            # The SSD can reach past the frame edges
+            x1, y1 = max(0, x), max(0, y)
+            x2, y2 = min(width, x + w), min(height, y + h)
+            if x2 > x1 and y2 > y1:
+                faces.append({'bbox': [x1, y1, x2 - x1, y2 - y1], 'kind': 'frontal', 'score': score})
+        return faces
\ No newline at end of file
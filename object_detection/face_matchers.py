@@ -0,0 +1,197 @@
+import copy
+import numpy as np
+
+ENCODING_SIZE = 128
+
+def squared_norms(vectors):
+    """Row-wise squared L2 norms"""
+    return np.einsum('ij,ij->i', vectors, vectors)
+
+def as_matrix(vectors):
+    """Convert encodings to a contiguous float32 (N, 128) matrix"""
+    return np.ascontiguousarray(np.asarray(vectors, dtype=np.float32).reshape(-1, ENCODING_SIZE))
+
+def exact_search(queries, vectors, sq_norms):
+    """Exact nearest neighbours of every query row, with one GEMM for all queries x vectors"""
+    # ||q - g||^2 = ||q||^2 + ||g||^2 - 2 q.g
+    sq_distances = sq_norms[np.newaxis, :] - 2.0 * (queries @ vectors.T)
+    best_indices = np.argmin(sq_distances, axis=1)
+    best_sq = sq_distances[np.arange(len(queries)), best_indices] + squared_norms(queries)
+    return best_indices, np.sqrt(np.maximum(best_sq, 0.0))
+
+class BruteForceMatcher:
+    """Exact nearest-neighbour search with one matrix product over the whole gallery"""
+    
+    def __init__(self):
+        self.build([])
+    
+    def __len__(self):
+        return len(self.vectors)
+    
+    def build(self, vectors):
+        """Replace the indexed vectors"""
+        self.vectors = as_matrix(vectors)
+        self.sq_norms = squared_norms(self.vectors)
+    
+    def copy(self):
+        """Independent matcher sharing the (never modified in place) arrays"""
+        matcher = BruteForceMatcher.__new__(BruteForceMatcher)
+        matcher.vectors = self.vectors
+        matcher.sq_norms = self.sq_norms
+        return matcher
+    
+    def add(self, vectors):
+        """Append vectors; their ids continue from the current size"""
+        vectors = as_matrix(vectors)
+        self.vectors = np.concatenate([self.vectors, vectors])
+        self.sq_norms = np.concatenate([self.sq_norms, squared_norms(vectors)])
+    
+    def remove(self, indices):
+        """Delete vectors; later ids shift down to stay contiguous"""
+        self.vectors = np.delete(self.vectors, indices, axis=0)
+        self.sq_norms = np.delete(self.sq_norms, indices)
+    
+    def search(self, queries):
+        """Return (best_indices, best_distances) for each query row"""
+        queries = as_matrix(queries)
+        if len(queries) == 0 or len(self.vectors) == 0:
+            return np.full(len(queries), -1), np.full(len(queries), np.inf, dtype=np.float32)
+        
+        return exact_search(queries, self.vectors, self.sq_norms)
+
+class IVFMatcher:
+    """Approximate search: k-means coarse clusters with inverted lists, probing the nearest few"""
+    
+    def __init__(self, nlist=None, nprobe=8, iterations=10, min_train_size=2048, max_train_size=65536, seed=0):
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.iterations = iterations
+        self.min_train_size = min_train_size
+        self.max_train_size = max_train_size
+        self.rng = np.random.default_rng(seed)
+        self.build([])
+    
+    def __len__(self):
+        return len(self.vectors)
+    
+    @property
+    def trained(self):
+        return self.centroids is not None
+    
+    def build(self, vectors):
+        """Replace the indexed vectors, training the coarse quantizer if there are enough"""
+        self.vectors = as_matrix(vectors)
+        self.sq_norms = squared_norms(self.vectors)
+        self.centroids = None
+        self.lists = []
+        
+        if len(self.vectors) >= self.min_train_size:
+            self.train()
+    
+    def train(self):
+        """Cluster (a sample of) the vectors with k-means and fill the inverted lists"""
+        count = len(self.vectors)
+        nlist = self.nlist or max(1, int(4 * np.sqrt(count)))
+        sample = self.vectors
+        if count > self.max_train_size:
+            sample = self.vectors[self.rng.choice(count, self.max_train_size, replace=False)]
+        
+        centroids = sample[self.rng.choice(len(sample), min(nlist, len(sample)), replace=False)].copy()
+        for _ in range(self.iterations):
+            labels = self.assign(sample, centroids)
+            order = np.argsort(labels, kind='stable')
+            cluster_ids, starts, sizes = np.unique(labels[order], return_index=True, return_counts=True)
+            sums = np.add.reduceat(sample[order], starts, axis=0)
+            # Empty clusters keep their previous centroid
+            centroids[cluster_ids] = sums / sizes[:, np.newaxis]
+        
+        self.centroids = centroids
+        self.centroid_sq_norms = squared_norms(centroids)
+        self.lists = [np.empty(0, dtype=np.int64) for _ in range(len(centroids))]
+        self.add_to_lists(np.arange(count), self.vectors)
+    
+    def assign(self, vectors, centroids, chunk_size=8192):
+        """Return the nearest centroid for every vector, in memory-bounded chunks"""
+        centroid_sq_norms = squared_norms(centroids)
+        labels = np.empty(len(vectors), dtype=np.int64)
+        for start in range(0, len(vectors), chunk_size):
+            chunk = vectors[start:start + chunk_size]
+            labels[start:start + chunk_size] = np.argmin(centroid_sq_norms - 2.0 * (chunk @ centroids.T), axis=1)
+        return labels
+    
+    def add_to_lists(self, ids, vectors):
+        """Append ids to the inverted list of their nearest centroid"""
+        labels = self.assign(vectors, self.centroids)
+        order = np.argsort(labels, kind='stable')
+        cluster_ids, starts = np.unique(labels[order], return_index=True)
+        for cluster_id, group in zip(cluster_ids, np.split(ids[order], starts[1:])):
+            self.lists[cluster_id] = np.concatenate([self.lists[cluster_id], group])
+    
+    def add(self, vectors):
+        """Insert vectors incrementally; existing clusters are kept, not retrained"""
+        vectors = as_matrix(vectors)
+        ids = np.arange(len(self.vectors), len(self.vectors) + len(vectors))
+        self.vectors = np.concatenate([self.vectors, vectors])
+        self.sq_norms = np.concatenate([self.sq_norms, squared_norms(vectors)])
+        
+        if self.trained:
+            self.add_to_lists(ids, vectors)
+        elif len(self.vectors) >= self.min_train_size:
+            self.train()
+    
+    def copy(self):
+        """Independent matcher sharing centroids and list arrays (replaced, never modified in place)"""
+        matcher = copy.copy(self)
+        matcher.lists = list(self.lists)
+        return matcher
+    
+    def remove(self, indices):
+        """Delete vectors, keeping the trained clusters and renumbering the inverted lists"""
+        keep = np.ones(len(self.vectors), dtype=bool)
+        keep[indices] = False
+        self.vectors = self.vectors[keep]
+        self.sq_norms = self.sq_norms[keep]
+        if self.trained:
+            new_ids = np.cumsum(keep) - 1
+            self.lists = [new_ids[ids[keep[ids]]] for ids in self.lists]
+    
+    def search(self, queries):
+        """Return approximate (best_indices, best_distances) for each query row"""
+        queries = as_matrix(queries)
+        best_indices = np.full(len(queries), -1)
+        best_distances = np.full(len(queries), np.inf, dtype=np.float32)
+        if len(queries) == 0 or len(self.vectors) == 0:
+            return best_indices, best_distances
+        
+        if not self.trained:
+            # Too small to be worth clustering: exact scan
+            return exact_search(queries, self.vectors, self.sq_norms)
+        
+        nprobe = min(self.nprobe, len(self.centroids))
+        centroid_distances = self.centroid_sq_norms[np.newaxis, :] - 2.0 * (queries @ self.centroids.T)
+        probes = np.argpartition(centroid_distances, nprobe - 1, axis=1)[:, :nprobe]
+        query_sq_norms = squared_norms(queries)
+        
+        for row, query in enumerate(queries):
+            candidates = np.concatenate([self.lists[cluster_id] for cluster_id in probes[row]])
+            if len(candidates) == 0:
+                continue
+            sq_distances = self.sq_norms[candidates] - 2.0 * (self.vectors[candidates] @ query)
+            best = np.argmin(sq_distances)
+            best_indices[row] = candidates[best]
+            best_distances[row] = np.sqrt(max(sq_distances[best] + query_sq_norms[row], 0.0))
+        
+        return best_indices, best_distances
+
+MATCHERS = {
+    'exact': BruteForceMatcher,
+    'ivf': IVFMatcher
+}
+
+def create_matcher(matcher='exact', **options):
+    """Create a matcher by name, or pass through an already constructed matcher"""
+    if not isinstance(matcher, str):
+        return matcher
+    if matcher not in MATCHERS:
+        raise ValueError(f"Unknown face matcher '{matcher}'. Choose from: {', '.join(MATCHERS)}")
+    return MATCHERS[matcher](**options)
\ No newline at end of file
@@ -0,0 +1,135 @@
+import cv2
+import threading
+import numpy as np
+
+class FrameContext:
+    """Derived images of one frame, each computed once on first use
+    
+    Detectors ask the context for gray/HSV/RGB/downscaled versions instead of converting
+    the frame themselves. Conversions write into buffers that are kept between frames,
+    so a steady stream of same-sized frames allocates nothing after the first one.
+    Safe to share between concurrently running detector stages.
+    """
+    
+    def __init__(self, frame=None):
+        self.frame = None
+        self.frame_index = -1
+        self.buffers = {}
+        self.cache = {}
+        self.locks = {}
+        self.origin = (0, 0)  # offset of this frame inside the full frame (see crop)
+        self.parent = None
+        if frame is not None:
+            self.reset(frame)
+    
+    def reset(self, frame):
+        """Start a new frame; previously derived images become stale"""
+        self.frame = frame
+        self.frame_index += 1
+        self.cache.clear()
+        return self
+    
+    def buffer(self, key, shape):
+        """Reusable uint8 output buffer, reallocated only when the frame size changes"""
+        buf = self.buffers.get(key)
+        if buf is None or buf.shape != shape:
+            buf = np.empty(shape, dtype=np.uint8)
+            self.buffers[key] = buf
+        return buf
+    
+    def get(self, key, compute):
+        """Return the cached derived image, computing it once even with concurrent callers"""
+        value = self.cache.get(key)
+        if value is not None:
+            return value
+        
+        with self.locks.setdefault(key, threading.Lock()):
+            value = self.cache.get(key)
+            if value is None:
+                value = compute()
+                self.cache[key] = value
+        return value
+    
+    def crop(self, x, y, w, h):
+        """Context for a region of this frame, with coordinates relative to (x, y)
+        
+        The crop's frame is a view, not a copy. Its grayscale image is a slice of this
+        frame's, so every crop shares one full-frame conversion; other derived images are
+        sliced too when this frame already computed them.
+        """
+        child = FrameContext(self.frame[y:y + h, x:x + w])
+        child.origin = (x, y)
+        child.parent = self
+        child.cache['gray'] = self.gray[y:y + h, x:x + w]
+        for key in ('hsv', 'rgb'):
+            value = self.cache.get(key)
+            if value is not None:
+                child.cache[key] = value[y:y + h, x:x + w]
+        return child
+    
+    @property
+    def gray(self):
+        return self.get('gray', lambda: cv2.cvtColor(
+            self.frame, cv2.COLOR_BGR2GRAY, dst=self.buffer('gray', self.frame.shape[:2])))
+    
+    @property
+    def hsv(self):
+        return self.get('hsv', lambda: cv2.cvtColor(
+            self.frame, cv2.COLOR_BGR2HSV, dst=self.buffer('hsv', self.frame.shape)))
+    
+    @property
+    def rgb(self):
+        return self.get('rgb', lambda: cv2.cvtColor(
+            self.frame, cv2.COLOR_BGR2RGB, dst=self.buffer('rgb', self.frame.shape)))
+    
+    def scaled_size(self, scale):
+        """(width, height) cv2.resize picks for fx=fy=scale"""
+        height, width = self.frame.shape[:2]
+        return int(round(width * scale)), int(round(height * scale))
+    
+    def scaled(self, scale):
+        """BGR frame resized by a factor (e.g. 0.25 for face recognition)"""
+        if scale == 1:
+            return self.frame
+        
+        def compute():
+            width, height = self.scaled_size(scale)
+            dst = self.buffer(('scaled', scale), (height, width, 3))
+            return cv2.resize(self.frame, (width, height), dst=dst)
+        
+        return self.get(('scaled', scale), compute)
+    
+    def rgb_scaled(self, scale):
+        """Contiguous RGB copy of the resized frame, as face_recognition expects"""
+        if scale == 1:
+            return self.rgb
+        
+        def compute():
+            small = self.scaled(scale)
+            return cv2.cvtColor(small, cv2.COLOR_BGR2RGB, dst=self.buffer(('rgb_scaled', scale), small.shape))
+        
+        return self.get(('rgb_scaled', scale), compute)
+    
+    def gray_scaled(self, scale):
+        """Grayscale frame resized by a factor"""
+        if scale == 1:
+            return self.gray
+        
+        def compute():
+            width, height = self.scaled_size(scale)
+            return cv2.resize(self.gray, (width, height), dst=self.buffer(('gray_scaled', scale), (height, width)))
+        
+        return self.get(('gray_scaled', scale), compute)
+    
+    def pyramid(self, level):
+        """Gaussian pyramid level of the BGR frame (level 0 is the frame itself)"""
+        if level == 0:
+            return self.frame
+        
+        def compute():
+            previous = self.pyramid(level - 1)
+            height, width = previous.shape[:2]
+            shape = ((height + 1) // 2, (width + 1) // 2, 3)
+            return cv2.pyrDown(previous, dst=self.buffer(('pyramid', level), shape))
+        
+        return self.get(('pyramid', level), compute)
\ No newline at end of file
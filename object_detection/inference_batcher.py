@@ -0,0 +1,92 @@
+import threading
+import time
+from concurrent.futures import Future
+
+class InferenceBatcher:
+    """Gathers frames submitted from several threads into batched detector calls
+    
+    Frames from different cameras (or consecutive frames of one stream) are queued and
+    handed to detect_batch together, so the network runs one forward pass per batch. A
+    batch is run as soon as max_batch frames are waiting, or max_wait_ms after its first
+    frame arrived, whichever comes first.
+    """
+    
+    def __init__(self, detect_batch, max_batch=8, max_wait_ms=20.0):
+        # detect_batch(frames) -> one result per frame, in order
+        self.detect_batch = detect_batch
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait_ms / 1000.0
+        self.pending = []  # (frame, future, submitted_at)
+        self.condition = threading.Condition()
+        self.thread = None
+        self.running = False
+        
+        self.batches = 0
+        self.frames = 0
+        self.total_ms = 0.0
+    
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name='inference-batcher', daemon=True)
+        self.thread.start()
+        return self
+    
+    def submit(self, frame):
+        """Queue a frame; returns a Future for its detections"""
+        future = Future()
+        with self.condition:
+            if not self.running:
+                raise RuntimeError("InferenceBatcher is not running")
+            self.pending.append((frame, future, time.perf_counter()))
+            self.condition.notify()
+        return future
+    
+    def detect(self, frame):
+        """Blocking submit: this frame's detections once its batch has run"""
+        return self.submit(frame).result()
+    
+    def next_batch(self):
+        with self.condition:
+            self.condition.wait_for(lambda: self.pending or not self.running)
+            if not self.pending:
+                return None
+            # Give the other cameras until the first frame's deadline to join the batch
+            deadline = self.pending[0][2] + self.max_wait
+            self.condition.wait_for(lambda: len(self.pending) >= self.max_batch or not self.running,
+                                    timeout=max(0.0, deadline - time.perf_counter()))
+            batch = self.pending[:self.max_batch]
+            del self.pending[:self.max_batch]
+            return batch
+    
+    def run(self):
+        while True:
+            batch = self.next_batch()
+            if batch is None:
+                break
+            
+            start = time.perf_counter()
+            try:
+                results = self.detect_batch([frame for frame, _, _ in batch])
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            self.total_ms += (time.perf_counter() - start) * 1000
+            self.batches += 1
+            self.frames += len(batch)
+            for (_, future, _), result in zip(batch, results):
+                future.set_result(result)
+    
+    def stop(self):
+        """Run whatever is still queued, then stop the batching thread"""
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        if self.thread is not None:
+            self.thread.join()
+    
+    def report(self):
+        if not self.batches:
+            return "Inference batcher: no batches run"
+        return (f"Inference batcher: {self.frames} frames in {self.batches} batches "
+                f"({self.frames / self.batches:.1f} per batch), {self.total_ms / self.frames:.1f} ms per frame")
\ No newline at end of file
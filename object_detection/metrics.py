@@ -0,0 +1,261 @@
+import argparse
+import os
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Histogram bucket upper bounds in ms; 33/66 ms are one frame at 30/15 fps
+BUCKETS_MS = (1, 2, 5, 10, 20, 33, 50, 66, 100, 200, 500, 1000, 2000)
+
+class Histogram:
+    """Fixed-bucket latency histogram: constant memory, a bisect and a few adds per sample"""
+    
+    def __init__(self, alpha=0.1):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)  # last bucket is +Inf
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.alpha = alpha
+        self.recent_ms = None  # EWMA, for the overlay
+    
+    def observe(self, ms):
+        self.counts[bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+        self.recent_ms = ms if self.recent_ms is None else self.recent_ms + self.alpha * (ms - self.recent_ms)
+    
+    def quantile(self, q):
+        """Estimated q-quantile in ms, interpolated within its bucket"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            if seen + bucket_count >= rank and bucket_count:
+                lower = BUCKETS_MS[i - 1] if i > 0 else 0.0
+                upper = BUCKETS_MS[i] if i < len(BUCKETS_MS) else self.max_ms
+                return min(self.max_ms, lower + (upper - lower) * (rank - seen) / bucket_count)
+            seen += bucket_count
+        return self.max_ms
+
+class StageTimer:
+    __slots__ = ('metrics', 'stage', 'start')
+    
+    def __init__(self, metrics, stage):
+        self.metrics = metrics
+        self.stage = stage
+    
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc):
+        self.metrics.observe(self.stage, (time.perf_counter() - self.start) * 1000)
+        return False
+
+class NullTimer:
+    """What time() returns when metrics are off: entering and leaving it does nothing"""
+    __slots__ = ()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        return False
+
+NULL_TIMER = NullTimer()
+
+class Metrics:
+    """Per-stage timing of the run loops (capture, each detector, logging, rendering)
+    
+    Stages are timed with `with metrics.time('capture'):` or fed measured times through
+    observe(); each stage keeps a fixed-bucket histogram. The numbers are exposed as overlay
+    lines, a Prometheus text file and/or a local HTTP /metrics endpoint, and a periodic
+    summary printed to the log. Extra hooks (callables taking stage and ms) see every sample.
+    Disabled, time() returns a shared no-op timer and observe() returns at once.
+    """
+    
+    def __init__(self, enabled=True, overlay=False, prometheus_file=None, prometheus_port=None,
+                 summary_interval=60.0, export_interval=5.0, hooks=()):
+        self.enabled = enabled
+        self.overlay = overlay and enabled
+        self.prometheus_file = prometheus_file
+        self.summary_interval = summary_interval
+        self.export_interval = export_interval
+        self.hooks = list(hooks)
+        self.histograms = {}
+        self.lock = threading.Lock()
+        
+        self.frames = 0
+        self.started = time.perf_counter()
+        self.next_summary = self.started + summary_interval if summary_interval else None
+        self.next_export = self.started
+        self.server = None
+        if enabled and prometheus_port:
+            self.serve(prometheus_port)
+    
+    @classmethod
+    def from_args(cls, args):
+        """Metrics configured by the flags add_arguments() defines (disabled if none is given)"""
+        enabled = bool(args.metrics or args.metrics_overlay or args.metrics_file or args.metrics_port)
+        return cls(enabled=enabled, overlay=args.metrics_overlay, prometheus_file=args.metrics_file,
+                   prometheus_port=args.metrics_port, summary_interval=args.metrics_interval)
+    
+    def add_hook(self, hook):
+        self.hooks.append(hook)
+    
+    def time(self, stage):
+        if not self.enabled:
+            return NULL_TIMER
+        return StageTimer(self, stage)
+    
+    def observe(self, stage, ms):
+        if not self.enabled:
+            return
+        with self.lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = Histogram()
+            histogram.observe(ms)
+        for hook in self.hooks:
+            hook(stage, ms)
+    
+    def observe_stages(self, stage_ms):
+        """Record a {stage: ms} dict, e.g. the per-stage times of one frame"""
+        if not self.enabled:
+            return
+        for stage, ms in stage_ms.items():
+            self.observe(stage, ms)
+    
+    def tick(self, now=None):
+        """Count a frame; writes the Prometheus file and prints the summary when they are due"""
+        if not self.enabled:
+            return
+        now = time.perf_counter() if now is None else now
+        # Several camera threads may tick; only one of them exports each time
+        with self.lock:
+            self.frames += 1
+            export = self.prometheus_file and now >= self.next_export
+            if export:
+                self.next_export = now + self.export_interval
+            summary = self.next_summary is not None and now >= self.next_summary
+            if summary:
+                self.next_summary = now + self.summary_interval
+        if export:
+            self.write_prometheus()
+        if summary:
+            print(self.summary_text())
+    
+    def status_lines(self):
+        """Overlay lines: recent ms per stage, slowest first"""
+        if not self.overlay:
+            return []
+        with self.lock:
+            stages = sorted(((name, h.recent_ms) for name, h in self.histograms.items()), key=lambda item: -item[1])
+        return [", ".join(f"{name} {ms:.1f}" for name, ms in stages[i:i + 3]) for i in range(0, len(stages), 3)]
+    
+    def summary_text(self):
+        elapsed = time.perf_counter() - self.started
+        lines = [f"Stage timings: {self.frames} frames in {elapsed:.0f}s ({self.frames / elapsed if elapsed else 0:.1f} fps)"]
+        with self.lock:
+            items = sorted(self.histograms.items(), key=lambda item: -item[1].total_ms)
+            for name, h in items:
+                lines.append(f"  {name:<24} mean {h.total_ms / h.count:7.1f}  p50 {h.quantile(0.5):7.1f}  "
+                             f"p95 {h.quantile(0.95):7.1f}  p99 {h.quantile(0.99):7.1f}  max {h.max_ms:7.1f} ms  (n={h.count})")
+        return "\n".join(lines)
+    
+    def prometheus_text(self):
+        """All histograms in the Prometheus text exposition format (seconds)"""
+        lines = [
+            "# HELP detection_stage_duration_seconds Time spent per pipeline stage",
+            "# TYPE detection_stage_duration_seconds histogram"
+        ]
+        with self.lock:
+            for name, h in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(BUCKETS_MS, h.counts):
+                    cumulative += bucket_count
+                    lines.append(f'detection_stage_duration_seconds_bucket{{stage="{name}",le="{bound / 1000:g}"}} {cumulative}')
+                lines.append(f'detection_stage_duration_seconds_bucket{{stage="{name}",le="+Inf"}} {h.count}')
+                lines.append(f'detection_stage_duration_seconds_sum{{stage="{name}"}} {h.total_ms / 1000:.6f}')
+                lines.append(f'detection_stage_duration_seconds_count{{stage="{name}"}} {h.count}')
+        lines.append("# HELP detection_frames_total Frames processed by the run loop")
+        lines.append("# TYPE detection_frames_total counter")
+        lines.append(f"detection_frames_total {self.frames}")
+        return "\n".join(lines) + "\n"
+    
+    def write_prometheus(self):
+        """Write the text file atomically, for node_exporter's textfile collector"""
+        temp_path = self.prometheus_file + '.tmp'
+        with open(temp_path, 'w') as f:
+            f.write(self.prometheus_text())
+        os.replace(temp_path, self.prometheus_file)
+    
+    def serve(self, port):
+        """Serve /metrics on localhost only, from a background thread"""
+        metrics = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus_text().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, *args):
+                pass
+        
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        threading.Thread(target=self.server.serve_forever, name='metrics-http', daemon=True).start()
+        print(f"Metrics at http://127.0.0.1:{port}/metrics")
+    
+    def close(self):
+        """Final export and summary"""
+        if not self.enabled:
+            return
+        if self.prometheus_file:
+            self.write_prometheus()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+        print(self.summary_text())
+
+def add_arguments(parser):
+    """The --metrics* flags shared by the run scripts"""
+    parser.add_argument('--metrics', action='store_true', help="Time every pipeline stage and print periodic summaries")
+    parser.add_argument('--metrics-overlay', action='store_true', help="Show per-stage times on the video")
+    parser.add_argument('--metrics-file', help="Write Prometheus text-format metrics to this file")
+    parser.add_argument('--metrics-port', type=int, help="Serve Prometheus metrics on 127.0.0.1:PORT/metrics")
+    parser.add_argument('--metrics-interval', type=float, default=60.0, help="Seconds between log summaries")
+
+def measure_overhead(samples=200000):
+    """ns per timed block with metrics enabled and disabled"""
+    results = {}
+    for enabled in (False, True):
+        metrics = Metrics(enabled=enabled, summary_interval=None)
+        start = time.perf_counter()
+        for _ in range(samples):
+            with metrics.time('stage'):
+                pass
+        results['enabled' if enabled else 'disabled'] = (time.perf_counter() - start) * 1e9 / samples
+    
+    start = time.perf_counter()
+    for _ in range(samples):
+        pass
+    results['empty loop'] = (time.perf_counter() - start) * 1e9 / samples
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the overhead of the stage timing instrumentation")
+    parser.add_argument('--samples', type=int, default=200000)
+    args = parser.parse_args()
+    for name, ns in measure_overhead(args.samples).items():
+        print(f"{name:<12} {ns:8.0f} ns per timed block")
\ No newline at end of file
@@ -0,0 +1,265 @@
+import argparse
+import cv2
+import hashlib
+import json
+import numpy as np
+import os
+import time
+from collections import deque
+from datetime import datetime
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models')
+MANIFEST = 'manifest.json'
+
+# --backend name -> (DNN backend, DNN target)
+BACKENDS = {
+    'opencv': (cv2.dnn.DNN_BACKEND_OPENCV, cv2.dnn.DNN_TARGET_CPU),
+    'opencl': (cv2.dnn.DNN_BACKEND_OPENCV, cv2.dnn.DNN_TARGET_OPENCL),
+    'cuda': (cv2.dnn.DNN_BACKEND_CUDA, cv2.dnn.DNN_TARGET_CUDA),
+    'cuda_fp16': (cv2.dnn.DNN_BACKEND_CUDA, cv2.dnn.DNN_TARGET_CUDA_FP16),
+    'openvino': (cv2.dnn.DNN_BACKEND_INFERENCE_ENGINE, cv2.dnn.DNN_TARGET_CPU)
+}
+
+def sha256_file(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class ModelRegistry:
+    """Detection model variants available on disk, as listed in models/manifest.json
+    
+    The manifest gives each variant's files, SHA-256 checksums, preprocessing and default
+    input size. Nothing is ever downloaded: missing files are reported together with
+    where to get them.
+    """
+    
+    def __init__(self, models_dir=MODELS_DIR):
+        self.models_dir = models_dir
+        self.manifest_path = os.path.join(models_dir, MANIFEST)
+        self.variants = {}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                self.variants = json.load(f)
+    
+    def path(self, filename):
+        return os.path.join(self.models_dir, filename)
+    
+    def spec(self, name):
+        if name not in self.variants:
+            raise ValueError(f"Unknown model variant '{name}'. Available: {', '.join(self.variants) or 'none'}")
+        return self.variants[name]
+    
+    def files(self, name):
+        spec = self.spec(name)
+        files = [spec['config'], spec['weights']]
+        if isinstance(spec.get('classes'), str):
+            files.append(spec['classes'])
+        return files
+    
+    def verify(self, name):
+        """Problems that keep a variant from loading (missing files, checksum mismatches); [] if none"""
+        spec = self.spec(name)
+        problems = []
+        for filename in self.files(name):
+            path = self.path(filename)
+            if not os.path.exists(path):
+                source = spec.get('sources', {}).get(filename)
+                problems.append(f"missing {path}" + (f" (download it from {source})" if source else ""))
+                continue
+            expected = spec.get('sha256', {}).get(filename)
+            if expected and sha256_file(path) != expected:
+                problems.append(f"checksum mismatch for {path}")
+        return problems
+    
+    def unpinned(self, name):
+        """Files of a variant that have no checksum in the manifest yet"""
+        checksums = self.spec(name).get('sha256', {})
+        return [filename for filename in self.files(name) if not checksums.get(filename)]
+    
+    def pin(self, name):
+        """Record the checksums of a variant's files as they are on disk now"""
+        spec = self.spec(name)
+        checksums = spec.setdefault('sha256', {})
+        for filename in self.files(name):
+            path = self.path(filename)
+            if os.path.exists(path):
+                checksums[filename] = sha256_file(path)
+        with open(self.manifest_path, 'w') as f:
+            json.dump(self.variants, f, indent=2)
+        return checksums
+    
+    def model(self, name, **kwargs):
+        """A model for this variant; nothing is loaded until it is first used"""
+        self.spec(name)
+        return LazyModel(self, name, **kwargs)
+
+class LazyModel:
+    """One model variant, loaded, verified and warmed up the first time it is used
+    
+    Cold start (verify + load + first inference) and steady-state inference latency are
+    tracked per variant, printed, and appended to a JSONL latency log.
+    """
+    
+    def __init__(self, registry, name, input_size=None, backend='opencv', warmup_runs=2,
+                 latency_log='model_latency.jsonl'):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend '{backend}'. Choose from: {', '.join(BACKENDS)}")
+        self.registry = registry
+        self.name = name
+        self.spec = registry.spec(name)
+        self.input_size = input_size or self.spec['input_size']
+        self.backend = backend
+        self.warmup_runs = warmup_runs
+        self.latency_log = latency_log
+        
+        self.net = None
+        self.output_layers = []
+        self.classes = []
+        self.output = self.spec['output']
+        self.failed = False
+        
+        self.cold_start_ms = None
+        self.latencies = deque(maxlen=1000)
+        self.inferences = 0
+    
+    def load(self):
+        """Load and warm up the network on first call; False if it can't be loaded"""
+        if self.net is not None:
+            return True
+        if self.failed:
+            return False
+        
+        start = time.perf_counter()
+        problems = self.registry.verify(self.name)
+        if problems:
+            print(f"Model '{self.name}' is not available:")
+            for problem in problems:
+                print(f"  {problem}")
+            self.failed = True
+            return False
+        for filename in self.registry.unpinned(self.name):
+            print(f"Warning: no checksum pinned for {filename} (run: python model_registry.py pin {self.name})")
+        
+        try:
+            net = cv2.dnn.readNet(self.registry.path(self.spec['weights']), self.registry.path(self.spec['config']))
+            net.setPreferableBackend(BACKENDS[self.backend][0])
+            net.setPreferableTarget(BACKENDS[self.backend][1])
+        except cv2.error as e:
+            print(f"Error loading model '{self.name}': {e}")
+            self.failed = True
+            return False
+        
+        classes = self.spec.get('classes', [])
+        if isinstance(classes, str):
+            with open(self.registry.path(classes)) as f:
+                classes = [line.strip() for line in f.readlines()]
+        self.classes = classes
+        # Looked up once here rather than on every forward pass
+        self.output_layers = net.getUnconnectedOutLayersNames()
+        self.net = net
+        load_ms = (time.perf_counter() - start) * 1000
+        
+        # The first passes allocate buffers and pick kernels; keep them out of the steady-state numbers
+        warmup_frame = np.zeros((self.input_size, self.input_size, 3), np.uint8)
+        first_start = time.perf_counter()
+        self.run([warmup_frame])
+        first_ms = (time.perf_counter() - first_start) * 1000
+        for _ in range(self.warmup_runs - 1):
+            self.run([warmup_frame])
+        self.cold_start_ms = load_ms + first_ms
+        
+        print(f"Model '{self.name}' ({self.input_size}x{self.input_size}, {self.backend}) ready: "
+              f"load {load_ms:.0f} ms + first inference {first_ms:.0f} ms, {max(self.warmup_runs, 1)} warm-up runs")
+        return True
+    
+    def blob(self, frames):
+        size = (self.input_size, self.input_size)
+        return cv2.dnn.blobFromImages(frames, self.spec['scale'], size, tuple(self.spec['mean']),
+                                      self.spec['swap_rb'], crop=False)
+    
+    def run(self, frames):
+        self.net.setInput(self.blob(frames))
+        return self.net.forward(self.output_layers)
+    
+    def forward(self, frames):
+        """Raw network outputs for a batch of frames (the model must be loaded)"""
+        start = time.perf_counter()
+        outputs = self.run(frames)
+        self.latencies.append((time.perf_counter() - start) * 1000 / len(frames))
+        self.inferences += len(frames)
+        return outputs
+    
+    def percentile(self, q):
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    
+    def report(self):
+        if self.net is None:
+            return f"Model '{self.name}': not loaded"
+        text = f"Model '{self.name}' ({self.input_size}x{self.input_size}, {self.backend}): cold start {self.cold_start_ms:.0f} ms"
+        if self.latencies:
+            text += (f", steady state p50 {self.percentile(0.5):.1f} ms / p95 {self.percentile(0.95):.1f} ms "
+                     f"per frame over {self.inferences} frames")
+        return text
+    
+    def log_latency(self):
+        """Append this run's latency figures to the latency log"""
+        if self.net is None or not self.latency_log:
+            return
+        entry = {
+            'timestamp': datetime.now().isoformat(),
+            'variant': self.name,
+            'input_size': self.input_size,
+            'backend': self.backend,
+            'cold_start_ms': round(self.cold_start_ms, 1),
+            'frames': self.inferences
+        }
+        if self.latencies:
+            entry['p50_ms'] = round(self.percentile(0.5), 2)
+            entry['p95_ms'] = round(self.percentile(0.95), 2)
+        with open(self.latency_log, 'a') as f:
+            f.write(json.dumps(entry) + '\n')
+
+def main():
+    parser = argparse.ArgumentParser(description="List, verify, pin and time the local detection models")
+    parser.add_argument('command', choices=['list', 'verify', 'pin', 'bench'])
+    parser.add_argument('variant', nargs='?', help="Model variant (all variants for list/verify)")
+    parser.add_argument('--input-size', type=int, help="Network input size (multiple of 32 for YOLO)")
+    parser.add_argument('--backend', choices=list(BACKENDS), default='opencv')
+    parser.add_argument('--frames', type=int, default=50, help="bench: timed inferences after warm-up")
+    args = parser.parse_args()
+    
+    registry = ModelRegistry()
+    names = [args.variant] if args.variant else list(registry.variants)
+    
+    if args.command in ('list', 'verify'):
+        for name in names:
+            problems = registry.verify(name)
+            unpinned = registry.unpinned(name)
+            state = 'ok' if not problems else 'unavailable'
+            print(f"{name:<15} {state:<12} {registry.spec(name).get('description', '')}")
+            for problem in problems:
+                print(f"    {problem}")
+            if args.command == 'verify' and unpinned:
+                print(f"    no checksum pinned: {', '.join(unpinned)}")
+    elif args.command == 'pin':
+        if not args.variant:
+            parser.error("pin needs a variant")
+        for filename, checksum in registry.pin(args.variant).items():
+            print(f"{filename}: {checksum or 'missing'}")
+    else:
+        if not args.variant:
+            parser.error("bench needs a variant")
+        model = registry.model(args.variant, input_size=args.input_size, backend=args.backend)
+        if not model.load():
+            return
+        frame = np.random.default_rng(0).integers(0, 255, (720, 1280, 3), dtype=np.uint8)
+        for _ in range(args.frames):
+            model.forward([frame])
+        print(model.report())
+        model.log_latency()
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
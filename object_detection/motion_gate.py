@@ -0,0 +1,89 @@
+def pad_box(box, padding, min_padding, width, height):
+    """Grow an (x, y, w, h) box by a fraction of its size (at least min_padding px), clipped to the frame"""
+    x, y, w, h = box
+    pad_x = max(int(w * padding), min_padding)
+    pad_y = max(int(h * padding), min_padding)
+    return [max(0, x - pad_x), max(0, y - pad_y), min(width, x + w + pad_x), min(height, y + h + pad_y)]
+
+def merge_boxes(boxes):
+    """Union (x1, y1, x2, y2) boxes until none overlap or touch"""
+    boxes = [list(box) for box in boxes]
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(boxes)):
+            for j in range(i + 1, len(boxes)):
+                a, b = boxes[i], boxes[j]
+                if a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]:
+                    boxes[i] = [min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])]
+                    del boxes[j]
+                    merged = True
+                    break
+            if merged:
+                break
+    return boxes
+
+def offset_record(record, dx, dy):
+    """Map a detection record found in a crop back to full-frame coordinates"""
+    if 'bbox' in record:
+        x, y, w, h = record['bbox']
+        record['bbox'] = [int(x + dx), int(y + dy), int(w), int(h)]
+    if 'eyes' in record:
+        record['eyes'] = [[int(ex + dx), int(ey + dy), int(ew), int(eh)] for (ex, ey, ew, eh) in record['eyes']]
+    return record
+
+class MotionGate:
+    """Decides where the expensive detectors look, based on this frame's motion boxes
+    
+    regions() returns None when the whole frame should be scanned (every refresh_interval
+    frames, or when motion covers most of the frame anyway), otherwise a list of padded,
+    merged (x, y, w, h) crops - empty when nothing moves, so the detectors are skipped.
+    """
+    
+    def __init__(self, padding=0.25, min_padding=32, refresh_interval=30, max_coverage=0.6):
+        self.padding = padding
+        self.min_padding = min_padding
+        self.refresh_interval = refresh_interval
+        self.max_coverage = max_coverage
+        self.frames_since_refresh = None
+        
+        self.full_frames = 0
+        self.gated_frames = 0
+        self.skipped_frames = 0
+        self.area_scanned = 0.0  # sum over frames of the scanned fraction of the frame
+    
+    def regions(self, motion_boxes, frame_shape):
+        height, width = frame_shape[:2]
+        
+        if self.frames_since_refresh is None or self.frames_since_refresh + 1 >= self.refresh_interval:
+            return self.full_frame()
+        self.frames_since_refresh += 1
+        
+        if not motion_boxes:
+            self.skipped_frames += 1
+            return []
+        
+        padded = [pad_box(box, self.padding, self.min_padding, width, height) for box in motion_boxes]
+        crops = [[x1, y1, x2 - x1, y2 - y1] for x1, y1, x2, y2 in merge_boxes(padded)]
+        
+        coverage = sum(w * h for _, _, w, h in crops) / float(width * height)
+        if coverage >= self.max_coverage:
+            # Cropping no longer saves much; scanning once also avoids misses at crop edges
+            return self.full_frame()
+        
+        self.gated_frames += 1
+        self.area_scanned += coverage
+        return crops
+    
+    def full_frame(self):
+        self.frames_since_refresh = 0
+        self.full_frames += 1
+        self.area_scanned += 1.0
+        return None
+    
+    def report(self):
+        frames = self.full_frames + self.gated_frames + self.skipped_frames
+        if not frames:
+            return "Motion gate: no frames processed"
+        return (f"Motion gate: {self.full_frames} full, {self.gated_frames} cropped, {self.skipped_frames} skipped frames; "
+                f"{100 * self.area_scanned / frames:.0f}% of the frame area scanned on average")
\ No newline at end of file
@@ -1,146 +1,240 @@
+import argparse
 import cv2
 import numpy as np
-import urllib.request
-import os
+import threading
+import time
+from collections import deque
+from capture import ThreadedCapture
+from inference_batcher import InferenceBatcher
+from metrics import Metrics, add_arguments as add_metrics_arguments
+from model_registry import BACKENDS, ModelRegistry
+from overlay import OverlayRenderer
+
+def decode_yolo(outputs, width, height, confidence_threshold=0.5, nms_threshold=0.4, class_nms=False,
+                multiply_objectness=False):
+    """Decode YOLO output rows (cx, cy, w, h, objectness, class scores...) with array operations
+    
+    Returns (boxes, confidences, class_ids) arrays of the boxes kept by NMS. OpenCV's
+    darknet importer already multiplies the class scores by objectness, so only set
+    multiply_objectness for models exported without that step. With class_nms, boxes only
+    suppress boxes of their own class.
+    """
+    rows = np.concatenate(outputs) if len(outputs) > 1 else outputs[0]
+    scores = rows[:, 5:]
+    if multiply_objectness:
+        scores = scores * rows[:, 4:5]
+    
+    class_ids = scores.argmax(axis=1)
+    confidences = scores[np.arange(len(rows)), class_ids]
+    keep = confidences > confidence_threshold
+    rows, confidences, class_ids = rows[keep], confidences[keep], class_ids[keep]
+    
+    # Same integer rounding as int() on each value: truncate the center and size, then the corner
+    center_x = (rows[:, 0] * width).astype(np.int32)
+    center_y = (rows[:, 1] * height).astype(np.int32)
+    w = (rows[:, 2] * width).astype(np.int32)
+    h = (rows[:, 3] * height).astype(np.int32)
+    boxes = np.stack([(center_x - w / 2).astype(np.int32), (center_y - h / 2).astype(np.int32), w, h], axis=1)
+    
+    if not len(boxes):
+        return boxes, confidences, class_ids
+    
+    # Apply Non-Maximum Suppression
+    if class_nms:
+        indices = cv2.dnn.NMSBoxesBatched(boxes, confidences, class_ids, confidence_threshold, nms_threshold)
+    else:
+        indices = cv2.dnn.NMSBoxes(boxes, confidences, confidence_threshold, nms_threshold)
+    indices = np.asarray(indices, dtype=np.int64).reshape(-1)
+    return boxes[indices], confidences[indices], class_ids[indices]
+
+def decode_ssd(output, index, width, height, confidence_threshold=0.5):
+    """Boxes of one frame from an SSD detection_out blob: rows of (image, class, score, x1, y1, x2, y2)
+    
+    The network has already applied NMS. Returns (boxes, confidences, class_ids) arrays.
+    """
+    rows = output.reshape(-1, 7)
+    rows = rows[(rows[:, 0] == index) & (rows[:, 2] > confidence_threshold)]
+    x1 = (rows[:, 3] * width).astype(np.int32)
+    y1 = (rows[:, 4] * height).astype(np.int32)
+    x2 = (rows[:, 5] * width).astype(np.int32)
+    y2 = (rows[:, 6] * height).astype(np.int32)
+    boxes = np.stack([x1, y1, x2 - x1, y2 - y1], axis=1)
+    return boxes, rows[:, 2], rows[:, 1].astype(np.int64)
 
 class ObjectDetector:
-    def __init__(self):
-        self.net = None
-        self.classes = []
-        self.setup_yolo()
+    def __init__(self, variant='yolov3', input_size=None, backend='opencv', confidence_threshold=0.5,
+                 nms_threshold=0.4, class_nms=False, registry=None):
+        # Nothing is loaded here; the model is verified, loaded and warmed up on first use
+        self.model = (registry or ModelRegistry()).model(variant, input_size=input_size, backend=backend)
+        self.confidence_threshold = confidence_threshold
+        self.nms_threshold = nms_threshold
+        # Per-class NMS keeps e.g. a person and the bicycle they overlap
+        self.class_nms = class_nms
     
-    def setup_yolo(self):
-        """Download and setup YOLO model"""
-        print("Setting up YOLO model...")
-        
-        # Create models directory
-        if not os.path.exists('models'):
-            os.makedirs('models')
-        
-        # Download YOLO files if not present
-        yolo_files = {
-            'yolov3.cfg': 'https://raw.githubusercontent.com/pjreddie/darknet/master/cfg/yolov3.cfg',
-            'coco.names': 'https://raw.githubusercontent.com/pjreddie/darknet/master/data/coco.names',
-            'yolov3.weights': 'https://pjreddie.com/media/files/yolov3.weights'
-        }
-        
-        for filename, url in yolo_files.items():
-            filepath = f'models/{filename}'
-            if not os.path.exists(filepath):
-                print(f"Downloading {filename}...")
-                try:
-                    urllib.request.urlretrieve(url, filepath)
-                    print(f"Downloaded {filename}")
-                except:
-                    print(f"Failed to download {filename}. Please download manually from: {url}")
-                    return False
-        
-        # Load YOLO
-        try:
-            self.net = cv2.dnn.readNet('models/yolov3.weights', 'models/yolov3.cfg')
-            
-            # Load class names
-            with open('models/coco.names', 'r') as f:
-                self.classes = [line.strip() for line in f.readlines()]
-            
-            print("YOLO model loaded successfully!")
-            return True
-        except Exception as e:
-            print(f"Error loading YOLO: {e}")
-            return False
+    @property
+    def net(self):
+        return self.model.net
+    
+    @property
+    def classes(self):
+        return self.model.classes
+    
+    def load(self):
+        """Load the model now instead of on the first frame; False if it isn't available"""
+        return self.model.load()
     
     def detect_objects(self, frame):
         """Detect objects in frame"""
-        if self.net is None:
-            return frame, []
-        
-        height, width = frame.shape[:2]
-        
-        # Create blob from image
-        blob = cv2.dnn.blobFromImage(frame, 0.00392, (416, 416), (0, 0, 0), True, crop=False)
-        self.net.setInput(blob)
-        
-        # Run inference
-        outputs = self.net.forward(self.net.getUnconnectedOutLayersNames())
+        return self.detect_batch([frame])[0]
+    
+    def detect_batch(self, frames):
+        """Detect objects in several frames (any sizes) with one forward pass; one list per frame"""
+        if not frames or not self.model.load():
+            return [[] for _ in frames]
+        
+        # Run inference on one blob for the whole batch
+        outputs = self.model.forward(frames)
+        
+        results = []
+        for i, frame in enumerate(frames):
+            height, width = frame.shape[:2]
+            if self.model.output == 'ssd':
+                results.append(self.records(*decode_ssd(outputs[0], i, width, height, self.confidence_threshold)))
+            else:
+                outputs_i = [self.batch_item(output, i, len(frames)) for output in outputs]
+                results.append(self.records(*decode_yolo(outputs_i, width, height, self.confidence_threshold,
+                                                         self.nms_threshold, self.class_nms)))
+        return results
+    
+    @staticmethod
+    def batch_item(output, index, batch_size):
+        """One frame's rows of a YOLO output: (rows, 85) at batch size 1, (batch, rows, 85) above"""
+        if output.ndim == 3:
+            return output[index]
+        return output.reshape(batch_size, -1, output.shape[-1])[index]
+    
+    def records(self, boxes, confidences, class_ids):
+        """Decoded boxes as detection records"""
+        detected_objects = []
+        for (x, y, w, h), confidence, class_id in zip(boxes.tolist(), confidences.tolist(), class_ids.tolist()):
+            detected_objects.append({
+                'type': 'object',
+                'label': str(self.classes[class_id]),
+                'confidence': confidence,
+                'bbox': [x, y, w, h]
+            })
+        
+        return detected_objects
+    
+    def run_detection(self, headless=False, sources=(0,), max_wait_ms=20, frames_per_source=1, metrics=None):
+        """Start real-time object detection on one or more cameras
+        
+        Each camera is read on its own thread; their frames are batched into one forward pass.
+        With frames_per_source > 1 a camera keeps reading while its earlier frames wait, so up
+        to that many consecutive frames of each camera join a batch (within max_wait_ms).
+        """
+        if not self.load():
+            print("Object detection model not loaded. Please check setup.")
+            return
         
-        # Process outputs
-        boxes = []
-        confidences = []
-        class_ids = []
+        metrics = metrics or Metrics(enabled=False)
+        
+        def timed_detect_batch(frames):
+            with metrics.time('inference'):
+                return self.detect_batch(frames)
+        
+        # Capture runs on its own thread; each read() returns the freshest frame
+        caps = [ThreadedCapture(source, policy='latest').start() for source in sources]
+        batcher = InferenceBatcher(timed_detect_batch, max_batch=len(caps) * frames_per_source,
+                                   max_wait_ms=max_wait_ms).start()
+        renderer = OverlayRenderer()
+        latest = [None] * len(caps)
+        stop = threading.Event()
+        
+        def camera_loop(index, cap):
+            in_flight = deque()  # (frame, future) of this camera, oldest first
+            while not stop.is_set():
+                with metrics.time('capture'):
+                    ret, frame = cap.read(timeout=1.0)
+                if not ret:
+                    if cap.ended:
+                        break
+                    continue
+                
+                # Detect objects (together with the other cameras' frames and this camera's next ones)
+                in_flight.append((frame, batcher.submit(frame)))
+                # Publish finished frames in order; wait only once this camera has a full batch queued
+                while in_flight and (in_flight[0][1].done() or len(in_flight) >= frames_per_source):
+                    frame, future = in_flight.popleft()
+                    with metrics.time('detect'):
+                        latest[index] = (frame, future.result())
+                    metrics.tick()
+        
+        threads = [threading.Thread(target=camera_loop, args=(i, cap), name=f'camera-{i}', daemon=True)
+                   for i, cap in enumerate(caps)]
+        for thread in threads:
+            thread.start()
+        
+        print("Object detection started. " + ("Press Ctrl+C to stop" if headless else "Press 'q' to quit"))
         
-        for output in outputs:
-            for detection in output:
-                scores = detection[5:]
-                class_id = np.argmax(scores)
-                confidence = scores[class_id]
+        try:
+            while any(thread.is_alive() for thread in threads):
+                if headless:
+                    time.sleep(0.1)
+                    continue
                 
-                if confidence > 0.5:  # Confidence threshold
-                    center_x = int(detection[0] * width)
-                    center_y = int(detection[1] * height)
-                    w = int(detection[2] * width)
-                    h = int(detection[3] * height)
+                for index, item in enumerate(latest):
+                    if item is None:
+                        continue
+                    latest[index] = None
+                    frame, objects = item
                     
-                    x = int(center_x - w / 2)
-                    y = int(center_y - h / 2)
+                    with metrics.time('render'):
+                        renderer.draw(frame, objects)
+                        
+                        # Display object count
+                        renderer.draw_status(frame, [f"Objects detected: {len(objects)}"] + metrics.status_lines(), font_scale=1)
                     
-                    boxes.append([x, y, w, h])
-                    confidences.append(float(confidence))
-                    class_ids.append(class_id)
-        
-        # Apply Non-Maximum Suppression
-        indices = cv2.dnn.NMSBoxes(boxes, confidences, 0.5, 0.4)
-        
-        detected_objects = []
-        
-        if len(indices) > 0:
-            for i in indices.flatten():
-                x, y, w, h = boxes[i]
-                label = str(self.classes[class_ids[i]])
-                confidence = confidences[i]
+                    window = 'Object Detection' if len(caps) == 1 else f'Object Detection - {sources[index]}'
+                    with metrics.time('display'):
+                        cv2.imshow(window, frame)
                 
-                # Draw bounding box
-                cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
-                cv2.putText(frame, f"{label} {confidence:.2f}", (x, y - 5), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
-                
-                detected_objects.append({
-                    'label': label,
-                    'confidence': confidence,
-                    'bbox': [x, y, w, h]
-                })
-        
-        return frame, detected_objects
-    
-    def run_detection(self):
-        """Start real-time object detection"""
-        if self.net is None:
-            print("YOLO model not loaded. Please check setup.")
-            return
-        
-        cap = cv2.VideoCapture(0)
-        
-        print("Object detection started. Press 'q' to quit")
-        
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            # Detect objects
-            frame, objects = self.detect_objects(frame)
-            
-            # Display object count
-            cv2.putText(frame, f"Objects detected: {len(objects)}", (10, 30), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
-            
-            cv2.imshow('Object Detection', frame)
-            
-            if cv2.waitKey(1) & 0xFF == ord('q'):
-                break
-        
-        cap.release()
-        cv2.destroyAllWindows()
+                if cv2.waitKey(1) & 0xFF == ord('q'):
+                    break
+        except KeyboardInterrupt:
+            print("\nStopping...")
+        
+        stop.set()
+        for thread in threads:
+            thread.join()
+        batcher.stop()
+        for cap in caps:
+            cap.release()
+        if not headless:
+            cv2.destroyAllWindows()
+        for source, cap in zip(sources, caps):
+            print(f"Capture {source}: {cap.frames_captured} frames grabbed, {cap.frames_dropped} stale frames dropped")
+        print(batcher.report())
+        print(self.model.report())
+        self.model.log_latency()
+        metrics.close()
 
 if __name__ == "__main__":
-    detector = ObjectDetector()
-    detector.run_detection()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Real-time YOLO object detection")
+    parser.add_argument('--model', default='yolov3', help="Model variant from models/manifest.json (e.g. yolov3-tiny, mobilenet-ssd)")
+    parser.add_argument('--input-size', type=int, help="Network input size, e.g. 320 or 608 (multiple of 32 for YOLO)")
+    parser.add_argument('--backend', choices=list(BACKENDS), default='opencv')
+    parser.add_argument('--headless', action='store_true', help="Detect only: no rendering and no window")
+    parser.add_argument('--sources', nargs='+', default=['0'], help="Camera indices or stream URLs, batched together")
+    parser.add_argument('--max-wait-ms', type=float, default=20, help="How long a frame waits for other frames to batch with")
+    parser.add_argument('--frames-per-source', type=int, default=1,
+                        help="Consecutive frames of each camera that may share a batch (adds up to --max-wait-ms of latency)")
+    parser.add_argument('--class-nms', action='store_true', help="Suppress overlapping boxes only within the same class")
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    
+    detector = ObjectDetector(args.model, input_size=args.input_size, backend=args.backend, class_nms=args.class_nms)
+    detector.run_detection(headless=args.headless,
+                           sources=[int(source) if source.isdigit() else source for source in args.sources],
+                           max_wait_ms=args.max_wait_ms, frames_per_source=args.frames_per_source,
+                           metrics=Metrics.from_args(args))
\ No newline at end of file
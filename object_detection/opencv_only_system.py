@@ -1,160 +1,229 @@
+import argparse
 import cv2
-import numpy as np
 import face_recognition
-import os
+import time
 from datetime import datetime
-import json
+from face_gallery import FaceGallery, GalleryWatcher
+from capture import ThreadedCapture
+from stage_executor import StageExecutor, run_stage
+from frame_context import FrameContext
+from overlay import OverlayRenderer
+from event_log import JsonlEventWriter
+from detection_history import DetectionHistory
+from motion_gate import MotionGate, offset_record
+from tracker import FaceTracker
+from scheduler import LatencyScheduler
+from color_engine import ColorEngine
+from face_locator import FaceLocator, FACE_BACKENDS
+from metrics import Metrics, add_arguments as add_metrics_arguments
+from event_recorder import EventRecorder, add_arguments as add_recorder_arguments
+
+# Detectors run in 'all' mode, in the order their results are merged
+ALL_STAGES = ['detect_faces_detailed', 'recognize_faces', 'detect_motion_advanced', 'detect_people', 'detect_colors']
+
+MODE_STAGES = {
+    'face': ['detect_faces_detailed'],
+    'recognition': ['recognize_faces'],
+    'motion': ['detect_motion_advanced'],
+    'people': ['detect_people'],
+    'color': ['detect_colors'],
+    'all': ALL_STAGES
+}
+
+# Expensive full-frame scanners that motion gating restricts to crops around movement
+GATED_STAGES = ('detect_faces_detailed', 'recognize_faces', 'detect_people')
+
+# Target rate (fps; None = every frame) and priority of each stage in the live loop.
+# Under load the lowest priorities (color, then people) are shed first.
+STAGE_SCHEDULE = {
+    'detect_motion_advanced': (None, 4),
+    'recognize_faces': (10, 3),
+    'detect_faces_detailed': (15, 2),
+    'detect_people': (5, 1),
+    'detect_colors': (5, 0)
+}
 
 class OpenCVDetectionSystem:
-    def __init__(self):
+    def __init__(self, face_matcher='exact', parallel_stages=True, stage_workers=None, stage_processes=False,
+                 motion_gating=False, face_tracking=False, latency_budget_ms=66, metrics=None, face_locator='haar',
+                 recorder=None, load_gallery=True, watch_gallery=True, gallery_workers=None):
         print("Initializing OpenCV-Only Detection System...")
         
         # Face recognition setup
-        self.known_face_encodings = []
-        self.known_face_names = []
+        self.face_gallery = None
+        self.gallery_watcher = None
+        self.face_matcher = face_matcher
+        
+        # One face detection pass per frame, shared by face annotation and recognition
+        self.face_locator = FaceLocator(face_locator)
         
         # OpenCV cascade classifiers (built-in, no downloads needed)
-        self.face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
         self.eye_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_eye.xml')
         self.body_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_fullbody.xml')
-        self.profile_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_profileface.xml')
         
         # Motion detection
-        self.bg_subtractor = cv2.createBackgroundSubtractorMOG2(detectShadows=True)
+        self.reset_background()
         self.motion_threshold = 500
         
-        # Color detection setup
+        # Optional: scan for faces/people only around motion, with a periodic full-frame refresh
+        self.motion_gate = MotionGate() if motion_gating else None
+        
+        # Color detection setup (a hue range may wrap around 180, like red)
         self.color_ranges = {
-            'red': ([0, 50, 50], [10, 255, 255]),
+            'red': ([170, 50, 50], [10, 255, 255]),
             'blue': ([100, 50, 50], [130, 255, 255]),
             'green': ([40, 50, 50], [80, 255, 255]),
             'yellow': ([20, 50, 50], [40, 255, 255])
         }
+        self.color_engine = ColorEngine(self.color_ranges)
         
         # Detection logs
-        self.detection_log = []
-        
-        # Load known faces
-        self.setup_face_recognition()
+        # Recent entries plus running totals; every entry is streamed to a JSONL file
+        self.detection_history = DetectionHistory(capacity=500)
+        self.event_writer = None
+        
+        # Load known faces (batch workers skip this when their mode doesn't recognise faces)
+        self.setup_face_recognition(load_gallery, watch_gallery, gallery_workers)
+        
+        # Optional: follow faces between frames and only re-encode new or stale ones
+        self.face_tracker = FaceTracker() if face_tracking else None
+        
+        # Stateful stages must run on this instance, never in a worker process. Recognition
+        # stays here too: the watcher hot-reloads this instance's gallery, not the workers'
+        in_process_stages = ['detect_motion_advanced', 'recognize_faces']
+        
+        # With gating, tracked recognition still sees the full frame so tracks stay in one coordinate system
+        self.gated_stages = [stage_name for stage_name in GATED_STAGES
+                             if not (self.face_tracker is not None and stage_name == 'recognize_faces')]
+        
+        # Live loop: run each detector at its target rate and shed low-priority ones under load
+        self.scheduler = None
+        if latency_budget_ms:
+            self.scheduler = LatencyScheduler(budget_ms=latency_budget_ms)
+            for stage_name, (target_fps, priority) in STAGE_SCHEDULE.items():
+                self.scheduler.add_stage(stage_name, target_fps, priority)
+        self.last_stage_ms = {}
+        
+        # Per-stage timing of the live loop (a no-op unless enabled)
+        self.metrics = metrics or Metrics(enabled=False)
+        
+        # Snapshots and (if triggers are set) event clips, encoded on background threads
+        self.recorder = recorder or EventRecorder()
+        
+        # 'all' mode runs the independent detectors concurrently on the same frame
+        self.stage_executor = None
+        if parallel_stages:
+            self.stage_executor = StageExecutor(
+                self,
+                max_workers=stage_workers,
+                use_processes=stage_processes,
+                target_factory=OpenCVDetectionSystem,
+                # Recognition never runs in a worker, so workers don't load the gallery
+                factory_kwargs={'face_matcher': face_matcher, 'parallel_stages': False, 'face_locator': face_locator,
+                                'load_gallery': False, 'watch_gallery': False},
+                in_process_stages=in_process_stages
+            )
         
         print("System ready! Using only OpenCV - no external dependencies.")
     
-    def setup_face_recognition(self):
+    def reset_background(self):
+        """Start a fresh motion background model (e.g. for a new camera or video file)"""
+        self.bg_subtractor = cv2.createBackgroundSubtractorMOG2(detectShadows=True)
+    
+    def setup_face_recognition(self, load_gallery=True, watch_gallery=True, gallery_workers=None):
         """Load known faces from the known_faces directory"""
-        known_faces_dir = "known_faces"
-        
-        if not os.path.exists(known_faces_dir):
-            os.makedirs(known_faces_dir)
-            print(f"Created {known_faces_dir} folder. Add photos of people you want to recognize.")
+        self.face_gallery = FaceGallery("known_faces", workers=gallery_workers, matcher=self.face_matcher)
+        if not load_gallery:
             return
+        self.face_gallery.load()
         
-        for filename in os.listdir(known_faces_dir):
-            if filename.lower().endswith(('.png', '.jpg', '.jpeg')):
-                try:
-                    image_path = os.path.join(known_faces_dir, filename)
-                    image = face_recognition.load_image_file(image_path)
-                    
-                    encodings = face_recognition.face_encodings(image)
-                    if encodings:
-                        self.known_face_encodings.append(encodings[0])
-                        name = os.path.splitext(filename)[0]
-                        self.known_face_names.append(name)
-                        print(f"Loaded face: {name}")
-                except Exception as e:
-                    print(f"Error loading {filename}: {e}")
+        # Pick up added, changed or deleted photos in the background
+        if watch_gallery:
+            self.gallery_watcher = GalleryWatcher(self.face_gallery).start()
     
-    def detect_faces_detailed(self, frame):
+    def detect_faces_detailed(self, frame, ctx=None):
         """Advanced face detection using multiple methods"""
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if ctx is None:
+            ctx = FrameContext(frame)
+        gray = ctx.gray
         detected_faces = []
         
-        # Method 1: Standard face detection
-        faces = self.face_cascade.detectMultiScale(gray, 1.1, 4, minSize=(30, 30))
-        for (x, y, w, h) in faces:
-            cv2.rectangle(frame, (x, y), (x + w, y + h), (255, 0, 0), 2)
-            cv2.putText(frame, 'Face', (x, y-10), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 0, 0), 2)
+        for face in self.face_locator.locate(ctx):
+            x, y, w, h = face['bbox']
+            if face['kind'] == 'profile':
+                detected_faces.append({
+                    'type': 'profile_face',
+                    'bbox': [x, y, w, h],
+                    'confidence': 'medium'
+                })
+                continue
             
             # Detect eyes within face region
             roi_gray = gray[y:y+h, x:x+w]
             eyes = self.eye_cascade.detectMultiScale(roi_gray, 1.1, 3)
             
             eye_count = len(eyes)
-            for (ex, ey, ew, eh) in eyes:
-                cv2.rectangle(frame, (x+ex, y+ey), (x+ex+ew, y+ey+eh), (0, 255, 0), 1)
             
             detected_faces.append({
                 'type': 'frontal_face',
                 'bbox': [x, y, w, h],
                 'eyes_detected': eye_count,
+                'eyes': [[int(x + ex), int(y + ey), int(ew), int(eh)] for (ex, ey, ew, eh) in eyes],
                 'confidence': 'high' if eye_count >= 2 else 'medium'
             })
         
-        # Method 2: Profile face detection
-        profiles = self.profile_cascade.detectMultiScale(gray, 1.1, 4, minSize=(30, 30))
-        for (x, y, w, h) in profiles:
-            cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 255), 2)
-            cv2.putText(frame, 'Profile', (x, y-10), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
-            
-            detected_faces.append({
-                'type': 'profile_face',
-                'bbox': [x, y, w, h],
-                'confidence': 'medium'
-            })
-        
-        return frame, detected_faces
+        return detected_faces
     
-    def recognize_faces(self, frame):
+    def recognize_faces(self, frame, ctx=None):
         """Face recognition using face_recognition library"""
-        if not self.known_face_encodings:
-            return frame, []
+        if not len(self.face_gallery):
+            return []
+        if ctx is None:
+            ctx = FrameContext(frame)
         
-        # Resize for faster processing
-        small_frame = cv2.resize(frame, (0, 0), fx=0.25, fy=0.25)
-        rgb_small_frame = small_frame[:, :, ::-1]
+        if self.face_tracker is not None:
+            # Locate every few frames and encode only new or stale tracks
+            return self.face_tracker.update(ctx, self.locate_faces, self.identify_faces)
         
-        face_locations = face_recognition.face_locations(rgb_small_frame)
-        face_encodings = face_recognition.face_encodings(rgb_small_frame, face_locations)
+        boxes = self.locate_faces(ctx)
+        identities = self.identify_faces(ctx, boxes)
         
         recognized_faces = []
         
-        for face_encoding, face_location in zip(face_encodings, face_locations):
-            matches = face_recognition.compare_faces(self.known_face_encodings, face_encoding)
-            name = "Unknown"
-            confidence = 0
-            
-            face_distances = face_recognition.face_distance(self.known_face_encodings, face_encoding)
-            best_match_index = np.argmin(face_distances)
-            
-            if matches[best_match_index]:
-                name = self.known_face_names[best_match_index]
-                confidence = 1 - face_distances[best_match_index]
-            
-            # Scale back up
-            top, right, bottom, left = face_location
-            top *= 4
-            right *= 4
-            bottom *= 4
-            left *= 4
-            
-            # Draw recognition result
-            color = (0, 255, 0) if name != "Unknown" else (0, 0, 255)
-            cv2.rectangle(frame, (left, top), (right, bottom), color, 2)
-            
-            label = f"{name} ({confidence:.2f})" if name != "Unknown" else name
-            cv2.putText(frame, label, (left, top - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.75, color, 2)
-            
+        for (name, confidence), bbox in zip(identities, boxes):
             recognized_faces.append({
+                'type': 'recognized_face',
                 'name': name,
                 'confidence': confidence,
-                'bbox': [left, top, right - left, bottom - top]
+                'bbox': bbox
             })
         
-        return frame, recognized_faces
+        return recognized_faces
+    
+    def locate_faces(self, ctx):
+        """Full-frame (x, y, w, h) boxes of this frame's frontal faces, from the shared face locator"""
+        return self.face_locator.boxes(ctx)
+    
+    def identify_faces(self, ctx, boxes):
+        """Encode the faces at the given full-frame boxes and match them against the gallery"""
+        if not boxes:
+            return []
+        
+        scale = self.face_locator.encode_scale
+        face_locations = [(int(y * scale), int((x + w) * scale), int((y + h) * scale), int(x * scale))
+                          for x, y, w, h in boxes]
+        face_encodings = face_recognition.face_encodings(ctx.rgb_scaled(scale), face_locations)
+        
+        # Match all faces in the frame against the gallery at once
+        return self.face_gallery.identify(face_encodings)
     
-    def detect_motion_advanced(self, frame):
+    def detect_motion_advanced(self, frame, ctx=None):
         """Advanced motion detection with object tracking"""
+        if ctx is None:
+            ctx = FrameContext(frame)
+        
         # Apply background subtraction
-        fg_mask = self.bg_subtractor.apply(frame)
+        fg_mask = self.bg_subtractor.apply(ctx.frame)
         
         # Morphological operations to clean up the mask
         kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5, 5))
@@ -184,11 +253,6 @@ class OpenCVDetectionSystem:
                 elif 0.7 < extent < 0.9:
                     object_type = "Person-like Movement"
                 
-                # Draw bounding box
-                cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
-                cv2.putText(frame, f'{object_type} ({area:.0f})', (x, y-10), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
-                
                 moving_objects.append({
                     'type': object_type.lower().replace(' ', '_'),
                     'area': area,
@@ -196,11 +260,13 @@ class OpenCVDetectionSystem:
                     'bbox': [x, y, w, h]
                 })
         
-        return frame, moving_objects
+        return moving_objects
     
-    def detect_people(self, frame):
+    def detect_people(self, frame, ctx=None):
         """Detect people using full body cascade"""
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if ctx is None:
+            ctx = FrameContext(frame)
+        gray = ctx.gray
         
         bodies = self.body_cascade.detectMultiScale(
             gray, 
@@ -213,185 +279,290 @@ class OpenCVDetectionSystem:
         detected_people = []
         
         for (x, y, w, h) in bodies:
-            cv2.rectangle(frame, (x, y), (x + w, y + h), (255, 0, 255), 2)
-            cv2.putText(frame, 'Person Detected', (x, y-10), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 0, 255), 2)
-            
             detected_people.append({
                 'type': 'person',
-                'bbox': [x, y, w, h],
+                'bbox': [int(x), int(y), int(w), int(h)],
                 'confidence': 'medium'
             })
         
-        return frame, detected_people
+        return detected_people
     
-    def detect_colors(self, frame):
+    def detect_colors(self, frame, ctx=None):
         """Detect objects by color"""
-        hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
-        color_objects = []
+        if ctx is None:
+            ctx = FrameContext(frame)
         
-        for color_name, (lower, upper) in self.color_ranges.items():
-            lower = np.array(lower)
-            upper = np.array(upper)
-            
-            mask = cv2.inRange(hsv, lower, upper)
-            mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, np.ones((5, 5), np.uint8))
-            
-            contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            
-            for contour in contours:
-                area = cv2.contourArea(contour)
-                if area > 1000:  # Filter small objects
-                    x, y, w, h = cv2.boundingRect(contour)
-                    
-                    cv2.rectangle(frame, (x, y), (x + w, y + h), (255, 255, 255), 2)
-                    cv2.putText(frame, f'{color_name.title()} Object', (x, y-10), 
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
-                    
-                    color_objects.append({
-                        'type': f'{color_name}_object',
-                        'color': color_name,
-                        'area': area,
-                        'bbox': [x, y, w, h]
-                    })
-        
-        return frame, color_objects
+        # All colours are labelled in one lookup pass over the HSV frame
+        return self.color_engine.detect(ctx.hsv)
     
-    def run_complete_system(self):
+    def process_frame(self, frame, detection_mode='all', ctx=None):
+        """Run the detectors for a mode over one frame and return their detection records"""
+        all_detections = []
+        for detections in self.run_stages(frame, MODE_STAGES[detection_mode], ctx):
+            all_detections.extend(detections)
+        return all_detections
+    
+    def process_scheduled(self, frame, detection_mode='all', ctx=None):
+        """Run the stages the scheduler picks for this frame; returns (stage_names, [detections per stage])"""
+        mode_stages = MODE_STAGES[detection_mode]
+        if self.scheduler is None:
+            return mode_stages, self.run_stages(frame, mode_stages, ctx)
+        
+        stage_names = self.scheduler.plan(mode_stages, parallel=self.stage_executor is not None)
+        start = time.perf_counter()
+        stage_results = self.run_stages(frame, stage_names, ctx)
+        self.scheduler.record(self.last_stage_ms, (time.perf_counter() - start) * 1000)
+        return stage_names, stage_results
+    
+    def run_stages(self, frame, stage_names, ctx=None):
+        """Run the given detector stages over one frame; returns [detections per stage]
+        
+        Per-stage times end up in self.last_stage_ms for the scheduler.
+        """
+        if ctx is None:
+            ctx = FrameContext(frame)
+        
+        if self.motion_gate is not None and any(stage_name in self.gated_stages for stage_name in stage_names):
+            return self.run_gated_stages(frame, stage_names, ctx)
+        
+        if len(stage_names) > 1 and self.stage_executor is not None:
+            stage_results = self.stage_executor.run(frame, stage_names, ctx)
+            self.last_stage_ms = dict(self.stage_executor.last_timing['stage_ms'])
+            return stage_results
+        
+        outputs = [run_stage(self, stage_name, frame, ctx) for stage_name in stage_names]
+        self.last_stage_ms = {stage_name: elapsed for stage_name, (_, elapsed) in zip(stage_names, outputs)}
+        return [detections for detections, _ in outputs]
+    
+    def run_gated_stages(self, frame, stage_names, ctx):
+        """Run the gated detectors only on crops around this frame's motion"""
+        # Motion runs first: its boxes decide where the other detectors look
+        motion, motion_ms = run_stage(self, 'detect_motion_advanced', frame, ctx)
+        regions = self.motion_gate.regions([record['bbox'] for record in motion], frame.shape)
+        
+        # One context per region, shared by the gated stages so they reuse each other's face boxes
+        crops = [ctx.crop(x, y, w, h) for (x, y, w, h) in regions] if regions is not None else []
+        
+        jobs = []
+        owners = []  # stage_names index each job's detections belong to
+        for i, stage_name in enumerate(stage_names):
+            if stage_name == 'detect_motion_advanced':
+                continue
+            if stage_name in self.gated_stages and regions is not None:
+                for crop in crops:
+                    jobs.append((stage_name, crop.frame, crop))
+                    owners.append(i)
+            else:
+                jobs.append((stage_name, frame, ctx))
+                owners.append(i)
+        
+        self.last_stage_ms = {'detect_motion_advanced': motion_ms}
+        if len(jobs) > 1 and self.stage_executor is not None:
+            outputs = self.stage_executor.run_jobs(jobs)
+            self.last_stage_ms.update(self.stage_executor.last_timing['stage_ms'])
+        else:
+            outputs = []
+            for stage_name, job_frame, job_ctx in jobs:
+                detections, elapsed = run_stage(self, stage_name, job_frame, job_ctx)
+                outputs.append(detections)
+                self.last_stage_ms[stage_name] = self.last_stage_ms.get(stage_name, 0.0) + elapsed
+        
+        stage_results = [motion if stage_name == 'detect_motion_advanced' else [] for stage_name in stage_names]
+        for i, (_, _, job_ctx), detections in zip(owners, jobs, outputs):
+            dx, dy = job_ctx.origin
+            stage_results[i].extend(offset_record(record, dx, dy) for record in detections)
+        return stage_results
+    
+    def run_complete_system(self, headless=False):
         """Run the complete detection system"""
-        cap = cv2.VideoCapture(0)
+        # Capture runs on its own thread; each read() returns the freshest frame
+        cap = ThreadedCapture(0, policy='latest').start()
+        self.event_writer = JsonlEventWriter('detection_log.jsonl').start()
+        self.recorder.start()
         
         print("\n=== OpenCV Complete Detection System ===")
-        print("Controls:")
-        print("  'q' - Quit")
-        print("  '1' - Face detection only")
-        print("  '2' - Face recognition only") 
-        print("  '3' - Motion detection only")
-        print("  '4' - People detection only")
-        print("  '5' - Color detection only")
-        print("  'a' - All detections (default)")
-        print("  's' - Save current frame")
-        print("  'r' - Reset background model")
-        print("  'l' - Show detection logs")
+        if headless:
+            print("Running headless (no window). Press Ctrl+C to stop.")
+        else:
+            print("Controls:")
+            print("  'q' - Quit")
+            print("  '1' - Face detection only")
+            print("  '2' - Face recognition only") 
+            print("  '3' - Motion detection only")
+            print("  '4' - People detection only")
+            print("  '5' - Color detection only")
+            print("  'a' - All detections (default)")
+            print("  's' - Save current frame")
+            print("  'r' - Reset background model")
+            print("  'l' - Show detection logs")
         
         detection_mode = 'all'
         frame_count = 0
         
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            all_detections = []
-            
-            # Run different detection methods based on mode
-            if detection_mode in ['face', 'all']:
-                frame, faces = self.detect_faces_detailed(frame)
-                all_detections.extend(faces)
-            
-            if detection_mode in ['recognition', 'all']:
-                frame, recognized = self.recognize_faces(frame)
-                all_detections.extend(recognized)
-            
-            if detection_mode in ['motion', 'all']:
-                frame, motion = self.detect_motion_advanced(frame)
-                all_detections.extend(motion)
-            
-            if detection_mode in ['people', 'all']:
-                frame, people = self.detect_people(frame)
-                all_detections.extend(people)
-            
-            if detection_mode in ['color', 'all']:
-                frame, colors = self.detect_colors(frame)
-                all_detections.extend(colors)
-            
-            # Display information
-            mode_text = f"Mode: {detection_mode.upper()}"
-            cv2.putText(frame, mode_text, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
-            
-            detection_text = f"Detections: {len(all_detections)}"
-            cv2.putText(frame, detection_text, (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
-            
-            # Log detections
-            if all_detections:
-                log_entry = {
-                    'timestamp': datetime.now().isoformat(),
-                    'frame': frame_count,
-                    'mode': detection_mode,
-                    'detections': all_detections
-                }
-                self.detection_log.append(log_entry)
-            
-            cv2.imshow('OpenCV Complete Detection System', frame)
-            
-            # Handle key presses
-            key = cv2.waitKey(1) & 0xFF
-            if key == ord('q'):
-                break
-            elif key == ord('1'):
-                detection_mode = 'face'
-                print("Switched to Face Detection mode")
-            elif key == ord('2'):
-                detection_mode = 'recognition'
-                print("Switched to Face Recognition mode")
-            elif key == ord('3'):
-                detection_mode = 'motion'
-                print("Switched to Motion Detection mode")
-            elif key == ord('4'):
-                detection_mode = 'people'
-                print("Switched to People Detection mode")
-            elif key == ord('5'):
-                detection_mode = 'color'
-                print("Switched to Color Detection mode")
-            elif key == ord('a'):
-                detection_mode = 'all'
-                print("Switched to All Detections mode")
-            elif key == ord('s'):
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                cv2.imwrite(f'detection_{timestamp}.jpg', frame)
-                print(f"Frame saved as detection_{timestamp}.jpg")
-            elif key == ord('r'):
-                self.bg_subtractor = cv2.createBackgroundSubtractorMOG2(detectShadows=True)
-                print("Background model reset")
-            elif key == ord('l'):
-                self.show_detection_summary()
-            
-            frame_count += 1
+        # Derived images (gray, HSV, small RGB) are shared by all detectors and reuse their buffers
+        ctx = FrameContext()
+        renderer = OverlayRenderer()
         
-        cap.release()
-        cv2.destroyAllWindows()
+        # Latest detections of each stage, shown until the stage runs again
+        held = {}
+        held_mode = detection_mode
         
-        # Save final log
-        with open('detection_log.json', 'w') as f:
-            json.dump(self.detection_log, f, indent=2)
+        try:
+            while True:
+                with self.metrics.time('capture'):
+                    ret, frame = cap.read()
+                if not ret:
+                    break
+                
+                if detection_mode != held_mode:
+                    held.clear()
+                    held_mode = detection_mode
+                
+                # Detectors only read the frame; everything is drawn afterwards in one pass
+                with self.metrics.time('detect'):
+                    stage_names, stage_results = self.process_scheduled(frame, detection_mode, ctx.reset(frame))
+                self.metrics.observe_stages(self.last_stage_ms)
+                
+                all_detections = []
+                for stage_name, detections in zip(stage_names, stage_results):
+                    held[stage_name] = detections
+                    all_detections.extend(detections)
+                
+                # Log detections
+                if all_detections:
+                    with self.metrics.time('log'):
+                        log_entry = {
+                            'timestamp': datetime.now().isoformat(),
+                            'frame': frame_count,
+                            'mode': detection_mode,
+                            'detections': all_detections
+                        }
+                        self.detection_history.add(log_entry)
+                        self.event_writer.write(log_entry)
+                
+                # Pre-roll and event clips get the frame before the overlay is drawn into it
+                with self.metrics.time('record'):
+                    self.recorder.add(frame, all_detections)
+                
+                frame_count += 1
+                self.metrics.tick()
+                
+                if headless:
+                    continue
+                
+                # Display information
+                with self.metrics.time('render'):
+                    shown = [record for stage_name in MODE_STAGES[detection_mode] for record in held.get(stage_name, [])]
+                    renderer.draw(frame, shown)
+                    status = [f"Mode: {detection_mode.upper()}", f"Detections: {len(shown)}"]
+                    if len(stage_names) > 1 and self.stage_executor is not None:
+                        status.append(self.stage_executor.timing_text())
+                    if self.scheduler is not None:
+                        status.append(self.scheduler.status_text())
+                    status.extend(self.metrics.status_lines())
+                    renderer.draw_status(frame, status)
+                
+                with self.metrics.time('display'):
+                    cv2.imshow('OpenCV Complete Detection System', frame)
+                    
+                    # Handle key presses
+                    key = cv2.waitKey(1) & 0xFF
+                if key == ord('q'):
+                    break
+                elif key == ord('1'):
+                    detection_mode = 'face'
+                    print("Switched to Face Detection mode")
+                elif key == ord('2'):
+                    detection_mode = 'recognition'
+                    print("Switched to Face Recognition mode")
+                elif key == ord('3'):
+                    detection_mode = 'motion'
+                    print("Switched to Motion Detection mode")
+                elif key == ord('4'):
+                    detection_mode = 'people'
+                    print("Switched to People Detection mode")
+                elif key == ord('5'):
+                    detection_mode = 'color'
+                    print("Switched to Color Detection mode")
+                elif key == ord('a'):
+                    detection_mode = 'all'
+                    print("Switched to All Detections mode")
+                elif key == ord('s'):
+                    # Written by the recorder's thread, so the loop doesn't wait for the JPEG encode
+                    self.recorder.snapshot(frame, 'detection')
+                elif key == ord('r'):
+                    self.reset_background()
+                    print("Background model reset")
+                elif key == ord('l'):
+                    self.show_detection_summary()
+        except KeyboardInterrupt:
+            print("\nStopping...")
         
-        print(f"\nSession complete! Total detections: {len(self.detection_log)}")
-        print("Detection log saved to detection_log.json")
+        cap.release()
+        if not headless:
+            cv2.destroyAllWindows()
+        print(f"Capture: {cap.frames_captured} frames grabbed, {cap.frames_dropped} stale frames dropped")
+        if self.gallery_watcher is not None:
+            self.gallery_watcher.stop()
+        
+        self.event_writer.close()
+        
+        if self.scheduler is not None:
+            print(self.scheduler.report())
+        if self.motion_gate is not None:
+            print(self.motion_gate.report())
+        if self.face_tracker is not None:
+            print(self.face_tracker.report())
+        if self.stage_executor is not None:
+            print(self.stage_executor.report())
+            self.stage_executor.shutdown()
+        self.recorder.close()
+        print(self.recorder.report())
+        self.metrics.close()
+        
+        print(f"\nSession complete! Total detections: {self.detection_history.detections_total}")
+        print(f"Detection log saved to {self.event_writer.path}")
     
     def show_detection_summary(self):
         """Show detection summary"""
         print("\n=== Detection Summary ===")
         
-        if not self.detection_log:
+        if not self.detection_history:
             print("No detections recorded yet.")
             return
         
-        # Count detection types
-        detection_counts = {}
-        total_detections = 0
+        summary = self.detection_history.summary()
+        print(f"Total detections: {summary['detections']} in {summary['entries']} frames")
         
-        for entry in self.detection_log[-20:]:  # Last 20 entries
-            for detection in entry['detections']:
-                det_type = detection.get('type', 'unknown')
-                detection_counts[det_type] = detection_counts.get(det_type, 0) + 1
-                total_detections += 1
-        
-        print(f"Total recent detections: {total_detections}")
-        for det_type, count in sorted(detection_counts.items()):
+        print(f"Recent detections (last {summary['recent_entries']} frames):")
+        for det_type, count in sorted(summary['recent_counts'].items()):
             print(f"  {det_type}: {count}")
         
+        print("Per minute:")
+        for det_type, rate in sorted(summary['rates_per_minute'].items()):
+            print(f"  {det_type}: {rate:.1f}")
+        
+        if summary['identities']:
+            print("Recognized:")
+            for name, count in sorted(summary['identities'].items(), key=lambda item: -item[1]):
+                print(f"  {name}: {count}")
+        
         print()
 
 if __name__ == "__main__":
-    system = OpenCVDetectionSystem()
-    system.run_complete_system()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="OpenCV-only detection system")
+    parser.add_argument('--headless', action='store_true', help="Detect and log only: no rendering and no window")
+    parser.add_argument('--motion-gating', action='store_true', help="Look for faces and people only around motion")
+    parser.add_argument('--face-tracking', action='store_true', help="Track recognised faces and re-encode them only occasionally")
+    parser.add_argument('--face-locator', choices=FACE_BACKENDS, default='haar',
+                        help="Face detector shared by face annotation and recognition ('dnn' needs the face-ssd model)")
+    parser.add_argument('--budget-ms', type=float, default=66, help="Per-frame detection latency budget (0 = run every detector on every frame)")
+    add_metrics_arguments(parser)
+    add_recorder_arguments(parser)
+    args = parser.parse_args()
+    
+    system = OpenCVDetectionSystem(motion_gating=args.motion_gating, face_tracking=args.face_tracking,
+                                   latency_budget_ms=args.budget_ms, metrics=Metrics.from_args(args),
+                                   recorder=EventRecorder.from_args(args),
+                                   face_locator=args.face_locator)
+    system.run_complete_system(headless=args.headless)
\ No newline at end of file
@@ -0,0 +1,73 @@
+import cv2
+
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+WHITE = (255, 255, 255)
+
+MOTION_LABELS = {
+    'unknown_motion': 'Unknown Motion',
+    'horizontal_movement': 'Horizontal Movement',
+    'vertical_movement': 'Vertical Movement',
+    'person-like_movement': 'Person-like Movement'
+}
+
+def record_box(record):
+    """(x, y, w, h) of a detection record"""
+    if 'bbox' in record:
+        return tuple(int(v) for v in record['bbox'])
+    left, top, right, bottom = record['location']
+    return left, top, right - left, bottom - top
+
+def identity_style(record):
+    name = record.get('name', 'Unknown')
+    color = (0, 255, 0) if name != "Unknown" else (0, 0, 255)
+    label = f"{name} ({record['confidence']:.2f})" if name != "Unknown" else name
+    return color, label, 0.75
+
+def record_style(record):
+    """(color, label, font_scale) for a detection record, matching the original on-frame styling"""
+    det_type = record.get('type', '')
+    if det_type == 'frontal_face':
+        return (255, 0, 0), 'Face', 0.7
+    if det_type == 'profile_face':
+        return (0, 255, 255), 'Profile', 0.7
+    if det_type == 'recognized_face':
+        return identity_style(record)
+    if det_type in MOTION_LABELS:
+        return (0, 255, 0), f"{MOTION_LABELS[det_type]} ({record['area']:.0f})", 0.6
+    if det_type == 'person':
+        return (255, 0, 255), 'Person Detected', 0.7
+    if det_type == 'moving_object':
+        return (255, 0, 0), 'Moving Object', 0.6
+    if 'color' in record:
+        return WHITE, f"{record['color'].title()} Object", 0.6
+    if det_type == 'object':
+        label = record.get('label') or record.get('class')
+        return (0, 255, 0), f"{label} {record['confidence']:.2f}", 0.5
+    return WHITE, det_type.replace('_', ' ').title(), 0.6
+
+class OverlayRenderer:
+    """Draws detection records onto a frame once, after every detector has run
+    
+    Detectors only return records, so none of them ever analyses pixels another
+    detector drew. In headless mode the renderer is simply never called.
+    """
+    
+    def draw(self, frame, detections):
+        """Draw boxes and labels for all detection records"""
+        for record in detections:
+            x, y, w, h = record_box(record)
+            color, label, font_scale = record_style(record)
+            cv2.rectangle(frame, (x, y), (x + w, y + h), color, 2)
+            cv2.putText(frame, label, (x, y - 10), FONT, font_scale, color, 2)
+            
+            for (ex, ey, ew, eh) in record.get('eyes', []):
+                cv2.rectangle(frame, (ex, ey), (ex + ew, ey + eh), (0, 255, 0), 1)
+        
+        return frame
+    
+    def draw_status(self, frame, lines, origin=(10, 30), line_height=30, font_scale=0.7):
+        """Draw status text lines in the top-left corner"""
+        x, y = origin
+        for i, line in enumerate(lines):
+            cv2.putText(frame, line, (x, y + i * line_height), FONT, font_scale, WHITE, 2)
+        return frame
\ No newline at end of file
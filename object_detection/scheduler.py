@@ -0,0 +1,133 @@
+import time
+
+class LatencyScheduler:
+    """Chooses which detector stages run on each frame so the frame fits a latency budget
+    
+    Each stage declares a target rate (None = every frame) and a priority. Stage costs are
+    measured online as an EWMA; every frame the due stages are taken in priority order
+    while their estimated cost still fits budget_ms; the highest-priority due stage always
+    runs, even alone over budget. Once one is shed, every lower-priority stage is shed with
+    it until a later frame, even if it would still fit. A stage's first (cold) run is not
+    counted, and a shed stage's estimate decays so it gets re-measured; a stage shed for
+    longer than max_wait seconds runs anyway, so nothing starves. With budget_ms=None only
+    the target rates apply.
+    """
+    
+    def __init__(self, budget_ms=66.0, alpha=0.2, max_wait=2.0):
+        self.budget_ms = budget_ms
+        self.alpha = alpha
+        self.max_wait = max_wait
+        self.stages = {}
+        # Measured wall time / summed stage time when stages run concurrently
+        self.overlap = 1.0
+        
+        self.frames = 0
+        self.frames_over_budget = 0
+        self.last_plan = []
+        self.last_shed = []
+        self.last_estimate_ms = 0.0
+    
+    def add_stage(self, name, target_fps=None, priority=0):
+        """Declare a stage; higher priority stages are kept when the budget is tight"""
+        self.stages[name] = {
+            'interval': 1.0 / target_fps if target_fps else 0.0,
+            'priority': priority,
+            'cost_ms': None,
+            'last_run': None,
+            'runs': 0,
+            'samples': 0,
+            'shed': 0
+        }
+        return self
+    
+    def estimate(self, stage_names, parallel=False):
+        """Estimated ms to run these stages on one frame (unmeasured stages count as free)"""
+        total = sum(self.stages[name]['cost_ms'] or 0.0 for name in stage_names)
+        if parallel and len(stage_names) > 1:
+            return total * self.overlap
+        return total
+    
+    def plan(self, stage_names, now=None, parallel=False):
+        """Pick the stages to run on this frame, in the order given"""
+        now = time.perf_counter() if now is None else now
+        due = []
+        for name in stage_names:
+            stage = self.stages[name]
+            if stage['last_run'] is None or now - stage['last_run'] >= stage['interval']:
+                due.append(name)
+        
+        # Highest priority first; among equals, the one that waited longest
+        due.sort(key=lambda name: (-self.stages[name]['priority'], self.stages[name]['last_run'] or 0.0))
+        
+        chosen = []
+        shed = []
+        shed_priority = None  # once a stage is shed, no lower-priority stage may take its place
+        for name in due:
+            stage = self.stages[name]
+            starving = stage['last_run'] is not None and now - stage['last_run'] >= self.max_wait
+            outranked = shed_priority is not None and stage['priority'] < shed_priority
+            # The top stage runs even if it alone exceeds the budget
+            top = name == due[0]
+            if top or starving or self.budget_ms is None or (
+                    not outranked and self.estimate(chosen + [name], parallel) <= self.budget_ms):
+                chosen.append(name)
+            else:
+                shed.append(name)
+                stage['shed'] += 1
+                # Decay the estimate, so one slow measurement can't lock the stage out
+                if stage['cost_ms'] is not None:
+                    stage['cost_ms'] *= 1 - self.alpha
+                if shed_priority is None:
+                    shed_priority = stage['priority']
+        
+        for name in chosen:
+            self.stages[name]['last_run'] = now
+            self.stages[name]['runs'] += 1
+        
+        self.last_plan = [name for name in stage_names if name in chosen]
+        self.last_shed = shed
+        self.last_estimate_ms = self.estimate(self.last_plan, parallel)
+        return self.last_plan
+    
+    def record(self, stage_ms, wall_ms=None):
+        """Feed back measured per-stage times (and the frame's wall time when run concurrently)"""
+        for name, elapsed in stage_ms.items():
+            stage = self.stages.get(name)
+            if stage is None:
+                continue
+            stage['samples'] += 1
+            if stage['samples'] == 1:
+                # First run: model loading, allocations and caches make it unrepresentative
+                continue
+            if stage['cost_ms'] is None:
+                stage['cost_ms'] = elapsed
+            else:
+                stage['cost_ms'] += self.alpha * (elapsed - stage['cost_ms'])
+        
+        summed = sum(stage_ms.values())
+        if wall_ms is not None and len(stage_ms) > 1 and summed > 0:
+            self.overlap += self.alpha * (min(1.0, wall_ms / summed) - self.overlap)
+        
+        self.frames += 1
+        if self.budget_ms is not None and (wall_ms if wall_ms is not None else summed) > self.budget_ms:
+            self.frames_over_budget += 1
+    
+    def status_text(self):
+        if self.budget_ms is None:
+            return f"Stages: ~{self.last_estimate_ms:.0f} ms (no budget)"
+        text = f"Budget: {self.last_estimate_ms:.0f}/{self.budget_ms:.0f} ms"
+        if self.last_shed:
+            text += " | shed: " + ", ".join(self.last_shed)
+        return text
+    
+    def report(self):
+        if not self.frames:
+            return "Scheduler: no frames processed"
+        if self.budget_ms is None:
+            lines = [f"Scheduler (no budget): {self.frames} frames"]
+        else:
+            lines = [f"Scheduler ({self.budget_ms:.0f} ms budget): {self.frames_over_budget}/{self.frames} frames over budget"]
+        for name, stage in self.stages.items():
+            cost = f"{stage['cost_ms']:.1f} ms" if stage['cost_ms'] is not None else "n/a"
+            lines.append(f"  {name}: ran {stage['runs']}x, shed {stage['shed']}x, ~{cost}")
+        return "\n".join(lines)
\ No newline at end of file
@@ -0,0 +1,104 @@
+from collections import namedtuple
+from multiprocessing import shared_memory
+import numpy as np
+
+# What crosses the process boundary instead of the pixels: slot index, sequence number, shape
+FrameRef = namedtuple('FrameRef', 'slot seq shape')
+
+def attach_shared_memory(name):
+    try:
+        # Python 3.13+: a reader must not let its resource tracker unlink the writer's block
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+class SharedFrameRing:
+    """Fixed-size uint8 frame slots in one shared memory block, for one writer and many readers
+    
+    The writer copies each frame into the next free slot once and passes a small FrameRef
+    to the readers, which get a NumPy view of the slot without copying. Every slot carries
+    the sequence number of the frame it holds, so a reader can tell whether its slot was
+    reused. The writer never reuses a slot it has handed out until it is released.
+    """
+    
+    def __init__(self, slots=4, slot_bytes=1920 * 1080 * 3, name=None):
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self.owner = name is None
+        header_bytes = slots * 8
+        
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=header_bytes + slots * slot_bytes)
+        else:
+            self.shm = attach_shared_memory(name)
+        
+        # Sequence number per slot (-1 = empty or being written), then the slots themselves
+        self.sequences = np.ndarray((slots,), dtype=np.int64, buffer=self.shm.buf)
+        self.data = np.ndarray((slots, slot_bytes), dtype=np.uint8, buffer=self.shm.buf, offset=header_bytes)
+        if self.owner:
+            self.sequences[:] = -1
+        
+        # Writer side only: next sequence number, and outstanding holds per slot
+        self.write_index = 0
+        self.holds = [0] * slots
+    
+    @property
+    def name(self):
+        return self.shm.name
+    
+    @property
+    def spec(self):
+        """Picklable description a reader process attaches with"""
+        return (self.name, self.slots, self.slot_bytes)
+    
+    @classmethod
+    def attach(cls, spec):
+        name, slots, slot_bytes = spec
+        return cls(slots, slot_bytes, name=name)
+    
+    def write(self, frame):
+        """Copy a frame into a free slot and hold it; returns a FrameRef, or None if it can't be shared
+        
+        None means the frame isn't uint8, is larger than a slot, or every slot is still held.
+        """
+        if frame.dtype != np.uint8 or frame.nbytes > self.slot_bytes:
+            return None
+        
+        for _ in range(self.slots):
+            slot = self.write_index % self.slots
+            if self.holds[slot] == 0:
+                break
+            self.write_index += 1
+        else:
+            return None
+        
+        seq = self.write_index
+        self.write_index += 1
+        self.sequences[slot] = -1
+        np.copyto(self.data[slot, :frame.nbytes].reshape(frame.shape), frame)
+        self.sequences[slot] = seq
+        self.holds[slot] += 1
+        return FrameRef(slot, seq, frame.shape)
+    
+    def release(self, ref):
+        """The readers are done with this frame; its slot may be reused"""
+        self.holds[ref.slot] -= 1
+    
+    def is_current(self, ref):
+        return int(self.sequences[ref.slot]) == ref.seq
+    
+    def view(self, ref):
+        """Read-only NumPy view of a frame, without copying"""
+        if not self.is_current(ref):
+            raise RuntimeError(f"Frame {ref.seq} in slot {ref.slot} has already been overwritten")
+        nbytes = int(np.prod(ref.shape))
+        frame = self.data[ref.slot, :nbytes].reshape(ref.shape)
+        frame.flags.writeable = False
+        return frame
+    
+    def close(self):
+        # Views into the block must go before it can be closed
+        del self.sequences, self.data
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
\ No newline at end of file
@@ -0,0 +1,178 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from shared_frame_ring import SharedFrameRing
+
+# Detector instance owned by each worker process in process mode
+worker_target = None
+# Shared frame rings this worker process has attached to, by name
+worker_rings = {}
+
+def init_worker(target_factory, factory_kwargs):
+    """Build this worker process's own detector instance"""
+    global worker_target
+    worker_target = target_factory(**factory_kwargs)
+
+def run_stage(target, stage_name, frame, ctx=None):
+    """Run one detector method and time it; returns (detections, ms)"""
+    start = time.perf_counter()
+    detections = getattr(target, stage_name)(frame, ctx)
+    return detections, (time.perf_counter() - start) * 1000
+
+def run_worker_stage(stage_name, frame):
+    return run_stage(worker_target, stage_name, frame)
+
+def run_worker_shared_stage(stage_name, ring_spec, ref, region=None):
+    """Run a stage on a view of a frame in the shared frame ring (optionally a crop of it)"""
+    ring = worker_rings.get(ring_spec[0])
+    if ring is None:
+        # The executor made a new ring (bigger frames); drop the old one
+        for old in worker_rings.values():
+            old.close()
+        worker_rings.clear()
+        ring = worker_rings[ring_spec[0]] = SharedFrameRing.attach(ring_spec)
+    
+    frame = ring.view(ref)
+    if region is not None:
+        x, y, w, h = region
+        frame = frame[y:y + h, x:x + w]
+    result = run_stage(worker_target, stage_name, frame)
+    del frame
+    if not ring.is_current(ref):
+        raise RuntimeError(f"Frame slot {ref.slot} was reused while '{stage_name}' was reading it")
+    return result
+
+class StageExecutor:
+    """Runs independent detector stages over the same frame concurrently
+    
+    Detectors only read the frame and return records, so thread stages share it without
+    copying. In process mode each frame is written once to a SharedFrameRing and workers get
+    a view of it, instead of a pickled copy per stage. Results come back in the order the
+    stages were listed, so output does not depend on completion order.
+    """
+    
+    def __init__(self, target, max_workers=None, use_processes=False, target_factory=None,
+                 factory_kwargs=None, in_process_stages=('detect_motion_advanced',), shared_frames=True, ring_slots=4):
+        self.target = target
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.use_processes = use_processes
+        # Stateful stages (e.g. the MOG2 background model) must keep running on the
+        # main instance; in process mode they still run concurrently, but on a thread
+        self.in_process_stages = set(in_process_stages)
+        
+        self.threads = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='stage')
+        self.processes = None
+        if use_processes:
+            if target_factory is None:
+                raise ValueError("Process mode needs a target_factory to build each worker's detector")
+            # Spawned, not forked: the parent already runs stage threads and a gallery watcher
+            self.processes = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=init_worker,
+                initargs=(target_factory, factory_kwargs or {})
+            )
+        
+        # Process mode: frames go to workers through shared memory; only a FrameRef is pickled
+        self.shared_frames = shared_frames and use_processes
+        self.ring_slots = ring_slots
+        self.ring = None
+        
+        self.last_timing = None
+        self.frames = 0
+        self.total_wall_ms = 0.0
+        self.total_stage_ms = 0.0
+    
+    def share(self, frame, refs):
+        """FrameRef of a frame in the shared ring, writing it once per run; None if it can't be shared"""
+        key = id(frame)
+        if key not in refs:
+            if self.ring is None or frame.nbytes > self.ring.slot_bytes:
+                if self.ring is not None:
+                    self.ring.close()
+                self.ring = SharedFrameRing(self.ring_slots, frame.nbytes)
+            refs[key] = (self.ring, self.ring.write(frame))
+        return refs[key][1]
+    
+    def submit(self, stage_name, frame, ctx, refs=None):
+        if self.processes is not None and stage_name not in self.in_process_stages:
+            if self.shared_frames and refs is not None:
+                # Crops are sent as a region of their full frame, which is written to shared memory once
+                parent = getattr(ctx, 'parent', None)
+                full_frame = parent.frame if parent is not None else frame
+                ref = self.share(full_frame, refs)
+                if ref is not None:
+                    region = None
+                    if parent is not None:
+                        x, y = ctx.origin
+                        region = (x, y, frame.shape[1], frame.shape[0])
+                    return self.processes.submit(run_worker_shared_stage, stage_name, self.ring.spec, ref, region)
+            # The frame is pickled to the worker, which works on its own copy and context
+            return self.processes.submit(run_worker_stage, stage_name, frame)
+        return self.threads.submit(run_stage, self.target, stage_name, frame, ctx)
+    
+    def run(self, frame, stage_names, ctx=None):
+        """Run the stages on one frame; returns [detections per stage]
+        
+        Thread stages share ctx (a FrameContext of the untouched frame), so each derived
+        image is computed once per frame however many stages need it.
+        """
+        return self.run_jobs([(stage_name, frame, ctx) for stage_name in stage_names])
+    
+    def run_jobs(self, jobs):
+        """Run (stage_name, frame, ctx) jobs concurrently; returns [detections per job]
+        
+        A stage may appear several times (e.g. once per motion crop); its times are summed.
+        """
+        start = time.perf_counter()
+        refs = {}
+        try:
+            futures = [self.submit(stage_name, frame, ctx, refs) for stage_name, frame, ctx in jobs]
+            outputs = [future.result() for future in futures]
+        finally:
+            # Every job reading these frames has finished (or failed); their slots can be reused
+            for ring, ref in refs.values():
+                if ref is not None:
+                    ring.release(ref)
+        
+        wall_ms = (time.perf_counter() - start) * 1000
+        stage_ms = {}
+        for (stage_name, _, _), (_, elapsed) in zip(jobs, outputs):
+            stage_ms[stage_name] = stage_ms.get(stage_name, 0.0) + elapsed
+        self.last_timing = {
+            'wall_ms': wall_ms,
+            'stage_ms': stage_ms,
+            'sum_ms': sum(stage_ms.values())
+        }
+        self.frames += 1
+        self.total_wall_ms += wall_ms
+        self.total_stage_ms += self.last_timing['sum_ms']
+        
+        return [detections for detections, _ in outputs]
+    
+    def timing_text(self):
+        """One-line per-frame timing: wall time vs the sum of per-stage times"""
+        if self.last_timing is None:
+            return "Stages: -"
+        timing = self.last_timing
+        speedup = timing['sum_ms'] / timing['wall_ms'] if timing['wall_ms'] else 0
+        return f"Stages: {timing['wall_ms']:.0f} ms wall / {timing['sum_ms']:.0f} ms summed ({speedup:.1f}x)"
+    
+    def report(self):
+        """Session averages of wall time vs summed stage time"""
+        if not self.frames:
+            return "Stage executor: no frames processed"
+        wall = self.total_wall_ms / self.frames
+        summed = self.total_stage_ms / self.frames
+        mode = 'processes' if self.use_processes else 'threads'
+        return (f"Stage executor ({self.max_workers} {mode}): {wall:.1f} ms wall vs {summed:.1f} ms "
+                f"summed per frame ({summed / wall if wall else 0:.1f}x) over {self.frames} frames")
+    
+    def shutdown(self):
+        self.threads.shutdown(wait=True)
+        if self.processes is not None:
+            self.processes.shutdown(wait=True)
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
\ No newline at end of file
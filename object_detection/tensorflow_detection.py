@@ -1,123 +1,172 @@
+import argparse
 import cv2
 import numpy as np
-import tensorflow as tf
-import tensorflow_hub as hub
+import os
+import time
+from capture import ThreadedCapture
+from metrics import Metrics, add_arguments as add_metrics_arguments
+from model_registry import MODELS_DIR
+from overlay import OverlayRenderer
+
+# Default local SavedModel, e.g. ssd_mobilenet_v2 from TensorFlow Hub downloaded and extracted once
+DEFAULT_SAVED_MODEL = os.path.join(MODELS_DIR, 'ssd_mobilenet_v2')
 
 class TensorFlowObjectDetector:
-    def __init__(self):
+    def __init__(self, saved_model=DEFAULT_SAVED_MODEL, input_size=320, confidence_threshold=0.5, warmup_runs=2):
+        # TensorFlow is imported and the model loaded on first use, not when this module is imported
+        self.saved_model = saved_model
+        self.input_size = input_size
+        self.confidence_threshold = confidence_threshold
+        self.warmup_runs = warmup_runs
+        self.model = None
+        self.loaded = None
+        self.failed = False
+        
+        # COCO class names
+        self.class_names = [
+            'person', 'bicycle', 'car', 'motorcycle', 'airplane', 'bus', 'train',
+            'truck', 'boat', 'traffic light', 'fire hydrant', 'stop sign',
+            'parking meter', 'bench', 'bird', 'cat', 'dog', 'horse', 'sheep',
+            'cow', 'elephant', 'bear', 'zebra', 'giraffe', 'backpack', 'umbrella',
+            'handbag', 'tie', 'suitcase', 'frisbee', 'skis', 'snowboard',
+            'sports ball', 'kite', 'baseball bat', 'baseball glove', 'skateboard',
+            'surfboard', 'tennis racket', 'bottle', 'wine glass', 'cup', 'fork',
+            'knife', 'spoon', 'bowl', 'banana', 'apple', 'sandwich', 'orange',
+            'broccoli', 'carrot', 'hot dog', 'pizza', 'donut', 'cake', 'chair',
+            'couch', 'potted plant', 'bed', 'dining table', 'toilet', 'tv',
+            'laptop', 'mouse', 'remote', 'keyboard', 'cell phone', 'microwave',
+            'oven', 'toaster', 'sink', 'refrigerator', 'book', 'clock', 'vase',
+            'scissors', 'teddy bear', 'hair drier', 'toothbrush'
+        ]
+    
+    def load(self):
+        """Import TensorFlow, load the SavedModel and warm it up on first call; False if that fails"""
+        if self.model is not None:
+            return True
+        if self.failed:
+            return False
+        
         print("Loading TensorFlow model... (this may take a moment)")
+        start = time.perf_counter()
         try:
-            # Load a pre-trained model from TensorFlow Hub
-            self.model = hub.load("https://tfhub.dev/tensorflow/ssd_mobilenet_v2/2")
-            print("TensorFlow model loaded successfully!")
-            
-            # COCO class names
-            self.class_names = [
-                'person', 'bicycle', 'car', 'motorcycle', 'airplane', 'bus', 'train',
-                'truck', 'boat', 'traffic light', 'fire hydrant', 'stop sign',
-                'parking meter', 'bench', 'bird', 'cat', 'dog', 'horse', 'sheep',
-                'cow', 'elephant', 'bear', 'zebra', 'giraffe', 'backpack', 'umbrella',
-                'handbag', 'tie', 'suitcase', 'frisbee', 'skis', 'snowboard',
-                'sports ball', 'kite', 'baseball bat', 'baseball glove', 'skateboard',
-                'surfboard', 'tennis racket', 'bottle', 'wine glass', 'cup', 'fork',
-                'knife', 'spoon', 'bowl', 'banana', 'apple', 'sandwich', 'orange',
-                'broccoli', 'carrot', 'hot dog', 'pizza', 'donut', 'cake', 'chair',
-                'couch', 'potted plant', 'bed', 'dining table', 'toilet', 'tv',
-                'laptop', 'mouse', 'remote', 'keyboard', 'cell phone', 'microwave',
-                'oven', 'toaster', 'sink', 'refrigerator', 'book', 'clock', 'vase',
-                'scissors', 'teddy bear', 'hair drier', 'toothbrush'
-            ]
+            import tensorflow as tf
+            if not os.path.isdir(self.saved_model):
+                raise FileNotFoundError(f"No SavedModel directory at {self.saved_model}")
+            self.loaded = tf.saved_model.load(self.saved_model)
         except Exception as e:
             print(f"Error loading TensorFlow model: {e}")
-            print("Please install: pip install tensorflow tensorflow-hub")
-            self.model = None
+            print("Please install: pip install tensorflow")
+            print(f"and extract an SSD SavedModel (e.g. ssd_mobilenet_v2 from TensorFlow Hub) to {self.saved_model}")
+            self.failed = True
+            return False
+        
+        # Every frame is resized to this one input shape, so the graph is traced once and never retraced
+        signature = tf.TensorSpec([1, self.input_size, self.input_size, 3], tf.uint8)
+        self.model = tf.function(lambda images: self.loaded(images), input_signature=[signature])
+        load_ms = (time.perf_counter() - start) * 1000
+        
+        warmup_input = np.zeros((1, self.input_size, self.input_size, 3), np.uint8)
+        first_start = time.perf_counter()
+        self.model(warmup_input)
+        first_ms = (time.perf_counter() - first_start) * 1000
+        for _ in range(self.warmup_runs - 1):
+            self.model(warmup_input)
+        
+        print(f"TensorFlow model loaded successfully! ({self.input_size}x{self.input_size}: "
+              f"load {load_ms:.0f} ms + first inference {first_ms:.0f} ms)")
+        return True
+    
+    def prepare(self, frame):
+        """Model input for a BGR frame: resize to the fixed input size first, so BGR->RGB runs on the small image"""
+        resized = cv2.resize(frame, (self.input_size, self.input_size), interpolation=cv2.INTER_LINEAR)
+        return cv2.cvtColor(resized, cv2.COLOR_BGR2RGB)[np.newaxis]
     
     def detect_objects(self, frame):
         """Detect objects using TensorFlow model"""
-        if self.model is None:
-            return frame, []
-        
-        # Prepare image
-        input_tensor = tf.convert_to_tensor(frame)
-        input_tensor = input_tensor[tf.newaxis, ...]
+        if not self.load():
+            return []
         
         # Run inference
-        detections = self.model(input_tensor)
+        detections = self.model(self.prepare(frame))
         
         # Extract detection results
         boxes = detections['detection_boxes'][0].numpy()
-        classes = detections['detection_classes'][0].numpy().astype(int)
+        class_ids = detections['detection_classes'][0].numpy().astype(int) - 1  # COCO classes are 1-indexed
         scores = detections['detection_scores'][0].numpy()
         
+        keep = (scores > self.confidence_threshold) & (class_ids >= 0) & (class_ids < len(self.class_names))
+        boxes, class_ids, scores = boxes[keep], class_ids[keep], scores[keep]
+        
+        # Convert normalized (y1, x1, y2, x2) to pixel coordinates of the original frame
         height, width = frame.shape[:2]
-        detected_objects = []
+        pixels = (boxes * [height, width, height, width]).astype(int)
         
-        for i in range(len(boxes)):
-            if scores[i] > 0.5:  # Confidence threshold
-                box = boxes[i]
-                class_id = classes[i] - 1  # COCO classes are 1-indexed
-                
-                if 0 <= class_id < len(self.class_names):
-                    class_name = self.class_names[class_id]
-                    confidence = scores[i]
-                    
-                    # Convert normalized coordinates to pixel coordinates
-                    y1, x1, y2, x2 = box
-                    x1, x2 = int(x1 * width), int(x2 * width)
-                    y1, y2 = int(y1 * height), int(y2 * height)
-                    
-                    # Draw bounding box
-                    cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-                    
-                    # Draw label
-                    label = f"{class_name}: {confidence:.2f}"
-                    cv2.putText(frame, label, (x1, y1 - 10), 
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
-                    
-                    detected_objects.append({
-                        'class': class_name,
-                        'confidence': confidence,
-                        'bbox': [x1, y1, x2 - x1, y2 - y1]
-                    })
+        detected_objects = []
+        for (y1, x1, y2, x2), class_id, confidence in zip(pixels.tolist(), class_ids.tolist(), scores.tolist()):
+            detected_objects.append({
+                'type': 'object',
+                'class': self.class_names[class_id],
+                'confidence': confidence,
+                'bbox': [x1, y1, x2 - x1, y2 - y1]
+            })
         
-        return frame, detected_objects
+        return detected_objects
     
-    def run_detection(self):
+    def run_detection(self, headless=False, metrics=None):
         """Run real-time object detection"""
-        if self.model is None:
+        if not self.load():
             print("Model not loaded. Cannot run detection.")
             return
         
-        cap = cv2.VideoCapture(0)
-        
-        print("TensorFlow Object Detection started. Press 'q' to quit")
-        
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            # Detect objects
-            frame, objects = self.detect_objects(frame)
-            
-            # Display object count
-            cv2.putText(frame, f"Objects: {len(objects)}", (10, 30), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
-            
-            cv2.imshow('TensorFlow Object Detection', frame)
-            
-            if cv2.waitKey(1) & 0xFF == ord('q'):
-                break
+        metrics = metrics or Metrics(enabled=False)
+        
+        # Capture runs on its own thread; each read() returns the freshest frame
+        cap = ThreadedCapture(0, policy='latest').start()
+        renderer = OverlayRenderer()
+        
+        print("TensorFlow Object Detection started. " + ("Press Ctrl+C to stop" if headless else "Press 'q' to quit"))
+        
+        try:
+            while True:
+                with metrics.time('capture'):
+                    ret, frame = cap.read()
+                if not ret:
+                    break
+                
+                # Detect objects
+                with metrics.time('detect_objects'):
+                    objects = self.detect_objects(frame)
+                metrics.tick()
+                
+                if headless:
+                    continue
+                
+                with metrics.time('render'):
+                    renderer.draw(frame, objects)
+                    
+                    # Display object count
+                    renderer.draw_status(frame, [f"Objects: {len(objects)}"] + metrics.status_lines(), font_scale=1)
+                
+                with metrics.time('display'):
+                    cv2.imshow('TensorFlow Object Detection', frame)
+                    key = cv2.waitKey(1) & 0xFF
+                if key == ord('q'):
+                    break
+        except KeyboardInterrupt:
+            print("\nStopping...")
         
         cap.release()
-        cv2.destroyAllWindows()
+        if not headless:
+            cv2.destroyAllWindows()
+        print(f"Capture: {cap.frames_captured} frames grabbed, {cap.frames_dropped} stale frames dropped")
+        metrics.close()
 
 # Install required packages
 def install_requirements():
     import subprocess
     import sys
     
-    packages = ['tensorflow', 'tensorflow-hub']
+    packages = ['tensorflow']
     for package in packages:
         try:
             __import__(package.replace('-', '_'))
@@ -129,5 +178,12 @@ if __name__ == "__main__":
     # Uncomment the next line if you need to install packages
     # install_requirements()
     
-    detector = TensorFlowObjectDetector()
-    detector.run_detection()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Real-time TensorFlow object detection")
+    parser.add_argument('--headless', action='store_true', help="Detect only: no rendering and no window")
+    parser.add_argument('--saved-model', default=DEFAULT_SAVED_MODEL, help="Local SavedModel directory")
+    parser.add_argument('--input-size', type=int, default=320, help="Frames are resized to this square input")
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    
+    detector = TensorFlowObjectDetector(args.saved_model, input_size=args.input_size)
+    detector.run_detection(headless=args.headless, metrics=Metrics.from_args(args))
\ No newline at end of file
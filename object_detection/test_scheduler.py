@@ -0,0 +1,52 @@
+import unittest
+from scheduler import LatencyScheduler
+
+class LatencySchedulerTest(unittest.TestCase):
+    def run_frames(self, scheduler, stage_names, costs, frames, start=0.0):
+        plans = []
+        for i in range(frames):
+            plan = scheduler.plan(stage_names, now=start + i * 0.05)
+            scheduler.record({name: costs[name] for name in plan})
+            plans.append(plan)
+        return plans
+    
+    def test_single_stage_over_budget_still_runs(self):
+        scheduler = LatencyScheduler(budget_ms=66).add_stage('motion', priority=4)
+        plans = self.run_frames(scheduler, ['motion'], {'motion': 80.0}, 10)
+        self.assertEqual(plans, [['motion']] * 10)
+    
+    def test_top_priority_stage_runs_over_budget(self):
+        scheduler = LatencyScheduler(budget_ms=50)
+        scheduler.add_stage('faces', priority=2).add_stage('colors', priority=0)
+        plans = self.run_frames(scheduler, ['faces', 'colors'], {'faces': 80.0, 'colors': 5.0}, 10)
+        self.assertTrue(all('faces' in plan for plan in plans))
+    
+    def test_lower_priority_not_admitted_after_shed(self):
+        scheduler = LatencyScheduler(budget_ms=50, max_wait=10)
+        scheduler.add_stage('a', priority=2).add_stage('b', priority=1).add_stage('c', priority=0)
+        plans = self.run_frames(scheduler, ['a', 'b', 'c'], {'a': 30.0, 'b': 30.0, 'c': 10.0}, 4)
+        self.assertEqual(plans[-1], ['a'])
+        self.assertEqual(scheduler.last_shed, ['b', 'c'])
+    
+    def test_cold_first_run_does_not_lock_stage_out(self):
+        scheduler = LatencyScheduler(budget_ms=66, max_wait=10)
+        scheduler.add_stage('motion', priority=4).add_stage('people', priority=1)
+        scheduler.plan(['motion', 'people'], now=0.0)
+        # Cold start: the first run is far slower than the steady state
+        scheduler.record({'motion': 10.0, 'people': 184.0})
+        costs = {'motion': 10.0, 'people': 30.0}
+        plans = self.run_frames(scheduler, ['motion', 'people'], costs, 10, start=0.05)
+        self.assertTrue(all(plan == ['motion', 'people'] for plan in plans))
+    
+    def test_shed_estimate_decays_until_remeasured(self):
+        scheduler = LatencyScheduler(budget_ms=66, max_wait=10)
+        scheduler.add_stage('motion', priority=4).add_stage('people', priority=1)
+        costs = {'motion': 10.0, 'people': 200.0}
+        self.run_frames(scheduler, ['motion', 'people'], costs, 3)
+        # people is now known to be slow and gets shed; once it speeds up it is re-measured
+        costs['people'] = 20.0
+        plans = self.run_frames(scheduler, ['motion', 'people'], costs, 30, start=1.0)
+        self.assertEqual(plans[-1], ['motion', 'people'])
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,168 @@
+import cv2
+from itertools import count
+
+def iou(a, b):
+    """Intersection over union of two (x, y, w, h) boxes"""
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[0] + a[2], b[0] + b[2]), min(a[1] + a[3], b[1] + b[3])
+    inter = max(0, x2 - x1) * max(0, y2 - y1)
+    union = a[2] * a[3] + b[2] * b[3] - inter
+    return inter / union if union > 0 else 0.0
+
+def create_cv_tracker(name):
+    """OpenCV single-object tracker by name (e.g. 'MIL', or 'KCF'/'CSRT' with opencv-contrib)"""
+    for module in (cv2, getattr(cv2, 'legacy', None)):
+        factory = getattr(module, f'Tracker{name}_create', None)
+        if factory is not None:
+            return factory()
+    raise ValueError(f"OpenCV tracker '{name}' is not available in this OpenCV build")
+
+class Track:
+    """One face followed across frames, with the identity it was last recognised as"""
+    
+    def __init__(self, track_id, bbox, frame_index):
+        self.track_id = track_id
+        self.bbox = [int(v) for v in bbox]
+        self.velocity = (0.0, 0.0)
+        self.last_seen = frame_index
+        self.missed = 0
+        self.name = "Unknown"
+        self.confidence = 0.0
+        self.encoded_at = None
+        self.cv_tracker = None
+    
+    def predict(self):
+        """Move the box along its estimated per-frame velocity"""
+        x, y, w, h = self.bbox
+        self.bbox = [int(round(x + self.velocity[0])), int(round(y + self.velocity[1])), w, h]
+    
+    def observe(self, bbox, frame_index):
+        """Snap to a detected box and update the velocity estimate"""
+        frames = max(1, frame_index - self.last_seen)
+        self.velocity = ((bbox[0] - self.bbox[0]) / frames, (bbox[1] - self.bbox[1]) / frames)
+        self.bbox = [int(v) for v in bbox]
+        self.last_seen = frame_index
+        self.missed = 0
+
+class FaceTracker:
+    """Carries face boxes and identities across frames so faces aren't re-encoded every frame
+    
+    Faces are located only every detect_interval frames; detections are associated with
+    existing tracks by IoU. A face is encoded and matched only when its track is new, when
+    reencode_interval frames have passed, or when its decayed match confidence drops below
+    min_confidence. In between, boxes move by their velocity (or an optional OpenCV
+    tracker) and keep their identity, so recognition cost follows new arrivals.
+    """
+    
+    def __init__(self, detect_interval=5, reencode_interval=30, min_confidence=0.4, confidence_decay=0.98,
+                 iou_threshold=0.3, max_missed=2, cv_tracker=None):
+        self.detect_interval = detect_interval
+        self.reencode_interval = reencode_interval
+        self.min_confidence = min_confidence
+        self.confidence_decay = confidence_decay
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+        self.cv_tracker = cv_tracker
+        
+        self.tracks = []
+        self.ids = count(1)
+        self.frame_index = -1
+        
+        self.detections_run = 0
+        self.faces_encoded = 0
+        self.faces_reused = 0
+    
+    def current_confidence(self, track):
+        return track.confidence * self.confidence_decay ** (self.frame_index - track.encoded_at)
+    
+    def needs_encoding(self, track):
+        if track.encoded_at is None:
+            return True
+        if self.frame_index - track.encoded_at >= self.reencode_interval:
+            return True
+        return track.name != "Unknown" and self.current_confidence(track) < self.min_confidence
+    
+    def associate(self, boxes):
+        """Greedy IoU matching; returns ({track index: box index}, unmatched box indices)"""
+        pairs = sorted(((iou(track.bbox, box), t, b) for t, track in enumerate(self.tracks)
+                        for b, box in enumerate(boxes)), reverse=True)
+        matches = {}
+        used = set()
+        for overlap, t, b in pairs:
+            if overlap < self.iou_threshold:
+                break
+            if t in matches or b in used:
+                continue
+            matches[t] = b
+            used.add(b)
+        return matches, [b for b in range(len(boxes)) if b not in used]
+    
+    def update(self, ctx, locate, identify):
+        """Advance one frame and return recognized_face records for the live tracks
+        
+        locate(ctx) -> full-frame (x, y, w, h) face boxes
+        identify(ctx, boxes) -> [(name, confidence)] for those boxes
+        """
+        self.frame_index += 1
+        
+        if self.frame_index % self.detect_interval == 0 or not self.tracks:
+            self.detect(ctx, locate, identify)
+        else:
+            for track in self.tracks:
+                if track.missed == 0:
+                    self.follow(track, ctx)
+        
+        return [{
+            'type': 'recognized_face',
+            'name': track.name,
+            'confidence': track.confidence,
+            'bbox': list(track.bbox),
+            'track_id': track.track_id
+        } for track in self.tracks if track.missed == 0]
+    
+    def detect(self, ctx, locate, identify):
+        boxes = locate(ctx)
+        self.detections_run += 1
+        
+        matches, new_boxes = self.associate(boxes)
+        live = []
+        for t, track in enumerate(self.tracks):
+            if t in matches:
+                track.observe(boxes[matches[t]], self.frame_index)
+                live.append(track)
+            else:
+                track.missed += 1
+                if track.missed <= self.max_missed:
+                    live.append(track)
+        for b in new_boxes:
+            live.append(Track(next(self.ids), boxes[b], self.frame_index))
+        self.tracks = live
+        
+        visible = [track for track in self.tracks if track.missed == 0]
+        stale = [track for track in visible if self.needs_encoding(track)]
+        if stale:
+            for track, (name, confidence) in zip(stale, identify(ctx, [track.bbox for track in stale])):
+                track.name = name
+                track.confidence = float(confidence)
+                track.encoded_at = self.frame_index
+            self.faces_encoded += len(stale)
+        self.faces_reused += len(visible) - len(stale)
+        
+        if self.cv_tracker:
+            for track in visible:
+                track.cv_tracker = create_cv_tracker(self.cv_tracker)
+                track.cv_tracker.init(ctx.frame, tuple(track.bbox))
+    
+    def follow(self, track, ctx):
+        """Move a track between detections"""
+        if track.cv_tracker is not None:
+            ok, bbox = track.cv_tracker.update(ctx.frame)
+            if ok:
+                track.observe(bbox, self.frame_index)
+                return
+        track.predict()
+    
+    def report(self):
+        frames = self.frame_index + 1
+        return (f"Face tracker: located faces on {self.detections_run}/{frames} frames, "
+                f"encoded {self.faces_encoded} faces, reused {self.faces_reused} identities")
\ No newline at end of file